@@ -8,16 +8,21 @@ export type Artwork = {
 };
 
 export type PageResp = {
-  page: number;
-  per_page: number;
-  total: number;
-  items: Artwork[];
+  artworks: Artwork[];
+  pagination: {
+    per_page: number;
+    next_cursor: string | null; // null = última página
+    has_next: boolean;
+    total?: number;             // sólo si se pide include_total
+  };
 };
 
 const BASE = ""; // mismo origen (lo sirve Flask). Si usas otro, pon URL completa.
 
-export async function fetchArtworks(page = 1, perPage = 24): Promise<PageResp> {
-  const res = await fetch(`${BASE}/api/artworks?page=${page}&per_page=${perPage}`);
+// Paginación por cursor: cada página cuesta lo mismo que la primera (sin OFFSET ni COUNT).
+export async function fetchArtworks(cursor = "", perPage = 24): Promise<PageResp> {
+  const qs = new URLSearchParams({ cursor, per_page: String(perPage) });
+  const res = await fetch(`${BASE}/api/artworks?${qs}`);
   if (!res.ok) throw new Error(`Fetch failed: ${res.status}`);
   return res.json();
 }
@@ -8,28 +8,26 @@ const PER_PAGE = 24;
 
 export default function Gallery() {
   const [items, setItems] = useState<Artwork[]>([]);
-  const [page, setPage] = useState(1);
-  const [total, setTotal] = useState<number | null>(null);
+  const [cursor, setCursor] = useState("");
+  const [hasMore, setHasMore] = useState(true);
   const [loading, setLoading] = useState(false);
   const [error, setError]   = useState<string | null>(null);
 
-  const hasMore = total === null || items.length < total;
-
   const load = useCallback(async () => {
     if (loading || !hasMore) return;
     setLoading(true);
     setError(null);
     try {
-      const data = await fetchArtworks(page, PER_PAGE);
-      setItems((prev) => [...prev, ...data.items]);
-      setTotal(data.total);
-      setPage((p) => p + 1);
+      const data = await fetchArtworks(cursor, PER_PAGE);
+      setItems((prev) => [...prev, ...data.artworks]);
+      setCursor(data.pagination.next_cursor ?? "");
+      setHasMore(data.pagination.next_cursor !== null);
     } catch (e: any) {
       setError(e?.message ?? "Load error");
     } finally {
       setLoading(false);
     }
-  }, [page, loading, hasMore]);
+  }, [cursor, loading, hasMore]);
 
   const { sentinelRef, setEnabled } = useInfiniteScroll(load);
 
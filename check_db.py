@@ -1,17 +1,23 @@
 #!/usr/bin/env python3
 """
-Quick SQLite inspector for ARTGRID.
+Quick database inspector for ARTGRID (SQLite or PostgreSQL, via DATABASE_URL).
 
-- Lists tables
+- Lists tables and the Alembic schema revision
 - Shows row counts per table
 - Prints a few sample rows from each table
-- Verifies foreign-keys setting
+- Verifies foreign-keys setting (SQLite)
 """
 
-import sqlite3
+import os
 from textwrap import shorten
+from dotenv import load_dotenv
+from sqlalchemy import MetaData, Table, create_engine, inspect, text
+from sqlalchemy.schema import CreateTable
 
-DB_PATH = "db/artgrid.db"
+load_dotenv()  # before importing server, so both read the same DATABASE_URL
+from server import database_url
+
+DB_URL = database_url(os.environ.get("DATABASE_URL"))
 SAMPLE_LIMIT = 10  # how many rows to preview per table
 
 TABLES = {
@@ -33,19 +39,16 @@ TABLES = {
     ],
 }
 
-def table_exists(cur, name: str) -> bool:
-    cur.execute("SELECT name FROM sqlite_master WHERE type='table' AND name=?;", (name,))
-    return cur.fetchone() is not None
+def quote(conn, name: str) -> str:
+    return conn.dialect.identifier_preparer.quote(name)  # "user" is reserved on PostgreSQL
 
-def count_rows(cur, name: str) -> int:
-    cur.execute(f"SELECT COUNT(*) FROM {name};")
-    return cur.fetchone()[0]
+def count_rows(conn, name: str) -> int:
+    return conn.execute(text(f"SELECT COUNT(*) FROM {quote(conn, name)}")).scalar()
 
-def preview_rows(cur, name: str, cols: list[str], limit: int = SAMPLE_LIMIT):
-    sel = ", ".join(cols)
-    cur.execute(f"SELECT {sel} FROM {name} ORDER BY ROWID DESC LIMIT ?;", (limit,))
-    rows = cur.fetchall()
-    return rows
+def preview_rows(conn, name: str, cols: list[str], limit: int = SAMPLE_LIMIT):
+    sel = ", ".join(quote(conn, c) for c in cols)
+    rows = conn.execute(text(f"SELECT {sel} FROM {quote(conn, name)} ORDER BY id DESC LIMIT :limit"), {"limit": limit})
+    return rows.mappings().all()
 
 def print_section(title: str):
     print("\n" + "=" * 80)
@@ -53,55 +56,54 @@ def print_section(title: str):
     print("=" * 80)
 
 def main():
-    print_section(f"Connecting to database: {DB_PATH}")
-    conn = sqlite3.connect(DB_PATH)
-    conn.row_factory = sqlite3.Row
-    cur = conn.cursor()
-
-    # Check foreign keys
-    cur.execute("PRAGMA foreign_keys;")
-    fk = cur.fetchone()[0]
-    print(f"Foreign keys enabled: {bool(fk)} (0 = off, 1 = on)")
-    if not fk:
-        print("TIP: You can enable them at runtime via: PRAGMA foreign_keys = ON;")
+    engine = create_engine(DB_URL)
+    print_section(f"Connecting to database: {engine.url.render_as_string(hide_password=True)}")
+    conn = engine.connect()
+    insp = inspect(conn)
+
+    # Check foreign keys (always enforced on PostgreSQL)
+    if conn.dialect.name == "sqlite":
+        fk = conn.execute(text("PRAGMA foreign_keys")).scalar()
+        print(f"Foreign keys enabled: {bool(fk)} (0 = off, 1 = on)")
+        if not fk:
+            print("TIP: server.py enables them per connection; a bare connection (like this one) has them off.")
 
     # List all tables
     print_section("Tables present")
-    cur.execute("SELECT name FROM sqlite_master WHERE type='table' ORDER BY name;")
-    all_tables = [r[0] for r in cur.fetchall()]
+    all_tables = sorted(insp.get_table_names())
     if not all_tables:
-        print("No tables found. Start your Flask app once so it can create them.")
+        print("No tables found. Run `flask --app server init-db` (or `alembic upgrade head`) to create them.")
         return
     for t in all_tables:
         print(f"- {t}")
+    if "alembic_version" in all_tables:
+        print(f"\nSchema revision: {conn.execute(text('SELECT version_num FROM alembic_version')).scalar()}")
 
     # Per-table details (only for known app tables)
     for tname, cols in TABLES.items():
         print_section(f"Table: {tname}")
-        if not table_exists(cur, tname):
+        if tname not in all_tables:
             print(f"(missing) — this table does not exist yet.")
             continue
 
-        # Show DDL
-        cur.execute("SELECT sql FROM sqlite_master WHERE type='table' AND name=?;", (tname,))
-        ddl = cur.fetchone()
-        if ddl and ddl["sql"]:
-            print("Schema:")
-            print(ddl["sql"])
+        # Show DDL (as reflected, so it reads the same on every backend)
+        table = Table(tname, MetaData(), autoload_with=conn)
+        print("Schema:")
+        print(str(CreateTable(table).compile(conn)).strip())
 
         # Row count
-        total = count_rows(cur, tname)
+        total = count_rows(conn, tname)
         print(f"\nRow count: {total}")
 
         # Preview rows
         if total > 0:
             print(f"\nLast {min(SAMPLE_LIMIT, total)} rows:")
-            rows = preview_rows(cur, tname, cols)
+            rows = preview_rows(conn, tname, cols)
             for r in rows:
                 # pretty-print with truncated long fields
                 line = []
                 for c in cols:
-                    val = r[c] if c in r.keys() else None
+                    val = r.get(c)
                     if isinstance(val, str):
                         val = shorten(val, width=80, placeholder="…")
                     line.append(f"{c}={val}")
@@ -0,0 +1,53 @@
+"""
+Gunicorn serving profile for ARTGRID.
+
+    gunicorn -c gunicorn.conf.py
+
+- preload_app: server.py is imported and bootstrapped once in the master;
+  workers are forked from it, which keeps start-up and respawns cheap.
+- gthread workers: requests mostly wait on SQLite, Cloudinary and the password
+  hash pool, so a few processes with several threads each beat many sync workers.
+  SQLite takes one writer at a time, so more processes don't add write throughput.
+- The per-host shared stores (view spool, response cache, rate limits, metrics) default
+  to files under ARTGRID_RUN_DIR, so every worker sees the same state.
+Every setting can be overridden from the environment or the command line.
+"""
+
+import multiprocessing
+import os
+
+run_dir = os.environ.get("ARTGRID_RUN_DIR", "/tmp/artgrid")
+os.makedirs(run_dir, exist_ok=True)
+os.environ.setdefault("VIEW_SPOOL_PATH", os.path.join(run_dir, "view_spool.db"))
+os.environ.setdefault("CACHE_PATH", os.path.join(run_dir, "cache.db"))
+os.environ.setdefault("RATE_LIMIT_PATH", os.path.join(run_dir, "rate_limit.db"))
+os.environ.setdefault("METRICS_PATH", os.path.join(run_dir, "metrics.db"))
+
+wsgi_app = "wsgi:app"
+bind = os.environ.get("GUNICORN_BIND", f"0.0.0.0:{os.environ.get('PORT', '5000')}")
+workers = int(os.environ.get("WEB_CONCURRENCY", min(multiprocessing.cpu_count(), 4)))
+worker_class = "gthread"
+threads = int(os.environ.get("GUNICORN_THREADS", 8))
+preload_app = True
+
+# Timeouts: kill stuck workers, give in-flight requests time to finish on reload/shutdown
+timeout = int(os.environ.get("GUNICORN_TIMEOUT", 30))
+graceful_timeout = int(os.environ.get("GUNICORN_GRACEFUL_TIMEOUT", 30))
+keepalive = 5
+
+# Recycle workers now and then to bound memory growth (jitter avoids simultaneous restarts)
+max_requests = int(os.environ.get("GUNICORN_MAX_REQUESTS", 5000))
+max_requests_jitter = 500
+
+# Heartbeat file in RAM, so a slow disk can't make the arbiter think workers hung
+if os.path.isdir("/dev/shm"):
+    worker_tmp_dir = "/dev/shm"
+
+accesslog = os.environ.get("GUNICORN_ACCESS_LOG", "-")
+errorlog = "-"
+
+
+def post_fork(server, worker):
+    # Connections opened in the master must not be shared with the children
+    from server import dispose_engines
+    dispose_engines(close=False)
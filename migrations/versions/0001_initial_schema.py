@@ -0,0 +1,329 @@
+"""initial schema
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-16 19:35:55.528462
+
+Baseline: every table and index server.py had before migrations were introduced,
+plus the full-text search structures (FTS5 table + triggers on SQLite, a GIN
+expression index on PostgreSQL). Existing databases are stamped at this revision
+by run_migrations() instead of being upgraded through it.
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+# Frozen copies of server.FTS_DDL / server.PG_SEARCH_VECTOR as of this revision
+FTS_DDL = [
+    """CREATE VIRTUAL TABLE IF NOT EXISTS artwork_fts USING fts5(
+        title, description, tags, artist_name,
+        tokenize = 'unicode61 remove_diacritics 2', prefix = '2 3')""",
+    """CREATE TRIGGER IF NOT EXISTS artwork_fts_ai AFTER INSERT ON artwork BEGIN
+        INSERT INTO artwork_fts (rowid, title, description, tags, artist_name)
+        VALUES (new.id, new.title, new.description, new.tags, (SELECT full_name FROM "user" WHERE id = new.user_id));
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS artwork_fts_ad AFTER DELETE ON artwork BEGIN
+        DELETE FROM artwork_fts WHERE rowid = old.id;
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS artwork_fts_au AFTER UPDATE OF title, description, tags, user_id ON artwork BEGIN
+        DELETE FROM artwork_fts WHERE rowid = old.id;
+        INSERT INTO artwork_fts (rowid, title, description, tags, artist_name)
+        VALUES (new.id, new.title, new.description, new.tags, (SELECT full_name FROM "user" WHERE id = new.user_id));
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS user_fts_au AFTER UPDATE OF full_name ON "user" BEGIN
+        UPDATE artwork_fts SET artist_name = new.full_name
+        WHERE rowid IN (SELECT id FROM artwork WHERE user_id = new.id);
+    END""",
+]
+PG_SEARCH_VECTOR = (
+    "setweight(to_tsvector('simple', coalesce(title, '')), 'A') || "
+    "setweight(to_tsvector('simple', coalesce(tags, '')), 'B') || "
+    "setweight(to_tsvector('simple', coalesce(description, '')), 'C')"
+)
+
+
+revision = '0001'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('email_job',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('recipient', sa.String(length=120), nullable=False),
+    sa.Column('subject', sa.String(length=255), nullable=False),
+    sa.Column('body', sa.Text(), nullable=False),
+    sa.Column('sent_at', sa.DateTime(), nullable=True),
+    sa.Column('status', sa.String(length=20), nullable=False),
+    sa.Column('attempts', sa.Integer(), nullable=False),
+    sa.Column('next_attempt_at', sa.DateTime(), nullable=False),
+    sa.Column('claim_token', sa.String(length=32), nullable=True),
+    sa.Column('last_error', sa.Text(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('email_job', schema=None) as batch_op:
+        batch_op.create_index('idx_email_job_claim', ['claim_token'], unique=False)
+        batch_op.create_index('idx_email_job_due', ['status', 'next_attempt_at'], unique=False)
+
+    op.create_table('job_state',
+    sa.Column('name', sa.String(length=50), nullable=False),
+    sa.Column('value', sa.Integer(), nullable=False),
+    sa.PrimaryKeyConstraint('name')
+    )
+    op.create_table('revoked_token',
+    sa.Column('key', sa.String(length=64), nullable=False),
+    sa.Column('revoked_at', sa.DateTime(), nullable=False),
+    sa.Column('expires_at', sa.DateTime(), nullable=False),
+    sa.PrimaryKeyConstraint('key')
+    )
+    op.create_table('stat_counter',
+    sa.Column('key', sa.String(length=120), nullable=False),
+    sa.Column('value', sa.Integer(), nullable=False),
+    sa.PrimaryKeyConstraint('key')
+    )
+    op.create_table('tag',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('name', sa.String(length=50), nullable=False),
+    sa.Column('artwork_count', sa.Integer(), nullable=False),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('name')
+    )
+    with op.batch_alter_table('tag', schema=None) as batch_op:
+        batch_op.create_index('idx_tag_count', ['artwork_count'], unique=False)
+
+    op.create_table('user',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('full_name', sa.String(length=100), nullable=False),
+    sa.Column('email', sa.String(length=120), nullable=False),
+    sa.Column('password_hash', sa.String(length=255), nullable=False),
+    sa.Column('dob_hash', sa.String(length=255), nullable=False),
+    sa.Column('student_id', sa.String(length=50), nullable=False),
+    sa.Column('year_of_study', sa.String(length=20), nullable=False),
+    sa.Column('profile_image_url', sa.String(length=255), nullable=True),
+    sa.Column('verification_status', sa.String(length=20), nullable=True),
+    sa.Column('role', sa.String(length=20), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('email'),
+    sa.UniqueConstraint('student_id')
+    )
+    with op.batch_alter_table('user', schema=None) as batch_op:
+        batch_op.create_index('idx_user_role', ['role'], unique=False)
+        batch_op.create_index('idx_user_verification', ['verification_status'], unique=False)
+
+    op.create_table('artwork',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('status', sa.String(length=20), nullable=False),
+    sa.Column('title', sa.String(length=100), nullable=False),
+    sa.Column('description', sa.Text(), nullable=True),
+    sa.Column('medium', sa.String(length=50), nullable=False),
+    sa.Column('category', sa.String(length=50), nullable=False),
+    sa.Column('file_url', sa.String(length=255), nullable=False),
+    sa.Column('thumbnail_url', sa.String(length=255), nullable=True),
+    sa.Column('tags', sa.String(length=255), nullable=True),
+    sa.Column('creation_date', sa.Date(), nullable=True),
+    sa.Column('submission_date', sa.DateTime(), nullable=True),
+    sa.Column('approval_date', sa.DateTime(), nullable=True),
+    sa.Column('likes_count', sa.Integer(), nullable=True),
+    sa.Column('views_count', sa.Integer(), nullable=True),
+    sa.Column('is_featured', sa.Boolean(), nullable=True),
+    sa.CheckConstraint("status IN ('pending', 'approved', 'rejected')", name='ck_artwork_status_valid'),
+    sa.ForeignKeyConstraint(['user_id'], ['user.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('artwork', schema=None) as batch_op:
+        batch_op.create_index('idx_artwork_featured', ['status', 'is_featured', 'submission_date', 'id'], unique=False)
+        batch_op.create_index('idx_artwork_status', ['status'], unique=False)
+        batch_op.create_index('idx_artwork_status_likes', ['status', 'likes_count'], unique=False)
+        batch_op.create_index('idx_artwork_status_submitted', ['status', 'submission_date', 'id'], unique=False)
+        batch_op.create_index('idx_artwork_user', ['user_id'], unique=False)
+
+    op.create_table('artwork_derivative',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('artwork_id', sa.Integer(), nullable=False),
+    sa.Column('variant', sa.String(length=20), nullable=False),
+    sa.Column('format', sa.String(length=10), nullable=False),
+    sa.Column('url', sa.String(length=255), nullable=False),
+    sa.Column('width', sa.Integer(), nullable=True),
+    sa.Column('height', sa.Integer(), nullable=True),
+    sa.Column('bytes', sa.Integer(), nullable=True),
+    sa.ForeignKeyConstraint(['artwork_id'], ['artwork.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('artwork_id', 'variant', 'format')
+    )
+    op.create_table('artwork_tag',
+    sa.Column('artwork_id', sa.Integer(), nullable=False),
+    sa.Column('tag_id', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['artwork_id'], ['artwork.id'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['tag_id'], ['tag.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('artwork_id', 'tag_id')
+    )
+    with op.batch_alter_table('artwork_tag', schema=None) as batch_op:
+        batch_op.create_index('idx_artwork_tag_tag', ['tag_id', 'artwork_id'], unique=False)
+
+    op.create_table('artwork_trend',
+    sa.Column('artwork_id', sa.Integer(), nullable=False),
+    sa.Column('score', sa.Float(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['artwork_id'], ['artwork.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('artwork_id')
+    )
+    with op.batch_alter_table('artwork_trend', schema=None) as batch_op:
+        batch_op.create_index('idx_artwork_trend_score', ['score'], unique=False)
+
+    op.create_table('asset',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('sha256', sa.String(length=64), nullable=False),
+    sa.Column('phash', sa.String(length=16), nullable=True),
+    sa.Column('size', sa.Integer(), nullable=True),
+    sa.Column('file_url', sa.String(length=255), nullable=False),
+    sa.Column('thumbnail_url', sa.String(length=255), nullable=True),
+    sa.Column('artwork_id', sa.Integer(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['artwork_id'], ['artwork.id'], ondelete='SET NULL'),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('sha256')
+    )
+    with op.batch_alter_table('asset', schema=None) as batch_op:
+        batch_op.create_index('idx_asset_phash', ['phash'], unique=False)
+
+    op.create_table('comment',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('artwork_id', sa.Integer(), nullable=False),
+    sa.Column('content', sa.Text(), nullable=False),
+    sa.Column('timestamp', sa.DateTime(), nullable=True),
+    sa.Column('is_flagged', sa.Boolean(), nullable=True),
+    sa.ForeignKeyConstraint(['artwork_id'], ['artwork.id'], ),
+    sa.ForeignKeyConstraint(['user_id'], ['user.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('comment', schema=None) as batch_op:
+        batch_op.create_index('idx_comment_artwork', ['artwork_id'], unique=False)
+        batch_op.create_index('idx_comment_user', ['user_id'], unique=False)
+
+    op.create_table('like',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('artwork_id', sa.Integer(), nullable=False),
+    sa.Column('timestamp', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['artwork_id'], ['artwork.id'], ),
+    sa.ForeignKeyConstraint(['user_id'], ['user.id'], ),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('user_id', 'artwork_id')
+    )
+    with op.batch_alter_table('like', schema=None) as batch_op:
+        batch_op.create_index('idx_like_artwork', ['artwork_id'], unique=False)
+
+    op.create_table('moderation',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('artwork_id', sa.Integer(), nullable=False),
+    sa.Column('moderator_id', sa.Integer(), nullable=False),
+    sa.Column('action', sa.String(length=20), nullable=False),
+    sa.Column('feedback', sa.Text(), nullable=True),
+    sa.Column('timestamp', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['artwork_id'], ['artwork.id'], ),
+    sa.ForeignKeyConstraint(['moderator_id'], ['user.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('moderation', schema=None) as batch_op:
+        batch_op.create_index('idx_moderation_action', ['action'], unique=False)
+        batch_op.create_index('idx_moderation_artwork', ['artwork_id'], unique=False)
+        batch_op.create_index('idx_moderation_moderator', ['moderator_id'], unique=False)
+
+    op.create_table('upload_job',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('artwork_id', sa.Integer(), nullable=False),
+    sa.Column('staging_path', sa.String(length=255), nullable=False),
+    sa.Column('content_hash', sa.String(length=64), nullable=True),
+    sa.Column('status', sa.String(length=20), nullable=False),
+    sa.Column('attempts', sa.Integer(), nullable=False),
+    sa.Column('next_attempt_at', sa.DateTime(), nullable=False),
+    sa.Column('claim_token', sa.String(length=32), nullable=True),
+    sa.Column('last_error', sa.Text(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['artwork_id'], ['artwork.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('upload_job', schema=None) as batch_op:
+        batch_op.create_index('idx_upload_job_claim', ['claim_token'], unique=False)
+        batch_op.create_index('idx_upload_job_due', ['status', 'next_attempt_at'], unique=False)
+
+    dialect = op.get_bind().dialect.name
+    if dialect == "sqlite":
+        for ddl in FTS_DDL:
+            op.execute(ddl)
+    elif dialect == "postgresql":
+        op.execute(f"CREATE INDEX idx_artwork_search ON artwork USING gin (({PG_SEARCH_VECTOR}))")
+
+
+def downgrade():
+    dialect = op.get_bind().dialect.name
+    if dialect == "sqlite":
+        for name in ("user_fts_au", "artwork_fts_au", "artwork_fts_ad", "artwork_fts_ai"):
+            op.execute(f"DROP TRIGGER IF EXISTS {name}")
+        op.execute("DROP TABLE IF EXISTS artwork_fts")
+    elif dialect == "postgresql":
+        op.execute("DROP INDEX IF EXISTS idx_artwork_search")
+
+    with op.batch_alter_table('upload_job', schema=None) as batch_op:
+        batch_op.drop_index('idx_upload_job_due')
+        batch_op.drop_index('idx_upload_job_claim')
+
+    op.drop_table('upload_job')
+    with op.batch_alter_table('moderation', schema=None) as batch_op:
+        batch_op.drop_index('idx_moderation_moderator')
+        batch_op.drop_index('idx_moderation_artwork')
+        batch_op.drop_index('idx_moderation_action')
+
+    op.drop_table('moderation')
+    with op.batch_alter_table('like', schema=None) as batch_op:
+        batch_op.drop_index('idx_like_artwork')
+
+    op.drop_table('like')
+    with op.batch_alter_table('comment', schema=None) as batch_op:
+        batch_op.drop_index('idx_comment_user')
+        batch_op.drop_index('idx_comment_artwork')
+
+    op.drop_table('comment')
+    with op.batch_alter_table('asset', schema=None) as batch_op:
+        batch_op.drop_index('idx_asset_phash')
+
+    op.drop_table('asset')
+    with op.batch_alter_table('artwork_trend', schema=None) as batch_op:
+        batch_op.drop_index('idx_artwork_trend_score')
+
+    op.drop_table('artwork_trend')
+    with op.batch_alter_table('artwork_tag', schema=None) as batch_op:
+        batch_op.drop_index('idx_artwork_tag_tag')
+
+    op.drop_table('artwork_tag')
+    op.drop_table('artwork_derivative')
+    with op.batch_alter_table('artwork', schema=None) as batch_op:
+        batch_op.drop_index('idx_artwork_user')
+        batch_op.drop_index('idx_artwork_status_submitted')
+        batch_op.drop_index('idx_artwork_status_likes')
+        batch_op.drop_index('idx_artwork_status')
+        batch_op.drop_index('idx_artwork_featured')
+
+    op.drop_table('artwork')
+    with op.batch_alter_table('user', schema=None) as batch_op:
+        batch_op.drop_index('idx_user_verification')
+        batch_op.drop_index('idx_user_role')
+
+    op.drop_table('user')
+    with op.batch_alter_table('tag', schema=None) as batch_op:
+        batch_op.drop_index('idx_tag_count')
+
+    op.drop_table('tag')
+    op.drop_table('stat_counter')
+    op.drop_table('revoked_token')
+    op.drop_table('job_state')
+    with op.batch_alter_table('email_job', schema=None) as batch_op:
+        batch_op.drop_index('idx_email_job_due')
+        batch_op.drop_index('idx_email_job_claim')
+
+    op.drop_table('email_job')
@@ -0,0 +1,45 @@
+"""comment keyset index and comments count
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-16 19:47:43.215212
+
+- artwork.comments_count: denormalized count of unflagged comments, backfilled here.
+- idx_comment_artwork_visible (artwork_id, is_flagged, timestamp, id) serves the
+  keyset-paginated comment thread; it replaces idx_comment_artwork (its prefix).
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = '0002'
+down_revision = '0001'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('artwork', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('comments_count', sa.Integer(), server_default='0', nullable=False))
+
+    with op.batch_alter_table('comment', schema=None) as batch_op:
+        batch_op.create_index('idx_comment_artwork_visible', ['artwork_id', 'is_flagged', 'timestamp', 'id'], unique=False)
+        batch_op.drop_index('idx_comment_artwork')
+
+    artwork = sa.table('artwork', sa.column('id', sa.Integer), sa.column('comments_count', sa.Integer))
+    comment = sa.table('comment', sa.column('artwork_id', sa.Integer), sa.column('is_flagged', sa.Boolean))
+    visible = (
+        sa.select(sa.func.count()).where(comment.c.artwork_id == artwork.c.id, comment.c.is_flagged == sa.false())
+        .scalar_subquery()
+    )
+    op.execute(artwork.update().where(artwork.c.id.in_(sa.select(comment.c.artwork_id))).values(comments_count=visible))
+
+
+def downgrade():
+    with op.batch_alter_table('comment', schema=None) as batch_op:
+        batch_op.create_index('idx_comment_artwork', ['artwork_id'], unique=False)
+        batch_op.drop_index('idx_comment_artwork_visible')
+
+    with op.batch_alter_table('artwork', schema=None) as batch_op:
+        batch_op.drop_column('comments_count')
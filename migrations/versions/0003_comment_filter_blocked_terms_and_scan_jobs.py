@@ -0,0 +1,68 @@
+"""comment filter blocked terms and scan jobs
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-16 19:51:32.961876
+
+- blocked_term: the moderation word list, seeded with the terms add_comment
+  used to hard-code ("spam", "inappropriate").
+- comment_scan_job: queue for the optional deep scan (COMMENT_DEEP_SCAN).
+- idx_comment_user_recent (user_id, timestamp) serves the duplicate-comment
+  check; it replaces idx_comment_user (its prefix).
+"""
+
+from datetime import datetime
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = '0003'
+down_revision = '0002'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('blocked_term',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('term', sa.String(length=100), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('term')
+    )
+    op.create_table('comment_scan_job',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('comment_id', sa.Integer(), nullable=False),
+    sa.Column('status', sa.String(length=20), nullable=False),
+    sa.Column('attempts', sa.Integer(), nullable=False),
+    sa.Column('next_attempt_at', sa.DateTime(), nullable=False),
+    sa.Column('claim_token', sa.String(length=32), nullable=True),
+    sa.Column('last_error', sa.Text(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['comment_id'], ['comment.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('comment_scan_job', schema=None) as batch_op:
+        batch_op.create_index('idx_comment_scan_job_claim', ['claim_token'], unique=False)
+        batch_op.create_index('idx_comment_scan_job_due', ['status', 'next_attempt_at'], unique=False)
+
+    with op.batch_alter_table('comment', schema=None) as batch_op:
+        batch_op.drop_index('idx_comment_user')
+        batch_op.create_index('idx_comment_user_recent', ['user_id', 'timestamp'], unique=False)
+
+    blocked_term = sa.table('blocked_term', sa.column('term', sa.String), sa.column('created_at', sa.DateTime))
+    op.bulk_insert(blocked_term, [{'term': t, 'created_at': datetime.utcnow()} for t in ('inappropriate', 'spam')])
+
+
+def downgrade():
+    with op.batch_alter_table('comment', schema=None) as batch_op:
+        batch_op.drop_index('idx_comment_user_recent')
+        batch_op.create_index('idx_comment_user', ['user_id'], unique=False)
+
+    with op.batch_alter_table('comment_scan_job', schema=None) as batch_op:
+        batch_op.drop_index('idx_comment_scan_job_due')
+        batch_op.drop_index('idx_comment_scan_job_claim')
+
+    op.drop_table('comment_scan_job')
+    op.drop_table('blocked_term')
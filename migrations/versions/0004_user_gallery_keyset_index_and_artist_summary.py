@@ -0,0 +1,58 @@
+"""user gallery keyset index and artist summary
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-16 19:54:35.979094
+
+- artist_summary: per-artist totals over approved artworks (count, likes,
+  views, latest upload) for the gallery header, backfilled here.
+- idx_artwork_user_gallery (user_id, status, submission_date, id) serves the
+  keyset-paginated user gallery; it replaces idx_artwork_user (its prefix).
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = '0004'
+down_revision = '0003'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('artist_summary',
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('artworks_count', sa.Integer(), server_default='0', nullable=False),
+    sa.Column('likes_total', sa.Integer(), server_default='0', nullable=False),
+    sa.Column('views_total', sa.Integer(), server_default='0', nullable=False),
+    sa.Column('latest_upload', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['user_id'], ['user.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('user_id')
+    )
+    with op.batch_alter_table('artwork', schema=None) as batch_op:
+        batch_op.drop_index('idx_artwork_user')
+        batch_op.create_index('idx_artwork_user_gallery', ['user_id', 'status', 'submission_date', 'id'], unique=False)
+
+    artwork = sa.table('artwork', sa.column('user_id', sa.Integer), sa.column('status', sa.String),
+                       sa.column('likes_count', sa.Integer), sa.column('views_count', sa.Integer),
+                       sa.column('submission_date', sa.DateTime))
+    summary = sa.table('artist_summary', sa.column('user_id', sa.Integer), sa.column('artworks_count', sa.Integer),
+                       sa.column('likes_total', sa.Integer), sa.column('views_total', sa.Integer),
+                       sa.column('latest_upload', sa.DateTime))
+    totals = (
+        sa.select(artwork.c.user_id, sa.func.count(), sa.func.coalesce(sa.func.sum(artwork.c.likes_count), 0),
+                  sa.func.coalesce(sa.func.sum(artwork.c.views_count), 0), sa.func.max(artwork.c.submission_date))
+        .where(artwork.c.status == 'approved').group_by(artwork.c.user_id)
+    )
+    op.execute(summary.insert().from_select(
+        ['user_id', 'artworks_count', 'likes_total', 'views_total', 'latest_upload'], totals
+    ))
+
+
+def downgrade():
+    with op.batch_alter_table('artwork', schema=None) as batch_op:
+        batch_op.drop_index('idx_artwork_user_gallery')
+        batch_op.create_index('idx_artwork_user', ['user_id'], unique=False)
+
+    op.drop_table('artist_summary')
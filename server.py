@@ -1,22 +1,48 @@
-from flask import Flask, request, jsonify, send_from_directory, make_response
+from flask import Flask, request, jsonify, send_from_directory, make_response, g, stream_with_context, has_request_context
 from flask_sqlalchemy import SQLAlchemy
-from flask_jwt_extended import JWTManager, jwt_required, create_access_token, get_jwt_identity
+from flask_sqlalchemy.session import Session as FlaskSession
+from flask_jwt_extended import JWTManager, jwt_required, create_access_token, get_jwt_identity, get_jwt
 from flask_mail import Mail, Message
 from flask_cors import CORS
 from werkzeug.security import generate_password_hash, check_password_hash
-from werkzeug.utils import secure_filename
-from datetime import datetime, timedelta
+from werkzeug.utils import secure_filename, import_string
+from datetime import date, datetime, timedelta, timezone
 import os
+import sys
+import hmac
 from pathlib import Path
 import hashlib
 import re
+import unicodedata
 from functools import wraps
+from contextlib import contextmanager
 import cloudinary
 import cloudinary.uploader
-from PIL import Image
+from PIL import Image, ImageOps
 import io
+import json
+import csv
+import zlib
+import base64
+import sqlite3
+import threading
+import atexit
+import time
+import math
+import random
+from collections import OrderedDict, Counter, defaultdict
+import uuid
+import shutil
+import tempfile
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 from sqlalchemy import text
-from sqlalchemy import CheckConstraint
+from sqlalchemy import CheckConstraint, tuple_, update, delete, select, bindparam, case, and_, or_
+from sqlalchemy.dialects import postgresql, sqlite as sqlite_dialect
+from sqlalchemy.orm import joinedload, contains_eager, Session
+from sqlalchemy import event, inspect
+from sqlalchemy.engine import Engine
+from alembic import command as alembic_command
+from alembic.config import Config as AlembicConfig
 
 # ---------------------------------------------------------------------------
 # 1. CORE CONFIG
@@ -29,20 +55,108 @@ DB_DIR = BASE_DIR / "db"
 DB_DIR.mkdir(parents=True, exist_ok=True)   #If ./db is missing, create it
 DB_PATH = DB_DIR / "artgrid.db"
 
+def database_url(url=None):
+    """
+    DATABASE_URL, defaulting to db/artgrid.db. Relative SQLite paths are taken
+    from the project root, and Heroku-style postgres:// URLs are accepted.
+    """
+    url = url or f"sqlite:///{DB_PATH.as_posix()}"
+    if url.startswith("postgres://"):
+        url = "postgresql://" + url[len("postgres://"):]
+    if url.startswith("sqlite:///") and url != "sqlite:///:memory:" and not os.path.isabs(url[len("sqlite:///"):]):
+        url = f"sqlite:///{(BASE_DIR / url[len('sqlite:///'):]).as_posix()}"
+    return url
+
 app.config["SECRET_KEY"] = os.environ.get("SECRET_KEY", "dev-secret-change-me")
-app.config["SQLALCHEMY_DATABASE_URI"] = f"sqlite:///{DB_PATH.as_posix()}"
+app.config["SQLALCHEMY_DATABASE_URI"] = database_url(os.environ.get("DATABASE_URL"))
 app.config["SQLALCHEMY_TRACK_MODIFICATIONS"] = False
+app.config["DB_POOL_SIZE"] = int(os.environ.get("DB_POOL_SIZE", 10))  # server databases (PostgreSQL), per process
+# SQLite engine layer (see 2.1): one serialized writer connection, a pool of read-only readers
+app.config["SQLITE_CACHE_SIZE_KB"] = int(os.environ.get("SQLITE_CACHE_SIZE_KB", 65536))   # page cache per connection
+app.config["SQLITE_MMAP_SIZE"] = int(os.environ.get("SQLITE_MMAP_SIZE", 256 * 1024 * 1024))  # bytes, 0 = off
+app.config["SQLITE_BUSY_TIMEOUT"] = int(os.environ.get("SQLITE_BUSY_TIMEOUT", 5000))       # ms
+app.config["SQLITE_READ_POOL_SIZE"] = int(os.environ.get("SQLITE_READ_POOL_SIZE", 8))
+app.config["SQLITE_WRITE_TIMEOUT"] = float(os.environ.get("SQLITE_WRITE_TIMEOUT", 30))     # s to wait for the writer
+if app.config["SQLALCHEMY_DATABASE_URI"].startswith("sqlite"):
+    app.config["SQLALCHEMY_ENGINE_OPTIONS"] = {
+        "pool_size": 1, "max_overflow": 0, "pool_timeout": app.config["SQLITE_WRITE_TIMEOUT"],
+    }
+    app.config["SQLALCHEMY_BINDS"] = {
+        "read": {
+            "url": app.config["SQLALCHEMY_DATABASE_URI"],
+            "pool_size": app.config["SQLITE_READ_POOL_SIZE"], "max_overflow": 0,
+        },
+    }
+else:
+    app.config["SQLALCHEMY_ENGINE_OPTIONS"] = {
+        "pool_size": app.config["DB_POOL_SIZE"], "max_overflow": app.config["DB_POOL_SIZE"] // 2, "pool_pre_ping": True,
+    }
 app.config["JWT_SECRET_KEY"] = os.environ.get("JWT_SECRET_KEY", "jwt-secret-change-me")
 app.config["JWT_ACCESS_TOKEN_EXPIRES"] = timedelta(days=7)
+app.config["JWT_DENYLIST_REFRESH"] = float(os.environ.get("JWT_DENYLIST_REFRESH", 10))  # seconds between denylist reloads
+# Password hashing (werkzeug method string; existing hashes are upgraded on the next login)
+app.config["PASSWORD_HASH_METHOD"] = os.environ.get("PASSWORD_HASH_METHOD", "scrypt:32768:8:1")  # or e.g. pbkdf2:sha256:600000
+app.config["PASSWORD_HASH_WORKERS"] = int(os.environ.get("PASSWORD_HASH_WORKERS", os.cpu_count() or 2))
+app.config["PASSWORD_HASH_MAX_PENDING"] = int(os.environ.get("PASSWORD_HASH_MAX_PENDING", 64))  # queued + running, then 503
+app.config["LOGIN_RATE_PER_EMAIL"] = os.environ.get("LOGIN_RATE_PER_EMAIL", "10/60")  # attempts / seconds, "" = off
+app.config["LOGIN_RATE_PER_IP"] = os.environ.get("LOGIN_RATE_PER_IP", "50/60")
+app.config["RATE_LIMIT_PATH"] = os.environ.get("RATE_LIMIT_PATH")  # shared SQLite buckets for multi-worker setups
 app.config["UPLOAD_FOLDER"] = "uploads"
+app.config["STORAGE_BACKEND"] = os.environ.get("STORAGE_BACKEND", "cloudinary")  # cloudinary / local / "module:Class"
+app.config["UPLOAD_WORKERS"] = int(os.environ.get("UPLOAD_WORKERS", 2))  # derivative-rendering processes
+app.config["UPLOAD_POLL_INTERVAL"] = float(os.environ.get("UPLOAD_POLL_INTERVAL", 5))  # seconds
+app.config["UPLOAD_MAX_ATTEMPTS"] = int(os.environ.get("UPLOAD_MAX_ATTEMPTS", 5))
+app.config["UPLOAD_RETRY_BACKOFF"] = float(os.environ.get("UPLOAD_RETRY_BACKOFF", 30))  # seconds, doubled per attempt
+app.config["PHASH_ENABLED"] = os.environ.get("PHASH_ENABLED", "1") == "1"  # perceptual hash per upload
+app.config["DERIVATIVE_SIZES"] = os.environ.get("DERIVATIVE_SIZES", "thumb=320,medium=1024,large=2048")  # longest edge, px
 app.config["MAX_CONTENT_LENGTH"] = 10 * 1024 * 1024  # 10 MB
 
+# View counter (write-behind)
+app.config["VIEW_FLUSH_INTERVAL"] = float(os.environ.get("VIEW_FLUSH_INTERVAL", 5))     # seconds; 0 = flush inline at the threshold only
+app.config["VIEW_FLUSH_THRESHOLD"] = int(os.environ.get("VIEW_FLUSH_THRESHOLD", 500))   # pending views
+app.config["VIEW_SPOOL_PATH"] = os.environ.get("VIEW_SPOOL_PATH")  # shared SQLite spool for multi-worker setups
+# Response cache for public read endpoints
+app.config["CACHE_TTL"] = float(os.environ.get("CACHE_TTL", 60))  # seconds, 0 = off
+app.config["CACHE_MAX_ENTRIES"] = int(os.environ.get("CACHE_MAX_ENTRIES", 2048))
+app.config["CACHE_PATH"] = os.environ.get("CACHE_PATH")  # shared SQLite backend for multi-worker setups
+app.config["USER_CACHE_TTL"] = float(os.environ.get("USER_CACHE_TTL", 300))  # load_user records, seconds, 0 = off
+app.config["USER_CACHE_MAX_ENTRIES"] = int(os.environ.get("USER_CACHE_MAX_ENTRIES", 4096))
+app.config["STATS_REBUILD_INTERVAL"] = float(os.environ.get("STATS_REBUILD_INTERVAL", 3600))  # 0 = off
+app.config["LIKES_RECONCILE_INTERVAL"] = float(os.environ.get("LIKES_RECONCILE_INTERVAL", 3600))  # likes + comments counters, 0 = off
+app.config["EXPORT_BATCH_SIZE"] = int(os.environ.get("EXPORT_BATCH_SIZE", 1000))  # rows fetched + written per chunk
+app.config["EXPORT_SAFETY_MARGIN"] = float(os.environ.get("EXPORT_SAFETY_MARGIN", 60))  # seconds X-Export-Until lags the clock
+# Trending feed
+app.config["TRENDING_INTERVAL"] = float(os.environ.get("TRENDING_INTERVAL", 60))  # seconds, 0 = off
+app.config["TRENDING_HALF_LIFE"] = float(os.environ.get("TRENDING_HALF_LIFE", 24))  # hours
+# Comment moderation filter
+app.config["COMMENT_FILTER_REFRESH"] = float(os.environ.get("COMMENT_FILTER_REFRESH", 10))  # s between word-list version checks
+app.config["COMMENT_RATE_PER_USER"] = os.environ.get("COMMENT_RATE_PER_USER", "10/60")  # comments / seconds, "" = off
+app.config["COMMENT_DUPLICATE_WINDOW"] = float(os.environ.get("COMMENT_DUPLICATE_WINDOW", 600))  # s, repeats get flagged, 0 = off
+app.config["COMMENT_MAX_LINKS"] = int(os.environ.get("COMMENT_MAX_LINKS", 3))  # more links = flagged
+app.config["COMMENT_DEEP_SCAN"] = os.environ.get("COMMENT_DEEP_SCAN", "")  # "" = off / obfuscation / "module:Class"
+app.config["COMMENT_SCAN_POLL_INTERVAL"] = float(os.environ.get("COMMENT_SCAN_POLL_INTERVAL", 5))  # seconds
+# Instrumentation (Server-Timing, /api/admin/metrics, slow queries, sampling profiler)
+app.config["METRICS_PATH"] = os.environ.get("METRICS_PATH")  # shared SQLite totals for multi-worker setups
+app.config["METRICS_FLUSH_INTERVAL"] = float(os.environ.get("METRICS_FLUSH_INTERVAL", 10))  # seconds
+app.config["METRICS_TOKEN"] = os.environ.get("METRICS_TOKEN")  # static bearer token for scrapers (else moderator JWT)
+app.config["SLOW_QUERY_MS"] = float(os.environ.get("SLOW_QUERY_MS", 250))  # 0 = log every statement
+app.config["PROFILE_THRESHOLD_MS"] = float(os.environ.get("PROFILE_THRESHOLD_MS", 0))  # dump stacks of slower requests, 0 = off
+app.config["PROFILE_INTERVAL_MS"] = float(os.environ.get("PROFILE_INTERVAL_MS", 5))  # sampling period
+app.config["PROFILE_DIR"] = os.environ.get("PROFILE_DIR", "profiles")
+
 # Email
 app.config["MAIL_SERVER"] = "smtp.gmail.com"
 app.config["MAIL_PORT"] = 587
 app.config["MAIL_USE_TLS"] = True
 app.config["MAIL_USERNAME"] = os.environ.get("MAIL_USERNAME")
 app.config["MAIL_PASSWORD"] = os.environ.get("MAIL_PASSWORD")
+app.config["MAIL_TRANSPORT"] = os.environ.get("MAIL_TRANSPORT", "smtp")  # smtp / file / console / "module:Class"
+app.config["MAIL_FILE_DIR"] = os.environ.get("MAIL_FILE_DIR", "mail_outbox")  # used by the file transport
+app.config["MAIL_WORKERS"] = int(os.environ.get("MAIL_WORKERS", 2))
+app.config["MAIL_BATCH_SIZE"] = int(os.environ.get("MAIL_BATCH_SIZE", 20))
+app.config["MAIL_POLL_INTERVAL"] = float(os.environ.get("MAIL_POLL_INTERVAL", 5))   # seconds
+app.config["MAIL_MAX_ATTEMPTS"] = int(os.environ.get("MAIL_MAX_ATTEMPTS", 5))
+app.config["MAIL_RETRY_BACKOFF"] = float(os.environ.get("MAIL_RETRY_BACKOFF", 30))  # seconds, doubled per attempt
 
 # Cloudinary
 cloudinary.config(
@@ -54,21 +168,113 @@ cloudinary.config(
 # ---------------------------------------------------------------------------
 # 2. EXTENSIONS
 # ---------------------------------------------------------------------------
-db = SQLAlchemy(app)
+class RoutingSession(FlaskSession):
+    """
+    Sends the reads of @read_only views to the "read" engine; flushes, DML and
+    everything else go to the default (writer) engine.
+    """
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if (bind is None and not self._flushing and not getattr(clause, "is_dml", False)
+                and g.get("read_only") and "read" in self._db.engines):
+            return self._db.engines["read"]
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+# expire_on_commit=False: objects stay readable after commit without a reload, which
+# would open a new (write-locking, see 2.1) transaction. Relied on by the claim_jobs
+# callers (UploadPipeline / EmailQueue / CommentScanner.drain work on the leased rows
+# after its commit), and by register, upload_artwork, feature_toggle and the login
+# rehash path, which build their responses from objects they just committed.
+db = SQLAlchemy(app, session_options={"class_": RoutingSession, "expire_on_commit": False})
 jwt = JWTManager(app)
 mail = Mail(app)
 CORS(app)
 os.makedirs(app.config["UPLOAD_FOLDER"], exist_ok=True)
+STAGING_DIR = Path(app.config["UPLOAD_FOLDER"]) / "staging"   # accepted, not yet processed uploads
+ASSETS_DIR = Path(app.config["UPLOAD_FOLDER"]) / "assets"     # LocalStorage backend, served by /media/assets
+PENDING_MEDIA_URL = "/placeholder.svg"  # shown until the upload pipeline has stored the file
+STAGING_DIR.mkdir(parents=True, exist_ok=True)
 
 # ---------------------------------------------------------------------------
-# 2.1. DATABASE SETTINGS (SQLite PRAGMAs)
+# 2.1. DATABASE SETTINGS (SQLite PRAGMAs, reader / writer engines)
 # ---------------------------------------------------------------------------
+# Everything except journal_mode is per connection, so it is set on every new
+# pooled connection rather than once at startup (journal_mode=WAL sticks to the file).
+@event.listens_for(Engine, "connect")
+def _sqlite_pragmas(dbapi_conn, _record):
+    if not isinstance(dbapi_conn, sqlite3.Connection):
+        return
+    cur = dbapi_conn.cursor()
+    cur.execute("PRAGMA journal_mode=WAL;")
+    cur.execute("PRAGMA synchronous=NORMAL;")
+    cur.execute("PRAGMA foreign_keys=ON;")
+    cur.execute(f"PRAGMA busy_timeout={app.config['SQLITE_BUSY_TIMEOUT']};")
+    cur.execute(f"PRAGMA cache_size=-{app.config['SQLITE_CACHE_SIZE_KB']};")
+    cur.execute(f"PRAGMA mmap_size={app.config['SQLITE_MMAP_SIZE']};")
+    cur.execute("PRAGMA temp_store=MEMORY;")
+    cur.close()
+
+def _sqlite_writer(engine):
+    """
+    The writer pool holds a single connection per process, and its transactions
+    start with BEGIN IMMEDIATE: the write lock is taken up front (waiting up to
+    busy_timeout for other processes) instead of failing with "database is
+    locked" when a read transaction later tries to upgrade.
+    """
+    @event.listens_for(engine, "connect")
+    def _manual_begin(dbapi_conn, _record):
+        dbapi_conn.isolation_level = None  # pysqlite would otherwise emit its own deferred BEGIN
+
+    @event.listens_for(engine, "begin")
+    def _begin_immediate(conn):
+        conn.exec_driver_sql("BEGIN IMMEDIATE")
+
+def _sqlite_reader(engine):
+    """
+    Reader transactions start with a deferred BEGIN (pysqlite issues none before
+    a SELECT), so all the reads of one session transaction share a snapshot.
+    """
+    @event.listens_for(engine, "connect")
+    def _query_only(dbapi_conn, _record):
+        dbapi_conn.execute("PRAGMA query_only=ON;")
+        dbapi_conn.isolation_level = None
+
+    @event.listens_for(engine, "begin")
+    def _begin_deferred(conn):
+        conn.exec_driver_sql("BEGIN")
+
 with app.app_context():
-    if db.engine.url.drivername.startswith("sqlite"):
-        with db.engine.begin() as conn:
-            conn.execute(text("PRAGMA journal_mode=WAL;"))
-            conn.execute(text("PRAGMA synchronous=NORMAL;"))
-            conn.execute(text("PRAGMA foreign_keys=ON;"))
+    if "read" in db.engines:
+        _sqlite_writer(db.engines[None])
+        _sqlite_reader(db.engines["read"])
+
+def dispose_engines(close=True):
+    """Drop pooled connections of every engine (close=False after fork: leave the parent's alone)."""
+    with app.app_context():
+        for engine in db.engines.values():
+            engine.dispose(close=close)
+
+def read_only(f):
+    """Run a view's queries on the read pool (writes it does still go to the writer)."""
+    @wraps(f)
+    def decorated(*args, **kwargs):
+        g.read_only = True
+        return f(*args, **kwargs)
+    return decorated
+
+@contextmanager
+def reading():
+    """
+    read_only for a block of background work: its queries go to the read pool,
+    so polling and scanning don't hold the single writer connection; DML still
+    goes to the writer.
+    """
+    previous = g.get("read_only", False)
+    g.read_only = True
+    try:
+        yield
+    finally:
+        g.read_only = previous
 
 # ---------------------------------------------------------------------------
 # 3. MODELS
@@ -124,12 +330,16 @@ class Artwork(db.Model):
     approval_date = db.Column(db.DateTime)
     likes_count = db.Column(db.Integer, default=0)
     views_count = db.Column(db.Integer, default=0)
+    comments_count = db.Column(db.Integer, default=0, server_default="0", nullable=False)  # unflagged only
     is_featured = db.Column(db.Boolean, default=False)
 
     __table_args__ = (
         db.Index('idx_artwork_status', "status"),
-        db.Index('idx_artwork_user', "user_id"),
-        
+        db.Index('idx_artwork_user_gallery', "user_id", "status", "submission_date", "id"),  # keyset gallery
+        db.Index('idx_artwork_status_submitted', "status", "submission_date", "id"),  # keyset feed
+        db.Index('idx_artwork_status_likes', "status", "likes_count"),  # admin top-10
+        db.Index('idx_artwork_featured', "status", "is_featured", "submission_date", "id"),  # featured feed
+
         CheckConstraint(
             "status IN ('pending', 'approved', 'rejected')",
             name="ck_artwork_status_valid"
@@ -153,6 +363,7 @@ class Artwork(db.Model):
             "approval_date": self.approval_date.isoformat() if self.approval_date else None,
             "likes_count": self.likes_count,
             "views_count": self.views_count,
+            "comments_count": self.comments_count,
             "is_featured": self.is_featured
         }
 
@@ -165,7 +376,10 @@ class Like(db.Model):
     user_id = db.Column(db.Integer, db.ForeignKey("user.id"), nullable=False)
     artwork_id = db.Column(db.Integer, db.ForeignKey("artwork.id"), nullable=False)
     timestamp = db.Column(db.DateTime, default=datetime.utcnow)
-    __table_args__ = (db.UniqueConstraint("user_id", "artwork_id"),)
+    __table_args__ = (
+        db.UniqueConstraint("user_id", "artwork_id"),
+        db.Index("idx_like_artwork", "artwork_id"),
+    )
 
     def to_dict(self):
         return {
@@ -184,8 +398,8 @@ class Comment(db.Model):
     is_flagged = db.Column(db.Boolean, default=False)
 
     __table_args__ = (
-        db.Index('idx_comment_artwork', "artwork_id"),
-        db.Index('idx_comment_user', "user_id"),
+        db.Index('idx_comment_artwork_visible', "artwork_id", "is_flagged", "timestamp", "id"),  # keyset thread
+        db.Index('idx_comment_user_recent', "user_id", "timestamp"),  # duplicate-comment check
     )
 
     def to_dict(self):
@@ -223,6 +437,135 @@ class Moderation(db.Model):
             "timestamp": self.timestamp.replace(microsecond=0).isoformat() if self.timestamp else None
         }
 
+class Tag(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String(50), unique=True, nullable=False)  # normalized, see parse_tags
+    artwork_count = db.Column(db.Integer, default=0, nullable=False)  # approved artworks carrying the tag
+
+    __table_args__ = (db.Index("idx_tag_count", "artwork_count"),)
+
+class ArtworkTag(db.Model):
+    artwork_id = db.Column(db.Integer, db.ForeignKey("artwork.id", ondelete="CASCADE"), primary_key=True)
+    tag_id = db.Column(db.Integer, db.ForeignKey("tag.id", ondelete="CASCADE"), primary_key=True)
+
+    __table_args__ = (db.Index("idx_artwork_tag_tag", "tag_id", "artwork_id"),)  # tag -> artworks seek
+
+class ArtworkTrend(db.Model):
+    """Time-decayed engagement score per artwork, maintained by update_trending()."""
+    artwork_id = db.Column(db.Integer, db.ForeignKey("artwork.id", ondelete="CASCADE"), primary_key=True)
+    score = db.Column(db.Float, nullable=False)  # log-domain, see trend_weight
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    artwork = db.relationship("Artwork", backref=db.backref("trend", uselist=False, viewonly=True), viewonly=True)
+
+    __table_args__ = (db.Index("idx_artwork_trend_score", "score"),)
+
+class JobState(db.Model):
+    """Watermarks for incremental background jobs (e.g. last like id scored)."""
+    name = db.Column(db.String(50), primary_key=True)
+    value = db.Column(db.Integer, nullable=False, default=0)
+
+class RevokedToken(db.Model):
+    """JWT denylist: one token (jti:<jti>) or every token of a user issued before revoked_at (user:<id>)."""
+    key = db.Column(db.String(64), primary_key=True)
+    revoked_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    expires_at = db.Column(db.DateTime, nullable=False)  # the covered tokens have expired by then
+
+class BlockedTerm(db.Model):
+    """Comment filter word list (see CommentFilter); matched case-insensitively anywhere in a comment."""
+    id = db.Column(db.Integer, primary_key=True)
+    term = db.Column(db.String(100), unique=True, nullable=False)  # normalized by normalize_term
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+class StatCounter(db.Model):
+    """Materialized counters behind admin_stats / dataset_summary (see bump_stats)."""
+    key = db.Column(db.String(120), primary_key=True)  # users, artworks, status:<s>, featured, likes, year:<y>, category:<c>
+    value = db.Column(db.Integer, nullable=False, default=0)
+
+class ArtistSummary(db.Model):
+    """Per-artist totals over their approved artworks, behind the gallery header (see bump_artist_summaries)."""
+    user_id = db.Column(db.Integer, db.ForeignKey("user.id", ondelete="CASCADE"), primary_key=True)
+    artworks_count = db.Column(db.Integer, default=0, server_default="0", nullable=False)
+    likes_total = db.Column(db.Integer, default=0, server_default="0", nullable=False)
+    views_total = db.Column(db.Integer, default=0, server_default="0", nullable=False)
+    latest_upload = db.Column(db.DateTime)  # submission_date of the newest approved artwork
+
+class JobMixin:
+    """Columns shared by the DB-backed job queues (see claim_jobs)."""
+    status = db.Column(db.String(20), default="queued", nullable=False)  # queued / running / done / failed
+    attempts = db.Column(db.Integer, default=0, nullable=False)
+    next_attempt_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    claim_token = db.Column(db.String(32))
+    last_error = db.Column(db.Text)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+class UploadJob(JobMixin, db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    artwork_id = db.Column(db.Integer, db.ForeignKey("artwork.id", ondelete="CASCADE"), nullable=False)
+    staging_path = db.Column(db.String(255), nullable=False)
+    content_hash = db.Column(db.String(64))  # sha256 of the staged file
+
+    __table_args__ = (
+        db.Index("idx_upload_job_due", "status", "next_attempt_at"),
+        db.Index("idx_upload_job_claim", "claim_token"),
+    )
+
+class ArtworkDerivative(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    artwork_id = db.Column(db.Integer, db.ForeignKey("artwork.id", ondelete="CASCADE"), nullable=False)
+    variant = db.Column(db.String(20), nullable=False)  # thumb / medium / large
+    format = db.Column(db.String(10), nullable=False)   # webp / jpeg
+    url = db.Column(db.String(255), nullable=False)
+    width = db.Column(db.Integer)
+    height = db.Column(db.Integer)
+    bytes = db.Column(db.Integer)
+
+    __table_args__ = (db.UniqueConstraint("artwork_id", "variant", "format"),)
+
+    def to_dict(self):
+        return {
+            "variant": self.variant,
+            "format": self.format,
+            "url": self.url,
+            "width": self.width,
+            "height": self.height,
+            "bytes": self.bytes,
+        }
+
+class Asset(db.Model):
+    """Content-addressed index of stored images: one row per distinct file body."""
+    id = db.Column(db.Integer, primary_key=True)
+    sha256 = db.Column(db.String(64), unique=True, nullable=False)
+    phash = db.Column(db.String(16))  # 64-bit dHash, hex; equal/near values = visually similar
+    size = db.Column(db.Integer)
+    file_url = db.Column(db.String(255), nullable=False)
+    thumbnail_url = db.Column(db.String(255))
+    artwork_id = db.Column(db.Integer, db.ForeignKey("artwork.id", ondelete="SET NULL"))  # owner of the derivatives
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    __table_args__ = (db.Index("idx_asset_phash", "phash"),)
+
+class CommentScanJob(JobMixin, db.Model):
+    """Deep scan of a visible comment, off the request path (COMMENT_DEEP_SCAN)."""
+    id = db.Column(db.Integer, primary_key=True)
+    comment_id = db.Column(db.Integer, db.ForeignKey("comment.id", ondelete="CASCADE"), nullable=False)
+
+    __table_args__ = (
+        db.Index("idx_comment_scan_job_due", "status", "next_attempt_at"),
+        db.Index("idx_comment_scan_job_claim", "claim_token"),
+    )
+
+class EmailJob(JobMixin, db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    recipient = db.Column(db.String(120), nullable=False)
+    subject = db.Column(db.String(255), nullable=False)
+    body = db.Column(db.Text, nullable=False)
+    sent_at = db.Column(db.DateTime)
+
+    __table_args__ = (
+        db.Index("idx_email_job_due", "status", "next_attempt_at"),
+        db.Index("idx_email_job_claim", "claim_token"),
+    )
+
 # ---------------------------------------------------------------------------
 # 4. UTILITIES
 # ---------------------------------------------------------------------------
@@ -235,32 +578,1815 @@ def hash_dob(dob):
 def allowed_file(filename):
     return "." in filename and filename.rsplit(".", 1)[1].lower() in {"png", "jpg", "jpeg", "gif", "mp4"}
 
-def upload_to_cloudinary(file):
+def hash_stream(src, dst=None, chunk_size=1024 * 1024):
+    """
+    sha256 of a binary stream read in chunks, optionally copying it to *dst* in
+    the same pass so the body is never held in memory. Returns (hexdigest, size).
+    """
+    digest, size = hashlib.sha256(), 0
+    while chunk := src.read(chunk_size):
+        digest.update(chunk)
+        size += len(chunk)
+        if dst is not None:
+            dst.write(chunk)
+    return digest.hexdigest(), size
+
+def stage_upload(file):
+    """Stream an uploaded file into STAGING_DIR under a unique name; returns (path, sha256)."""
+    ext = secure_filename(file.filename).rsplit(".", 1)[-1].lower()
+    path = STAGING_DIR / f"{uuid.uuid4().hex}.{ext}"
+    with open(path, "wb") as out:
+        digest, _ = hash_stream(file.stream, out)
+    return path, digest
+
+def media_url(path):
+    """Public URL of a file under ASSETS_DIR (served by the /media/assets route)."""
+    return "/media/assets/" + Path(path).relative_to(ASSETS_DIR).as_posix()
+
+def queue_email(to, subject, body):
+    """
+    Add an outbound email to the job queue in the caller's transaction; it is
+    persisted by the caller's commit and delivered by the mail workers (4.4).
+    """
+    db.session.add(EmailJob(recipient=to, subject=subject, body=body))
+    db.session.info["wake_mail"] = True
+
+def parse_bool(value):
+    return str(value).lower() in {"1", "true", "yes", "on"}
+
+def limit_arg(name, default, maximum=100):
+    """Integer query arg clamped to 1..maximum (0 or a negative LIMIT is no limit on SQLite, an error on PostgreSQL)."""
+    return max(1, min(request.args.get(name, default, type=int), maximum))
+
+def per_page_arg(default, maximum=100):
+    """?per_page= clamped to 1..maximum."""
+    return limit_arg("per_page", default, maximum)
+
+def encode_cursor(values):
+    raw = json.dumps([v.isoformat() if isinstance(v, datetime) else v for v in values], separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+def decode_cursor(token, columns):
+    """Turn an opaque cursor back into typed values for *columns*; raises ValueError."""
     try:
-        return cloudinary.uploader.upload(file)["secure_url"]
-    except Exception as e:
-        print("Cloudinary upload error:", e)
-        return None
+        values = json.loads(base64.urlsafe_b64decode(token + "=" * (-len(token) % 4)))
+    except Exception:
+        raise ValueError("Invalid cursor")
+    if not isinstance(values, list) or len(values) != len(columns):
+        raise ValueError("Invalid cursor")
+    return [cursor_value(c, v) for c, v in zip(columns, values)]
+
+def cursor_value(column, value):
+    """Check one decoded cursor value against its column's type (ISO string for DateTime, number otherwise)."""
+    if isinstance(column.type, db.DateTime):
+        if value is None:
+            return None
+        if isinstance(value, str):
+            try:
+                return datetime.fromisoformat(value)
+            except ValueError:
+                pass
+    elif isinstance(value, (int, float)) and not isinstance(value, bool):
+        if isinstance(column.type, db.Integer) and isinstance(value, int) and -2 ** 63 <= value < 2 ** 63:
+            return value
+        if isinstance(column.type, db.Float) and -sys.float_info.max <= value <= sys.float_info.max:
+            return float(value)
+    raise ValueError("Invalid cursor")
+
+def keyset_page(query, columns, per_page, cursor=None, descending=True):
+    """
+    Seek pagination: WHERE (cols) < (cursor) ORDER BY cols LIMIT n+1.
+    The last column must be unique (the PK) so the order is total.
+    Returns (rows, next_cursor); next_cursor is None on the last page.
+    """
+    per_page = max(per_page, 1)
+    if cursor:
+        key, after = tuple_(*columns), tuple_(*decode_cursor(cursor, columns))
+        query = query.filter(key < after if descending else key > after)
+    order = [c.desc() if descending else c.asc() for c in columns]
+    rows = query.order_by(*order).limit(per_page + 1).all()
+    if len(rows) <= per_page:
+        return rows, None
+    rows = rows[:per_page]
+    return rows, encode_cursor([getattr(rows[-1], c.key) for c in columns])
+
+def insert_ignore(table):
+    """INSERT … ON CONFLICT DO NOTHING: rows hitting a unique constraint are skipped (rowcount 0)."""
+    dialect = postgresql if db.engine.dialect.name == "postgresql" else sqlite_dialect
+    return dialect.insert(table).on_conflict_do_nothing()
+
+def parse_tags(value):
+    """Split a comma-separated tag string into normalized names (trimmed, lower-case, unique, <= 50 chars)."""
+    names = (" ".join(t.split()).lower()[:50] for t in (value or "").split(","))
+    return list(dict.fromkeys(n for n in names if n))
+
+def set_artwork_tags(artwork_id, value):
+    """Link an artwork to the tags in *value*, creating missing tag rows."""
+    names = parse_tags(value)
+    if not names:
+        return
+    db.session.execute(insert_ignore(Tag.__table__), [{"name": n, "artwork_count": 0} for n in names])
+    db.session.execute(insert_ignore(ArtworkTag.__table__).from_select(
+        ["artwork_id", "tag_id"], select(db.literal(artwork_id), Tag.id).where(Tag.name.in_(names))
+    ))
+
+def adjust_tag_counts(artwork_ids, sign=1):
+    """Move tag.artwork_count when artworks enter (+1) or leave (-1) the approved set."""
+    linked = select(ArtworkTag.tag_id).where(ArtworkTag.artwork_id.in_(artwork_ids))
+    moved = select(db.func.count()).where(ArtworkTag.tag_id == Tag.id, ArtworkTag.artwork_id.in_(artwork_ids))
+    db.session.execute(
+        update(Tag).where(Tag.id.in_(linked)).values(artwork_count=Tag.artwork_count + sign * moved.scalar_subquery())
+    )
+    invalidate_on_commit("tags")
+
+def filter_by_tags(query, names, mode="all"):
+    """Restrict an Artwork query to artworks carrying all (or, with mode="any", any) of *names*."""
+    matched = select(ArtworkTag.artwork_id).join(Tag, Tag.id == ArtworkTag.tag_id).where(Tag.name.in_(names))
+    if mode != "any":
+        matched = matched.group_by(ArtworkTag.artwork_id).having(db.func.count() == len(names))
+    return query.filter(Artwork.id.in_(matched))
+
+def sync_tags():
+    """Backfill tag / artwork_tag from Artwork.tags and recount; used by bootstrap."""
+    for artwork_id, tags in db.session.query(Artwork.id, Artwork.tags).filter(Artwork.tags.isnot(None), Artwork.tags != ""):
+        set_artwork_tags(artwork_id, tags)
+    approved = (
+        select(db.func.count()).select_from(ArtworkTag).join(Artwork, Artwork.id == ArtworkTag.artwork_id)
+        .where(ArtworkTag.tag_id == Tag.id, Artwork.status == "approved").scalar_subquery()
+    )
+    db.session.execute(update(Tag).values(artwork_count=approved))
+    db.session.commit()
 
-def send_email(to, subject, body):
-    try:
-        msg = Message(subject, recipients=[to], body=body, sender=app.config["MAIL_USERNAME"])
-        mail.send(msg)
-        return True
-    except Exception as e:
-        print("Email error:", e)
-        return False
+def feed_item(art):
+    """Feed card payload for an artwork loaded with_artist(full_name, year_of_study)."""
+    return {
+        "id": art.id,
+        "title": art.title,
+        "description": art.description,
+        "medium": art.medium,
+        "category": art.category,
+        "file_url": art.file_url,
+        "thumbnail_url": art.thumbnail_url,
+        "tags": art.tags,
+        "creation_date": art.creation_date.isoformat() if art.creation_date else None,
+        "submission_date": art.submission_date.isoformat(),
+        "likes_count": art.likes_count,
+        "views_count": art.views_count,
+        "comments_count": art.comments_count,
+        "is_featured": art.is_featured,
+        "artist": {
+            "id": art.artist.id,
+            "full_name": art.artist.full_name,
+            "year_of_study": art.artist.year_of_study,
+        },
+    }
+
+def with_artist(query, *columns):
+    """Load each artwork's artist in the same SELECT (JOIN), fetching only *columns* of User."""
+    return query.options(joinedload(Artwork.artist).load_only(User.id, *columns))
+
+def with_author(query, *columns):
+    """Same as with_artist() for a comment's user."""
+    return query.options(joinedload(Comment.user).load_only(User.id, *columns))
+
+def current_user_id():
+    """The authenticated user's id (tokens carry it as a string subject)."""
+    return int(get_jwt_identity())
+
+def current_role():
+    """Role from the signed token claims; tokens issued before claims existed fall back to the user record."""
+    claims = get_jwt()
+    if "role" in claims:
+        return claims["role"]
+    user = load_user(current_user_id())
+    return user["role"] if user else None
 
 def moderator_required(f):
     @wraps(f)
     @jwt_required()
     def decorated(*args, **kwargs):
-        user = User.query.get(get_jwt_identity())
-        if not user or user.role not in {"moderator", "admin"}:
+        if current_role() not in {"moderator", "admin"}:
             return jsonify({"error": "Moderator access required"}), 403
         return f(*args, **kwargs)
     return decorated
 
+# ---------------------------------------------------------------------------
+# 4.1. BACKGROUND TASKS
+# ---------------------------------------------------------------------------
+class PeriodicTask:
+    """
+    Runs fn() inside an app context every *interval* seconds on a daemon thread.
+    Threads don't survive fork(), so each worker process starts its own copy
+    lazily from the first request it serves (see start_background_tasks).
+    """
+    registry = []
+
+    def __init__(self, name, interval, fn):
+        self.name = name
+        self.interval = interval
+        self.fn = fn
+        self._pid = None
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        PeriodicTask.registry.append(self)
+
+    def ensure_started(self):
+        if self.interval <= 0 or self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+            threading.Thread(target=self._run, name=self.name, daemon=True).start()
+
+    def wake(self):
+        """Run the next iteration now instead of waiting for the timer."""
+        self._wake.set()
+
+    def running(self):
+        """Whether this process has a thread for the task (wake() is a no-op otherwise)."""
+        return self.interval > 0 and self._pid == os.getpid()
+
+    def _run(self):
+        while True:
+            self._wake.wait(self.interval)
+            self._wake.clear()
+            try:
+                with app.app_context():
+                    self.fn()
+            except Exception as e:
+                print(f"{self.name} error:", e)
+
+@app.before_request
+def start_background_tasks():
+    for task in PeriodicTask.registry:
+        task.ensure_started()
+
+def local_store(path):
+    """Open a small side SQLite file shared by the workers of one host."""
+    conn = sqlite3.connect(path, timeout=5, isolation_level=None)
+    conn.execute("PRAGMA journal_mode=WAL;")
+    conn.execute("PRAGMA synchronous=NORMAL;")
+    return conn
+
+# ---------------------------------------------------------------------------
+# 4.2. WRITE-BEHIND VIEW COUNTER
+# ---------------------------------------------------------------------------
+class ViewCounter:
+    """
+    Coalesces Artwork.views_count increments in memory and writes them with
+    one batched UPDATE per flush, so detail views never open a write
+    transaction. With *spool_path* set, each flush moves the worker's deltas
+    into a shared SQLite spool, where every worker sees them (pending()) and
+    they survive the worker; the spool is applied to the database by whichever
+    worker flushes first once the interval has passed or it holds *threshold*
+    views, and kept when that write fails.
+    """
+
+    def __init__(self, threshold=500, spool_path=None):
+        self.threshold = threshold
+        self.spool_path = spool_path
+        self._pending = {}
+        self._total = 0
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self.task = PeriodicTask("view-counter-flush", app.config["VIEW_FLUSH_INTERVAL"], self.flush)
+
+    def incr(self, artwork_id, n=1):
+        with self._lock:
+            self._pending[artwork_id] = self._pending.get(artwork_id, 0) + n
+            self._total += n
+            due = self._total >= self.threshold
+        if not due:
+            return
+        if self.task.running():
+            self.task.wake()
+            return
+        try:  # no flush thread here (VIEW_FLUSH_INTERVAL=0, or not started yet): flush inline
+            self.flush()
+        except Exception as e:
+            print("View counter flush error:", e)
+
+    def pending(self, artwork_ids):
+        """Views recorded but not yet in the artwork table, as {artwork_id: delta}."""
+        ids = set(artwork_ids)
+        with self._lock:
+            result = {i: self._pending[i] for i in ids if i in self._pending}
+        if self.spool_path and ids:
+            marks = ",".join("?" * len(ids))
+            rows = self._spool().execute(f"SELECT artwork_id, delta FROM view_spool WHERE artwork_id IN ({marks})", list(ids))
+            for artwork_id, delta in rows:
+                result[artwork_id] = result.get(artwork_id, 0) + delta
+        return result
+
+    def flush(self, force=False):
+        """Write this worker's deltas to the database, or to the spool (applied when due, or now with *force*)."""
+        with self._lock:
+            batch, self._pending, self._total = self._pending, {}, 0
+        try:
+            if self.spool_path:
+                if batch:
+                    self._spool().executemany(
+                        "INSERT INTO view_spool (artwork_id, delta) VALUES (?, ?) "
+                        "ON CONFLICT(artwork_id) DO UPDATE SET delta = delta + excluded.delta",
+                        batch.items(),
+                    )
+                batch = {}
+                self._apply_spool(force)
+            elif batch:
+                self._apply(batch)
+        except Exception:
+            # Put the deltas back so the next flush retries them
+            with self._lock:
+                for k, v in batch.items():
+                    self._pending[k] = self._pending.get(k, 0) + v
+                    self._total += v
+            raise
+
+    def _apply(self, batch):
+        with app.app_context(), db.engine.begin() as conn:
+            conn.execute(self._update_stmt(), [{"aid": k, "delta": v} for k, v in batch.items()])
+            artists = self._update_artists(conn, batch)
+            now = datetime.utcnow()
+            add_trend_events(conn, [(k, TREND_WEIGHTS["view"] * v, now) for k, v in batch.items()])
+        response_cache.invalidate(*(f"views:{k}" for k in batch), *(f"artist:{u}" for u in artists))
+
+    @staticmethod
+    def _update_stmt():
+        t = Artwork.__table__
+        return (
+            update(t)
+            .where(t.c.id == bindparam("aid"))
+            .values(views_count=db.func.coalesce(t.c.views_count, 0) + bindparam("delta"))
+        )
+
+    @staticmethod
+    def _update_artists(conn, batch):
+        """Add the batch to ArtistSummary.views_total, one UPDATE per artist; returns their ids."""
+        a, t = Artwork.__table__, ArtistSummary.__table__
+        artists = Counter()
+        for artwork_id, user_id in conn.execute(select(a.c.id, a.c.user_id).where(a.c.id.in_(list(batch)))):
+            artists[user_id] += batch[artwork_id]
+        if artists:
+            conn.execute(
+                update(t).where(t.c.user_id == bindparam("uid")).values(views_total=t.c.views_total + bindparam("delta")),
+                [{"uid": u, "delta": v} for u, v in artists.items()],
+            )
+        return artists
+
+    def _spool(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = local_store(self.spool_path)
+            conn.execute("CREATE TABLE IF NOT EXISTS view_spool (artwork_id INTEGER PRIMARY KEY, delta INTEGER NOT NULL)")
+            conn.execute("CREATE TABLE IF NOT EXISTS view_spool_state (id INTEGER PRIMARY KEY CHECK (id = 1), applied_at REAL NOT NULL)")
+            conn.execute("INSERT OR IGNORE INTO view_spool_state (id, applied_at) VALUES (1, ?)", (time.time(),))
+            self._local.conn, self._local.pid = conn, os.getpid()
+        return conn
+
+    def _apply_spool(self, force):
+        """
+        Apply the spool to the database if it is due. The spool's write lock is
+        held until the database commit, so only one worker applies it and a
+        failed write leaves the rows in place for the next attempt.
+        """
+        conn = self._spool()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            rows = dict(conn.execute("SELECT artwork_id, delta FROM view_spool").fetchall())
+            applied_at = conn.execute("SELECT applied_at FROM view_spool_state").fetchone()[0]
+            due = force or sum(rows.values()) >= self.threshold or time.time() - applied_at >= self.task.interval
+            if not (rows and due):
+                conn.execute("ROLLBACK")
+                return
+            self._apply(rows)
+            conn.execute("DELETE FROM view_spool")
+            conn.execute("UPDATE view_spool_state SET applied_at = ?", (time.time(),))
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+view_counter = ViewCounter(app.config["VIEW_FLUSH_THRESHOLD"], app.config["VIEW_SPOOL_PATH"])
+atexit.register(view_counter.flush)
+
+def with_pending_views(items):
+    """
+    Add views that haven't been flushed yet to serialized artworks (dicts with
+    id/views_count). A cached response built from them is tagged views:<id>,
+    so the next flush of those counts invalidates it instead of the TTL.
+    """
+    cache_tags(*(f"views:{i['id']}" for i in items))
+    pending = view_counter.pending([i["id"] for i in items])
+    for i in items:
+        i["views_count"] = (i["views_count"] or 0) + pending.get(i["id"], 0)
+    return items
+
+# ---------------------------------------------------------------------------
+# 4.3. COUNTER RECONCILER (likes, comments, artist summaries)
+# ---------------------------------------------------------------------------
+def reconcile_counts(batch_size=5000):
+    """
+    Repair drift of the denormalized Artwork counters (likes_count,
+    comments_count) against the like / comment tables, then of ArtistSummary.
+    Walks artwork ids in ranges; each range costs one grouped COUNT per counter
+    over idx_like_artwork / idx_comment_artwork_visible, and only drifted rows
+    are rewritten (from a correlated COUNT, so a like or comment landing mid-run
+    is never overwritten by a stale value). Returns the number of rows fixed.
+    """
+    a, l, c = Artwork.__table__, Like.__table__, Comment.__table__
+    counters = [
+        (a.c.likes_count, l.c.artwork_id, []),
+        (a.c.comments_count, c.c.artwork_id, [c.c.is_flagged == db.false()]),
+    ]
+    last_id, fixed = 0, 0
+    with reading():  # the scan runs on the read pool; only drifted rows reach the writer
+        while True:
+            rows = db.session.execute(
+                select(a.c.id, a.c.likes_count, a.c.comments_count).where(a.c.id > last_id).order_by(a.c.id).limit(batch_size)
+            ).all()
+            if not rows:
+                break
+            lo, hi = rows[0].id, rows[-1].id
+            for counter, fk, where in counters:
+                counts = dict(db.session.execute(
+                    select(fk, db.func.count()).where(fk.between(lo, hi), *where).group_by(fk)
+                ).all())
+                drifted = [r.id for r in rows if (getattr(r, counter.key) or 0) != counts.get(r.id, 0)]
+                if drifted:
+                    live = select(db.func.count()).where(fk == a.c.id, *where).scalar_subquery()
+                    db.session.execute(update(a).where(a.c.id.in_(drifted)).values({counter: live}))
+                    db.session.commit()
+                    fixed += len(drifted)
+            db.session.rollback()  # end the read transaction between ranges
+            last_id = hi
+    return fixed + reconcile_artist_summaries(batch_size)
+
+def reconcile_artist_summaries(batch_size=5000):
+    """
+    The same for ArtistSummary: walks user ids in ranges, compares the rows
+    with one grouped aggregate of approved artworks over idx_artwork_user_gallery,
+    and rewrites drifted or missing rows from correlated aggregates.
+    """
+    a, t, u = Artwork.__table__, ArtistSummary.__table__, User.__table__
+    mine = (a.c.user_id == t.c.user_id, a.c.status == "approved")
+    live_values = {
+        "artworks_count": select(db.func.count()).where(*mine).scalar_subquery(),
+        "likes_total": select(db.func.coalesce(db.func.sum(a.c.likes_count), 0)).where(*mine).scalar_subquery(),
+        "views_total": select(db.func.coalesce(db.func.sum(a.c.views_count), 0)).where(*mine).scalar_subquery(),
+        "latest_upload": select(db.func.max(a.c.submission_date)).where(*mine).scalar_subquery(),
+    }
+    empty = (0, 0, 0, None)
+    last_id, fixed = 0, 0
+    with reading():
+        while True:
+            ids = db.session.execute(select(u.c.id).where(u.c.id > last_id).order_by(u.c.id).limit(batch_size)).scalars().all()
+            if not ids:
+                break
+            lo, hi = ids[0], ids[-1]
+            live = {r[0]: tuple(r[1:]) for r in db.session.execute(
+                select(a.c.user_id, db.func.count(), db.func.coalesce(db.func.sum(a.c.likes_count), 0),
+                       db.func.coalesce(db.func.sum(a.c.views_count), 0), db.func.max(a.c.submission_date))
+                .where(a.c.user_id.between(lo, hi), a.c.status == "approved").group_by(a.c.user_id)
+            )}
+            stored = {r[0]: tuple(r[1:]) for r in db.session.execute(
+                select(t.c.user_id, t.c.artworks_count, t.c.likes_total, t.c.views_total, t.c.latest_upload)
+                .where(t.c.user_id.between(lo, hi))
+            )}
+            drifted = [i for i in live.keys() | stored.keys() if live.get(i, empty) != stored.get(i, empty)]
+            if drifted:
+                db.session.execute(insert_ignore(t), [{"user_id": i} for i in drifted])
+                db.session.execute(update(t).where(t.c.user_id.in_(drifted)).values(live_values))
+                invalidate_on_commit(*(f"artist:{i}" for i in drifted))
+                db.session.commit()
+                fixed += len(drifted)
+            db.session.rollback()
+            last_id = hi
+    return fixed
+
+count_reconciler = PeriodicTask("count-reconciler", app.config["LIKES_RECONCILE_INTERVAL"], reconcile_counts)
+
+# ---------------------------------------------------------------------------
+# 4.4. JOB QUEUES + OUTBOUND EMAIL
+# ---------------------------------------------------------------------------
+def claim_jobs(model, limit, lease_seconds):
+    """
+    Lease up to *limit* due jobs of a JobMixin model: queued ones, plus running
+    ones whose lease ran out (their worker died). A single UPDATE marks them,
+    so two workers or processes never claim the same row. Commits the claim
+    and returns the claimed rows. An idle poll is one read on the read pool.
+    """
+    t = model.__table__
+    now, token = datetime.utcnow(), uuid.uuid4().hex
+    is_due = (t.c.status.in_(("queued", "running")), t.c.next_attempt_at <= now)
+    with reading():
+        any_due = db.session.execute(select(t.c.id).where(*is_due).limit(1)).first()
+        db.session.commit()
+    if any_due is None:
+        return []
+    due_ids = select(t.c.id).where(*is_due).order_by(t.c.id).limit(limit).scalar_subquery()
+    db.session.execute(
+        update(t).where(t.c.id.in_(due_ids), *is_due).values(
+            status="running",
+            claim_token=token,
+            attempts=t.c.attempts + 1,
+            next_attempt_at=now + timedelta(seconds=lease_seconds),
+        )
+    )
+    db.session.commit()
+    jobs = model.query.filter_by(claim_token=token).order_by(model.id).all()
+    db.session.commit()  # don't hold a transaction while the caller works on the jobs
+    return jobs
+
+def retry_delay(attempts, base):
+    return timedelta(seconds=min(base * 2 ** (attempts - 1), 3600))
+
+def _message(job):
+    sender = app.config["MAIL_USERNAME"] or "ARTGRID <no-reply@artgrid.local>"
+    return Message(job.subject, recipients=[job.recipient], body=job.body, sender=sender)
+
+class SMTPTransport:
+    """Flask-Mail; the whole batch goes over one SMTP connection."""
+    def send_batch(self, jobs):
+        errors = {}
+        try:
+            with mail.connect() as conn:
+                for job in jobs:
+                    try:
+                        conn.send(_message(job))
+                    except Exception as e:
+                        errors[job.id] = str(e)
+        except Exception as e:  # connect / login failed
+            errors.update({job.id: str(e) for job in jobs if job.id not in errors})
+        return errors
+
+class FileTransport:
+    """Writes each message as an .eml file into MAIL_FILE_DIR (offline / tests)."""
+    def send_batch(self, jobs):
+        out = Path(app.config["MAIL_FILE_DIR"])
+        out.mkdir(parents=True, exist_ok=True)
+        for job in jobs:
+            (out / f"{job.id:08d}.eml").write_text(_message(job).as_string(), encoding="utf-8")
+        return {}
+
+class ConsoleTransport:
+    """Prints messages instead of sending them (local debugging)."""
+    def send_batch(self, jobs):
+        for job in jobs:
+            print(f"[mail] to={job.recipient} subject={job.subject!r}\n{job.body}\n")
+        return {}
+
+MAIL_TRANSPORTS = {"smtp": SMTPTransport, "file": FileTransport, "console": ConsoleTransport}
+
+class EmailQueue:
+    """Drains EmailJob rows with MAIL_WORKERS threads per process, retrying failures with backoff."""
+
+    def __init__(self, transport):
+        self.transport = transport
+        self.workers = [
+            PeriodicTask(f"mail-worker-{i}", app.config["MAIL_POLL_INTERVAL"], self.drain)
+            for i in range(app.config["MAIL_WORKERS"])
+        ]
+
+    def wake(self):
+        for worker in self.workers:
+            worker.wake()
+
+    def drain(self):
+        batch_size = app.config["MAIL_BATCH_SIZE"]
+        while True:
+            jobs = claim_jobs(EmailJob, batch_size, lease_seconds=300)
+            if not jobs:
+                return
+            try:
+                errors = self.transport.send_batch(jobs)
+            except Exception as e:
+                errors = {job.id: str(e) for job in jobs}
+            now = datetime.utcnow()
+            for job in jobs:
+                if job.id not in errors:
+                    job.status, job.sent_at, job.last_error = "done", now, None
+                elif job.attempts >= app.config["MAIL_MAX_ATTEMPTS"]:
+                    job.status, job.last_error = "failed", errors[job.id]
+                else:
+                    job.status, job.last_error = "queued", errors[job.id]
+                    job.next_attempt_at = now + retry_delay(job.attempts, app.config["MAIL_RETRY_BACKOFF"])
+                    print("Email error:", errors[job.id])
+            db.session.commit()
+            if len(jobs) < batch_size:
+                return
+
+def load_mail_transport(name):
+    cls = MAIL_TRANSPORTS.get(name) or import_string(name.replace(":", "."))
+    return cls()
+
+email_queue = EmailQueue(load_mail_transport(app.config["MAIL_TRANSPORT"]))
+
+@event.listens_for(Session, "after_commit")
+def _wake_mail_workers(session):
+    if session.info.pop("wake_mail", False):
+        email_queue.wake()
+
+# ---------------------------------------------------------------------------
+# 4.5. UPLOAD PIPELINE (derivatives + storage)
+# ---------------------------------------------------------------------------
+def parse_sizes(spec):
+    """"thumb=320,medium=1024" -> {"thumb": 320, "medium": 1024}"""
+    return {name.strip(): int(px) for name, px in (part.split("=") for part in spec.split(",") if part.strip())}
+
+def perceptual_hash(im):
+    """64-bit difference hash (dHash) of a PIL image, as 16 hex chars."""
+    px = list(im.convert("L").resize((9, 8), Image.LANCZOS).getdata())
+    bits = sum(1 << i for i in range(64) if px[i // 8 * 9 + i % 8] > px[i // 8 * 9 + i % 8 + 1])
+    return f"{bits:016x}"
+
+def render_derivatives(src, out_dir, sizes, phash=False):
+    """
+    Runs in the upload process pool: resize *src* to each longest-edge size and
+    write WebP + JPEG copies into *out_dir*. Returns (files, phash) where files
+    is a list of dicts describing them; non-image uploads (e.g. mp4) give ([], None).
+    """
+    try:
+        im = Image.open(src)
+        im.seek(0)  # first frame of animated GIFs
+        im = ImageOps.exif_transpose(im).convert("RGB")
+    except Exception:
+        return [], None
+    out = []
+    longest = max(im.size)
+    for variant, px in sorted(sizes.items(), key=lambda kv: kv[1]):
+        if px > longest and out:
+            break  # never upscale; the smallest variant is always produced
+        copy = im.copy()
+        copy.thumbnail((px, px))
+        for fmt, ext, opts in (("webp", "webp", {"quality": 80, "method": 4}),
+                               ("jpeg", "jpg", {"quality": 82, "optimize": True, "progressive": True})):
+            path = Path(out_dir) / f"{variant}.{ext}"
+            copy.save(path, fmt.upper(), **opts)
+            out.append({"variant": variant, "format": fmt, "path": str(path),
+                        "width": copy.width, "height": copy.height, "bytes": path.stat().st_size})
+    return out, (perceptual_hash(im) if phash else None)
+
+class LocalStorage:
+    """Keeps assets under uploads/assets, served by /media."""
+    def put(self, path, key):
+        dest = ASSETS_DIR / key
+        dest.parent.mkdir(parents=True, exist_ok=True)
+        shutil.copyfile(path, dest)
+        return media_url(dest)
+
+class CloudinaryStorage:
+    def put(self, path, key):
+        public_id = "artgrid/" + key.rsplit(".", 1)[0]
+        return cloudinary.uploader.upload(str(path), public_id=public_id, resource_type="auto")["secure_url"]
+
+STORAGE_BACKENDS = {"local": LocalStorage, "cloudinary": CloudinaryStorage}
+
+class UploadPipeline:
+    """
+    Turns staged uploads into stored originals + derivatives. A dispatcher
+    thread claims UploadJob rows, renders them in a process pool (Pillow is
+    CPU-bound), pushes the files through the storage backend and points the
+    artwork at the new URLs.
+    """
+
+    def __init__(self, storage, workers, sizes):
+        self.storage = storage
+        self.workers = workers
+        self.sizes = sizes
+        self._pool = None
+        self._pool_pid = None
+        self.task = PeriodicTask("upload-pipeline", app.config["UPLOAD_POLL_INTERVAL"], self.drain)
+
+    def pool(self):
+        if self._pool_pid != os.getpid():
+            self._pool = ProcessPoolExecutor(max_workers=self.workers)
+            self._pool_pid = os.getpid()
+        return self._pool
+
+    def drain(self):
+        while True:
+            jobs = claim_jobs(UploadJob, self.workers * 2, lease_seconds=600)
+            if not jobs:
+                return
+            tmp_dirs = {job.id: tempfile.mkdtemp(prefix="artgrid-") for job in jobs}
+            futures = {job.id: self.pool().submit(render_derivatives, job.staging_path, tmp_dirs[job.id],
+                                                  self.sizes, app.config["PHASH_ENABLED"])
+                       for job in jobs}
+            for job in jobs:
+                try:
+                    self.finish(job, *futures[job.id].result())
+                    job.status, job.last_error = "done", None
+                except Exception as e:
+                    print("Upload pipeline error:", e)
+                    db.session.rollback()  # drop finish()'s partial changes; the job row reloads as claimed
+                    job.status = "failed" if job.attempts >= app.config["UPLOAD_MAX_ATTEMPTS"] else "queued"
+                    job.last_error = str(e)
+                    job.next_attempt_at = datetime.utcnow() + retry_delay(job.attempts, app.config["UPLOAD_RETRY_BACKOFF"])
+                finally:
+                    shutil.rmtree(tmp_dirs[job.id], ignore_errors=True)
+                db.session.commit()
+                if job.status == "done":
+                    Path(job.staging_path).unlink(missing_ok=True)
+
+    def finish(self, job, derivatives, phash):
+        # Store the files before touching the DB, so the write transaction doesn't span the uploads
+        prefix = f"{job.artwork_id}/{uuid.uuid4().hex[:8]}"
+        file_url = self.storage.put(job.staging_path, f"{prefix}/original{Path(job.staging_path).suffix}")
+        stored = [dict(d, url=self.storage.put(d["path"], f"{prefix}/{Path(d['path']).name}")) for d in derivatives]
+        art = db.session.get(Artwork, job.artwork_id)
+        if art is None:  # deleted while queued
+            return
+        art.file_url = file_url
+        ArtworkDerivative.query.filter_by(artwork_id=art.id).delete()
+        thumb_url = None
+        for d in stored:  # smallest variant first
+            db.session.add(ArtworkDerivative(artwork_id=art.id, variant=d["variant"], format=d["format"], url=d["url"],
+                                             width=d["width"], height=d["height"], bytes=d["bytes"]))
+            if thumb_url is None and d["format"] == "webp":
+                thumb_url = d["url"]
+        art.thumbnail_url = thumb_url or art.file_url
+        invalidate_on_commit(f"artwork:{art.id}")
+        if job.content_hash:
+            db.session.execute(insert_ignore(Asset.__table__).values(
+                sha256=job.content_hash, phash=phash, size=os.path.getsize(job.staging_path),
+                file_url=art.file_url, thumbnail_url=art.thumbnail_url, artwork_id=art.id,
+                created_at=datetime.utcnow(),
+            ))
+
+def reuse_asset(artwork, asset):
+    """Point *artwork* at an already stored identical file and copy its derivative rows."""
+    artwork.file_url, artwork.thumbnail_url = asset.file_url, asset.thumbnail_url
+    if asset.artwork_id:
+        d = ArtworkDerivative.__table__
+        cols = [d.c.variant, d.c.format, d.c.url, d.c.width, d.c.height, d.c.bytes]
+        db.session.execute(d.insert().from_select(
+            ["artwork_id"] + [c.name for c in cols],
+            select(db.literal(artwork.id), *cols).where(d.c.artwork_id == asset.artwork_id),
+        ))
+
+def load_storage(name):
+    cls = STORAGE_BACKENDS.get(name) or import_string(name.replace(":", "."))
+    return cls()
+
+upload_pipeline = UploadPipeline(
+    load_storage(app.config["STORAGE_BACKEND"]),
+    app.config["UPLOAD_WORKERS"],
+    parse_sizes(app.config["DERIVATIVE_SIZES"]),
+)
+
+@event.listens_for(Session, "after_commit")
+def _wake_upload_pipeline(session):
+    if session.info.pop("wake_uploads", False):
+        upload_pipeline.task.wake()
+
+# ---------------------------------------------------------------------------
+# 4.6. RESPONSE CACHE
+# ---------------------------------------------------------------------------
+class ResponseCache:
+    """
+    JSON payload cache for public GET endpoints, keyed by endpoint + view args +
+    sorted query args. Each entry remembers the generation of its tags
+    ("artworks", "artwork:12", ...) at build time; write paths bump a tag's
+    generation after commit, which invalidates exactly the entries that used it.
+    Entries live in an in-process LRU with TTL. With *path* set, generations and
+    entries are also kept in a shared SQLite file, so one worker's writes
+    invalidate every worker's copies. A cache built with *tags_from* keeps its
+    own entries, TTL and LRU but follows the other cache's tag generations.
+    """
+
+    def __init__(self, ttl, max_entries, path=None, tags_from=None):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.path = path
+        self.tags_from = tags_from
+        self._lru = OrderedDict()
+        self._gens = {}
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    def _store(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = local_store(self.path)
+            conn.execute("CREATE TABLE IF NOT EXISTS cache_gen (tag TEXT PRIMARY KEY, gen INTEGER NOT NULL)")
+            conn.execute("CREATE TABLE IF NOT EXISTS cache_entry (key TEXT PRIMARY KEY, entry TEXT NOT NULL, expires REAL NOT NULL)")
+            self._local.conn, self._local.pid = conn, os.getpid()
+        return conn
+
+    def generations(self, tags):
+        if self.tags_from:
+            return self.tags_from.generations(tags)
+        tags = list(tags)
+        if not tags:
+            return {}
+        if self.path:
+            marks = ",".join("?" * len(tags))
+            found = dict(self._store().execute(f"SELECT tag, gen FROM cache_gen WHERE tag IN ({marks})", tags))
+        else:
+            with self._lock:
+                found = {t: self._gens[t] for t in tags if t in self._gens}
+        return {t: found.get(t, 0) for t in tags}
+
+    def get(self, key):
+        if self.ttl <= 0:
+            return None
+        now = time.time()
+        with self._lock:
+            entry = self._lru.get(key)
+            if entry:
+                self._lru.move_to_end(key)
+        if entry is None and self.path:
+            row = self._store().execute("SELECT entry FROM cache_entry WHERE key = ? AND expires > ?", (key, now)).fetchone()
+            entry = json.loads(row[0]) if row else None
+        if entry is None or entry["expires"] <= now:
+            return None
+        if self.generations(entry["tags"]) != entry["tags"]:
+            return None  # a tag was invalidated after this entry was built
+        return entry["payload"]
+
+    def set(self, key, payload, tag_gens):
+        if self.ttl <= 0:
+            return
+        entry = {"payload": payload, "tags": tag_gens, "expires": time.time() + self.ttl}
+        with self._lock:
+            self._lru[key] = entry
+            self._lru.move_to_end(key)
+            while len(self._lru) > self.max_entries:
+                self._lru.popitem(last=False)
+        if self.path:
+            store = self._store()
+            store.execute("INSERT OR REPLACE INTO cache_entry (key, entry, expires) VALUES (?, ?, ?)",
+                          (key, json.dumps(entry), entry["expires"]))
+            if random.random() < 0.01:
+                store.execute("DELETE FROM cache_entry WHERE expires <= ?", (time.time(),))
+
+    def invalidate(self, *tags):
+        if self.tags_from:
+            return self.tags_from.invalidate(*tags)
+        if not tags:
+            return
+        if self.path:
+            self._store().executemany(
+                "INSERT INTO cache_gen (tag, gen) VALUES (?, 1) ON CONFLICT(tag) DO UPDATE SET gen = gen + 1",
+                [(t,) for t in tags],
+            )
+        with self._lock:
+            for t in tags:
+                self._gens[t] = self._gens.get(t, 0) + 1
+
+response_cache = ResponseCache(app.config["CACHE_TTL"], app.config["CACHE_MAX_ENTRIES"], app.config["CACHE_PATH"])
+# load_user records: sized and timed on their own, invalidated by response_cache's "user:<id>" tags
+user_cache = ResponseCache(app.config["USER_CACHE_TTL"], app.config["USER_CACHE_MAX_ENTRIES"], app.config["CACHE_PATH"],
+                           tags_from=response_cache)
+
+def cache_tags(*tags):
+    """Tag the cached response being built (e.g. with the ids of the artworks it lists)."""
+    if "cache_tags" in g:
+        g.cache_tags.update(tags)
+
+def invalidate_on_commit(*tags):
+    """Drop cached responses carrying *tags* once the current transaction commits."""
+    db.session.info.setdefault("cache_tags", set()).update(tags)
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_cached_responses(session):
+    response_cache.invalidate(*session.info.pop("cache_tags", ()))
+
+@event.listens_for(Session, "after_rollback")
+def _discard_cache_tags(session):
+    session.info.pop("cache_tags", None)
+
+def cached_response(*tags, finalize=None, on_serve=None):
+    """
+    Serve a public GET view from response_cache. *tags* may use view-arg
+    placeholders ("artwork:{artwork_id}"); the view can add more with
+    cache_tags(). Only 200 JSON responses are cached. *finalize(payload,
+    **view_args)* adds per-request fields to a copy of the payload on every
+    full response; *on_serve(**view_args)* runs for every successful answer,
+    304s included (e.g. to count a view). The ETag covers the cached payload
+    only, not what finalize adds, so If-None-Match gets a 304 with no body
+    until the payload itself changes.
+    """
+    def decorator(f):
+        @wraps(f)
+        def wrapper(**kwargs):
+            caching = response_cache.ttl > 0
+            key = "|".join([request.endpoint, json.dumps(kwargs, sort_keys=True),
+                            json.dumps(sorted(request.args.items(multi=True)))])
+            payload = response_cache.get(key) if caching else None
+            if payload is None:
+                # Snapshot generations before reading the DB, so a write that lands
+                # mid-build leaves this entry already stale rather than wrongly fresh
+                gens = response_cache.generations(t.format(**kwargs) for t in tags) if caching else {}
+                g.cache_tags = set()
+                rv = make_response(f(**kwargs))
+                if rv.status_code != 200 or not rv.is_json:
+                    return rv
+                payload = rv.get_json()
+                if caching:
+                    gens.update(response_cache.generations(g.cache_tags - gens.keys()))
+                    response_cache.set(key, payload, gens)
+            if on_serve:
+                on_serve(**kwargs)
+            etag = hashlib.sha1(json.dumps(payload, sort_keys=True, separators=(",", ":")).encode()).hexdigest()
+            if request.if_none_match.contains(etag):
+                resp = make_response("", 304)
+            else:
+                if finalize:
+                    payload = dict(payload)
+                    finalize(payload, **kwargs)
+                resp = app.json.response(payload)
+            resp.set_etag(etag)
+            resp.headers["Cache-Control"] = "no-cache"  # always revalidate; the ETag makes that cheap
+            return resp
+        return wrapper
+    return decorator
+
+# ---------------------------------------------------------------------------
+# 4.7. MATERIALIZED STATS
+# ---------------------------------------------------------------------------
+def bump_stats(deltas):
+    """Apply {key: delta} to StatCounter inside the caller's transaction (atomic increments)."""
+    deltas = {k: v for k, v in deltas.items() if v}
+    if not deltas:
+        return
+    t = StatCounter.__table__
+    db.session.execute(insert_ignore(t), [{"key": k, "value": 0} for k in deltas])
+    db.session.execute(
+        update(t).where(t.c.key == bindparam("k")).values(value=t.c.value + bindparam("d")),
+        [{"k": k, "d": v} for k, v in deltas.items()],
+    )
+
+def bump_artist_summaries(deltas):
+    """
+    Apply {user_id: {"artworks": n, "likes": n, "views": n, "latest": datetime}}
+    (any key may be left out) to ArtistSummary inside the caller's transaction.
+    "latest" only ever moves latest_upload forward.
+    """
+    if not deltas:
+        return
+    t = ArtistSummary.__table__
+    db.session.execute(insert_ignore(t), [{"user_id": u} for u in deltas])
+    latest = bindparam("latest", type_=db.DateTime)
+    db.session.execute(
+        update(t).where(t.c.user_id == bindparam("uid")).values(
+            artworks_count=t.c.artworks_count + bindparam("artworks"),
+            likes_total=t.c.likes_total + bindparam("likes"),
+            views_total=t.c.views_total + bindparam("views"),
+            latest_upload=case(
+                (latest.is_(None), t.c.latest_upload),
+                (or_(t.c.latest_upload.is_(None), latest > t.c.latest_upload), latest),
+                else_=t.c.latest_upload,
+            ),
+        ),
+        [{"uid": u, "artworks": d.get("artworks", 0), "likes": d.get("likes", 0), "views": d.get("views", 0),
+          "latest": d.get("latest")} for u, d in deltas.items()],
+    )
+    invalidate_on_commit(*(f"artist:{u}" for u in deltas))
+
+def approval_stats(art, sign=1):
+    """Counters that move when *art* enters (sign=1) or leaves (-1) the approved set."""
+    return {f"category:{art.category}": sign, f"year:{art.artist.year_of_study}": sign}
+
+def live_stats():
+    """The same counters computed from scratch with aggregate queries."""
+    stats = {"users": User.query.count(), "artworks": Artwork.query.count(),
+             "featured": Artwork.query.filter_by(is_featured=True).count(),
+             "likes": db.session.query(db.func.count(Like.id)).scalar()}
+    stats.update({f"status:{s}": 0 for s in ("approved", "pending", "rejected")})
+    stats.update({f"status:{s}": c for s, c in db.session.query(Artwork.status, db.func.count(Artwork.id)).group_by(Artwork.status)})
+    approved = Artwork.query.filter_by(status="approved")
+    stats.update({f"year:{y}": c for y, c in approved.join(User).with_entities(User.year_of_study, db.func.count(Artwork.id)).group_by(User.year_of_study)})
+    stats.update({f"category:{cat}": c for cat, c in approved.with_entities(Artwork.category, db.func.count(Artwork.id)).group_by(Artwork.category)})
+    return stats
+
+def stats_snapshot():
+    """
+    (stored counters, live aggregates), read in one snapshot: on the read pool
+    under SQLite, in a REPEATABLE READ transaction under PostgreSQL.
+    """
+    with reading():
+        if db.engine.dialect.name == "postgresql":
+            db.session.connection(execution_options={"isolation_level": "REPEATABLE READ"})
+        stored = dict(db.session.query(StatCounter.key, StatCounter.value))
+        live = live_stats()
+        db.session.rollback()
+    return stored, live
+
+def rebuild_stats():
+    """
+    Bring every counter to its live value. The aggregates run outside the write
+    transaction, which then only adds (live - stored) as of the snapshot, so
+    bump_stats increments committed in between are kept.
+    """
+    stored, live = stats_snapshot()
+    bump_stats({k: live.get(k, 0) - stored.get(k, 0) for k in stored.keys() | live.keys()})
+    db.session.commit()
+
+def check_stats():
+    """Compare materialized counters with live aggregates; returns the mismatches."""
+    stored, live = stats_snapshot()
+    return [
+        {"key": k, "materialized": stored.get(k, 0), "live": live.get(k, 0)}
+        for k in sorted(stored.keys() | live.keys())
+        if stored.get(k, 0) != live.get(k, 0)
+    ]
+
+stats_rebuilder = PeriodicTask("stats-rebuild", app.config["STATS_REBUILD_INTERVAL"], rebuild_stats)
+
+# ---------------------------------------------------------------------------
+# 4.8. FULL-TEXT SEARCH (SQLite FTS5 / PostgreSQL tsvector)
+# ---------------------------------------------------------------------------
+# SQLite: artwork_fts mirrors title/description/tags/artist name per artwork (rowid = artwork.id)
+# and is kept in sync by triggers, so every writer (API, importer, raw SQL) updates it.
+FTS_DDL = [
+    """CREATE VIRTUAL TABLE IF NOT EXISTS artwork_fts USING fts5(
+        title, description, tags, artist_name,
+        tokenize = 'unicode61 remove_diacritics 2', prefix = '2 3')""",
+    """CREATE TRIGGER IF NOT EXISTS artwork_fts_ai AFTER INSERT ON artwork BEGIN
+        INSERT INTO artwork_fts (rowid, title, description, tags, artist_name)
+        VALUES (new.id, new.title, new.description, new.tags, (SELECT full_name FROM "user" WHERE id = new.user_id));
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS artwork_fts_ad AFTER DELETE ON artwork BEGIN
+        DELETE FROM artwork_fts WHERE rowid = old.id;
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS artwork_fts_au AFTER UPDATE OF title, description, tags, user_id ON artwork BEGIN
+        DELETE FROM artwork_fts WHERE rowid = old.id;
+        INSERT INTO artwork_fts (rowid, title, description, tags, artist_name)
+        VALUES (new.id, new.title, new.description, new.tags, (SELECT full_name FROM "user" WHERE id = new.user_id));
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS user_fts_au AFTER UPDATE OF full_name ON "user" BEGIN
+        UPDATE artwork_fts SET artist_name = new.full_name
+        WHERE rowid IN (SELECT id FROM artwork WHERE user_id = new.id);
+    END""",
+]
+FTS_WEIGHTS = "10.0, 2.0, 5.0, 3.0"  # bm25 column weights: title, description, tags, artist_name
+# PostgreSQL: a weighted tsvector over the artwork columns, backed by the GIN expression
+# index idx_artwork_search created in the migrations (the expression must match it).
+PG_SEARCH_VECTOR = (
+    "setweight(to_tsvector('simple', coalesce(title, '')), 'A') || "
+    "setweight(to_tsvector('simple', coalesce(tags, '')), 'B') || "
+    "setweight(to_tsvector('simple', coalesce(description, '')), 'C')"
+)
+
+def search_available():
+    return db.engine.dialect.name in ("sqlite", "postgresql")
+
+def search_sql():
+    """FROM clause, match predicate and score (lower = better) of the search query for this dialect."""
+    if db.engine.dialect.name == "postgresql":
+        query = "to_tsquery('simple', :match)"
+        return {
+            "source": "artwork a",
+            "match": f"({PG_SEARCH_VECTOR}) @@ {query}",
+            "score": f"-CAST(ts_rank({PG_SEARCH_VECTOR}, {query}) AS double precision)",  # exact in the cursor
+        }
+    return {
+        "source": "artwork_fts JOIN artwork a ON a.id = artwork_fts.rowid",
+        "match": "artwork_fts MATCH :match",
+        "score": f"bm25(artwork_fts, {FTS_WEIGHTS})",
+    }
+
+def ensure_search_index():
+    """Create the FTS table + triggers and (re)build the index if it is out of step with artwork."""
+    if db.engine.dialect.name != "sqlite":
+        return
+    for ddl in FTS_DDL:
+        db.session.execute(text(ddl))
+    indexed = db.session.execute(text("SELECT count(*) FROM artwork_fts")).scalar()
+    if indexed != db.session.execute(text("SELECT count(*) FROM artwork")).scalar():
+        db.session.execute(text("DELETE FROM artwork_fts"))
+        db.session.execute(text(
+            "INSERT INTO artwork_fts (rowid, title, description, tags, artist_name) "
+            'SELECT a.id, a.title, a.description, a.tags, u.full_name FROM artwork a JOIN "user" u ON u.id = a.user_id'
+        ))
+    db.session.commit()
+
+def fts_query(q, prefix=True):
+    """
+    Turn free text into a safe FTS5 MATCH / tsquery expression: only word
+    characters survive (so user input can't inject query syntax) and the words
+    are ANDed; the last word, and any word typed with a trailing *, matches as
+    a prefix.
+    """
+    words = re.findall(r"(\w+)(\*?)", q)
+    pg = db.engine.dialect.name == "postgresql"
+    terms = []
+    for i, (w, star) in enumerate(words):
+        is_prefix = star or (prefix and i == len(words) - 1)
+        terms.append(f"{w.lower()}{':*' if is_prefix else ''}" if pg else f'"{w}"{"*" if is_prefix else ""}')
+    return (" & " if pg else " ").join(terms)
+
+# ---------------------------------------------------------------------------
+# 4.9. TRENDING SCORES
+# ---------------------------------------------------------------------------
+# score = log(sum(weight * 2 ** ((t - TREND_EPOCH) / half_life))) over an artwork's
+# likes, comments and views. Growing the exponent with event time instead of decaying
+# old scores gives the same order as a decayed sum, so rows only change when new
+# events arrive; the log keeps the numbers finite.
+TREND_EPOCH = datetime(2024, 1, 1)
+TREND_WEIGHTS = {"view": 1.0, "like": 4.0, "comment": 6.0}
+TREND_TAU = app.config["TRENDING_HALF_LIFE"] * 3600 / math.log(2)  # seconds
+
+def trend_weight(weight, when):
+    return math.log(weight) + (when - TREND_EPOCH).total_seconds() / TREND_TAU
+
+def logaddexp(a, b):
+    hi, lo = max(a, b), min(a, b)
+    return hi + math.log1p(math.exp(lo - hi))
+
+def current_trend(score):
+    """A log-domain score as today's decayed weight, for display."""
+    return math.exp(score - trend_weight(1, datetime.utcnow()))
+
+def add_trend_events(conn, events):
+    """
+    Fold (artwork_id, weight, when) events into artwork_trend on *conn*. Run it
+    after a write in the same transaction, so the read-modify-write is serialized.
+    Only approved artworks are scored (approval is final), which lets the
+    trending feed read the score index without filtering on status.
+    """
+    inc = {}
+    for artwork_id, weight, when in events:
+        if weight > 0:
+            x = trend_weight(weight, when)
+            inc[artwork_id] = logaddexp(inc[artwork_id], x) if artwork_id in inc else x
+    a, t = Artwork.__table__, ArtworkTrend.__table__
+    if inc:
+        approved = set(conn.execute(select(a.c.id).where(a.c.id.in_(list(inc)), a.c.status == "approved")).scalars())
+        inc = {k: v for k, v in inc.items() if k in approved}
+    if not inc:
+        return
+    current = dict(conn.execute(select(t.c.artwork_id, t.c.score).where(t.c.artwork_id.in_(list(inc))).with_for_update()).all())
+    now = datetime.utcnow()
+    new = [{"artwork_id": k, "score": v, "updated_at": now} for k, v in inc.items() if k not in current]
+    if new:
+        conn.execute(insert_ignore(t), new)
+    if current:
+        conn.execute(
+            update(t).where(t.c.artwork_id == bindparam("aid")).values(score=bindparam("new_score"), updated_at=now),
+            [{"aid": k, "new_score": logaddexp(current[k], inc[k])} for k in current],
+        )
+
+def update_trending(batch_size=5000):
+    """
+    Score likes and comments created since the last run. Each source keeps an
+    id watermark in job_state; advancing it is a compare-and-set in the same
+    transaction as the scores, so concurrent workers never count a batch twice.
+    """
+    changed = False
+    j = JobState.__table__
+    with reading():  # polling runs on the read pool; the compare-and-set and scores go to the writer
+        for model, weight in ((Like, TREND_WEIGHTS["like"]), (Comment, TREND_WEIGHTS["comment"])):
+            name = f"trending:{model.__tablename__}"
+            while True:
+                last = db.session.execute(select(j.c.value).where(j.c.name == name)).scalar()
+                rows = db.session.execute(
+                    select(model).where(model.id > (last or 0)).order_by(model.id).limit(batch_size)
+                ).scalars().all()
+                if not rows:
+                    db.session.rollback()
+                    break
+                if last is None:
+                    claimed = db.session.execute(insert_ignore(j).values(name=name, value=rows[-1].id)).rowcount
+                else:
+                    claimed = db.session.execute(
+                        update(j).where(j.c.name == name, j.c.value == last).values(value=rows[-1].id)
+                    ).rowcount
+                if not claimed:
+                    db.session.rollback()  # another worker took this batch (or the snapshot was stale)
+                    break
+                add_trend_events(db.session.connection(bind_arguments={"bind": db.engine}), [
+                    (r.artwork_id, weight, r.timestamp) for r in rows if not getattr(r, "is_flagged", False)
+                ])
+                db.session.commit()
+                changed = True
+    if changed:
+        response_cache.invalidate("trending")
+
+trending_updater = PeriodicTask("trending-updater", app.config["TRENDING_INTERVAL"], update_trending)
+
+# ---------------------------------------------------------------------------
+# 4.10. AUTH STATE (user cache, token denylist)
+# ---------------------------------------------------------------------------
+def load_user(user_id):
+    """
+    The user's profile record as a dict, or None. Served from user_cache under
+    the "user:<id>" tag, so the invalidate_on_commit(f"user:{id}") that profile and
+    role changes already do drops it on every worker.
+    """
+    key = f"user-record|{user_id}"
+    record = user_cache.get(key)
+    if record is None:
+        gens = user_cache.generations([f"user:{user_id}"])
+        user = db.session.get(User, user_id)
+        if user is None:
+            return None
+        record = {
+            "id": user.id,
+            "full_name": user.full_name,
+            "email": user.email,
+            "student_id": user.student_id,
+            "year_of_study": user.year_of_study,
+            "profile_image_url": user.profile_image_url,
+            "verification_status": user.verification_status,
+            "role": user.role,
+            "created_at": user.created_at.isoformat(),
+        }
+        user_cache.set(key, record, gens)
+    return record
+
+def token_claims(user):
+    """Extra signed claims, so authorization checks don't need the user row."""
+    return {"role": user.role, "verification_status": user.verification_status}
+
+class Denylist:
+    """
+    In-memory copy of RevokedToken, reloaded at most every *refresh* seconds, so
+    checking a token costs a dict lookup. Rows are dropped from the copy once the
+    tokens they cover have expired; revocations made by this process apply at
+    once, other workers pick them up on their next reload.
+    """
+
+    def __init__(self, refresh):
+        self.refresh = refresh
+        self._entries = {}
+        self._loaded_at = None
+        self._lock = threading.Lock()
+
+    def _reload(self):
+        if self._loaded_at is not None and time.monotonic() - self._loaded_at < self.refresh:
+            return
+        rows = db.session.query(RevokedToken.key, RevokedToken.revoked_at).filter(
+            RevokedToken.expires_at > datetime.utcnow()
+        ).all()
+        with self._lock:
+            self._entries = {k: (at - datetime(1970, 1, 1)).total_seconds() for k, at in rows}
+            self._loaded_at = time.monotonic()
+
+    def is_revoked(self, payload):
+        self._reload()
+        if f"jti:{payload['jti']}" in self._entries:
+            return True
+        revoked_at = self._entries.get(f"user:{payload['sub']}")
+        # iat has whole-second precision: a token from the revocation's own second may predate it
+        return revoked_at is not None and payload.get("iat", 0) <= int(revoked_at)
+
+    def revoke(self, key, expires_at):
+        """Add a denylist entry in the caller's transaction (and prune expired ones)."""
+        now = datetime.utcnow()
+        db.session.execute(delete(RevokedToken).where(
+            (RevokedToken.key == key) | (RevokedToken.expires_at <= now)
+        ))
+        db.session.add(RevokedToken(key=key, revoked_at=now, expires_at=expires_at))
+        db.session.info.setdefault("revoked", {})[key] = (now - datetime(1970, 1, 1)).total_seconds()
+
+    def revoke_user(self, user_id):
+        """Invalidate every token issued to *user_id* so far, this second included (e.g. after a role change)."""
+        self.revoke(f"user:{user_id}", datetime.utcnow() + app.config["JWT_ACCESS_TOKEN_EXPIRES"])
+
+denylist = Denylist(app.config["JWT_DENYLIST_REFRESH"])
+
+@jwt.token_in_blocklist_loader
+def _token_revoked(_header, payload):
+    return denylist.is_revoked(payload)
+
+@event.listens_for(Session, "after_commit")
+def _apply_revocations(session):
+    revoked = session.info.pop("revoked", None)
+    if revoked:
+        with denylist._lock:
+            denylist._entries.update(revoked)
+
+@event.listens_for(Session, "after_rollback")
+def _discard_revocations(session):
+    session.info.pop("revoked", None)
+
+# ---------------------------------------------------------------------------
+# 4.11. PASSWORD HASHING + LOGIN RATE LIMITS
+# ---------------------------------------------------------------------------
+class HasherBusy(Exception):
+    pass
+
+class PasswordHasher:
+    """
+    Runs password hashing/verification on a bounded thread pool (scrypt and
+    pbkdf2 release the GIL), so a burst of logins uses at most *workers* cores
+    and the remaining request threads keep serving. Beyond *max_pending*
+    queued jobs, HasherBusy is raised instead of queueing further.
+    """
+
+    def __init__(self, method, workers, max_pending):
+        self.method = method
+        self.workers = workers
+        self.prefix = generate_password_hash("", method).split("$", 1)[0]  # normalized, e.g. scrypt:32768:8:1
+        self._dummy = generate_password_hash(uuid.uuid4().hex, method)
+        self._slots = threading.BoundedSemaphore(max_pending)
+        self._pool = None
+        self._pool_pid = None
+
+    def _run(self, fn, *args):
+        if not self._slots.acquire(blocking=False):
+            raise HasherBusy()
+        try:
+            if self._pool_pid != os.getpid():
+                self._pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="password-hash")
+                self._pool_pid = os.getpid()
+            return self._pool.submit(fn, *args).result()
+        finally:
+            self._slots.release()
+
+    def hash(self, password):
+        return self._run(generate_password_hash, password, self.method)
+
+    def verify(self, stored, password):
+        """Check *password*; with stored=None, burn the same time against a dummy hash and return False."""
+        ok = self._run(check_password_hash, stored or self._dummy, password)
+        return ok and stored is not None
+
+    def needs_rehash(self, stored):
+        return stored.split("$", 1)[0] != self.prefix
+
+password_hasher = PasswordHasher(
+    app.config["PASSWORD_HASH_METHOD"], app.config["PASSWORD_HASH_WORKERS"], app.config["PASSWORD_HASH_MAX_PENDING"]
+)
+
+def parse_rate(spec):
+    """ "10/60" -> (10 attempts, 60 seconds); "" or "0" -> None (no limit)."""
+    if not spec or spec.split("/")[0] == "0":
+        return None
+    count, _, seconds = spec.partition("/")
+    return int(count), float(seconds or 60)
+
+class RateLimiter:
+    """
+    Token buckets: each key may spend *capacity* attempts at once, refilled at
+    capacity / period per second. Buckets live in memory, or with *path* set in
+    a shared SQLite file so all workers of a host share them.
+    """
+
+    def __init__(self, path=None):
+        self.path = path
+        self._buckets = {}
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    def _store(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = local_store(self.path)
+            conn.execute("CREATE TABLE IF NOT EXISTS rate_bucket (key TEXT PRIMARY KEY, tokens REAL NOT NULL, updated REAL NOT NULL)")
+            self._local.conn, self._local.pid = conn, os.getpid()
+        return conn
+
+    @staticmethod
+    def _take(bucket, capacity, period, now):
+        tokens, updated = bucket or (capacity, now)
+        tokens = min(capacity, tokens + (now - updated) * capacity / period)
+        if tokens >= 1:
+            return (tokens - 1, now), 0
+        return (tokens, now), (1 - tokens) * period / capacity
+
+    def hit(self, key, rate):
+        """Spend one attempt for *key*; returns seconds to wait (0 = allowed)."""
+        if rate is None:
+            return 0
+        capacity, period = rate
+        now = time.time()
+        if not self.path:
+            with self._lock:
+                self._buckets[key], wait = self._take(self._buckets.get(key), capacity, period, now)
+            return wait
+        conn = self._store()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute("SELECT tokens, updated FROM rate_bucket WHERE key = ?", (key,)).fetchone()
+            (tokens, updated), wait = self._take(row, capacity, period, now)
+            conn.execute("INSERT OR REPLACE INTO rate_bucket (key, tokens, updated) VALUES (?, ?, ?)", (key, tokens, updated))
+            if random.random() < 0.01:  # forget buckets that have been full for a while
+                conn.execute("DELETE FROM rate_bucket WHERE updated < ?", (now - 86400,))
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return wait
+
+rate_limiter = RateLimiter(app.config["RATE_LIMIT_PATH"])
+
+def rate_limited(*keys_and_rates):
+    """429 response if any (key, rate) bucket is empty, else None."""
+    wait = max(rate_limiter.hit(key, rate) for key, rate in keys_and_rates)
+    if not wait:
+        return None
+    resp = jsonify({"error": "Too many attempts, try again later"})
+    resp.headers["Retry-After"] = str(math.ceil(wait))
+    return resp, 429
+
+@app.errorhandler(HasherBusy)
+def hasher_busy(_):
+    resp = jsonify({"error": "Server busy, try again shortly"})
+    resp.headers["Retry-After"] = "1"
+    return resp, 503
+
+# ---------------------------------------------------------------------------
+# 4.12. INSTRUMENTATION (request timing, SQL stats, metrics, profiler)
+# ---------------------------------------------------------------------------
+class Metrics:
+    """
+    Prometheus counters kept per process: request counts and latency
+    histograms per route, SQL query counts / time per route, slow queries.
+    Every series is a monotonically growing sum, so the totals of several
+    workers simply add up: with *path* set, each worker moves its deltas into a
+    shared SQLite file every METRICS_FLUSH_INTERVAL and any worker can render
+    the host-wide totals.
+    """
+    BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+    HELP = {
+        "artgrid_requests_total": "HTTP requests by route, method and status",
+        "artgrid_request_duration_seconds": "HTTP request latency by route",
+        "artgrid_sql_queries_total": "SQL statements executed by route",
+        "artgrid_sql_duration_seconds_total": "Time spent in SQL statements by route",
+        "artgrid_slow_queries_total": "SQL statements slower than SLOW_QUERY_MS",
+    }
+
+    def __init__(self, path=None):
+        self.path = path
+        self._values = defaultdict(float)  # totals, or unflushed deltas when path is set
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    def _store(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = local_store(self.path)
+            conn.execute("CREATE TABLE IF NOT EXISTS metric (series TEXT PRIMARY KEY, value REAL NOT NULL)")
+            self._local.conn, self._local.pid = conn, os.getpid()
+        return conn
+
+    @staticmethod
+    def series(name, **labels):
+        if not labels:
+            return name
+        escaped = (str(v).replace("\\", "\\\\").replace('"', '\\"') for v in labels.values())
+        return name + "{" + ",".join(f'{k}="{v}"' for k, v in zip(labels, escaped)) + "}"
+
+    @staticmethod
+    def _order(series):
+        """Sort key: by name and labels, histogram buckets in ascending le order."""
+        le = re.search(r',le="([^"]+)"', series)
+        return (re.sub(r',le="[^"]+"', "", series), float(le.group(1)) if le else 0.0)
+
+    def inc(self, name, value=1, **labels):
+        with self._lock:
+            self._values[self.series(name, **labels)] += value
+
+    def observe_request(self, route, method, status, seconds, queries, sql_seconds):
+        labels = {"route": route, "method": method}
+        updates = [
+            (self.series("artgrid_requests_total", **labels, status=status), 1),
+            (self.series("artgrid_request_duration_seconds_count", **labels), 1),
+            (self.series("artgrid_request_duration_seconds_sum", **labels), seconds),
+            (self.series("artgrid_sql_queries_total", **labels), queries),
+            (self.series("artgrid_sql_duration_seconds_total", **labels), sql_seconds),
+        ]
+        for le in self.BUCKETS + ("+Inf",):  # every bucket, 0 included: a histogram needs the full set of le series
+            updates.append((self.series("artgrid_request_duration_seconds_bucket", **labels, le=le),
+                            1 if le == "+Inf" or seconds <= le else 0))
+        with self._lock:
+            for key, value in updates:
+                self._values[key] += value
+
+    def flush(self):
+        """Move this worker's deltas into the shared store (no-op without *path*)."""
+        if not self.path:
+            return
+        with self._lock:
+            pending, self._values = self._values, defaultdict(float)
+        if pending:
+            self._store().executemany(
+                "INSERT INTO metric (series, value) VALUES (?, ?) "
+                "ON CONFLICT(series) DO UPDATE SET value = value + excluded.value",
+                list(pending.items()),
+            )
+
+    def render(self):
+        """Prometheus text exposition format."""
+        if self.path:
+            self.flush()
+            values = dict(self._store().execute("SELECT series, value FROM metric"))
+        else:
+            with self._lock:
+                values = dict(self._values)
+        families = defaultdict(list)
+        for key in sorted(values, key=self._order):
+            name = key.split("{", 1)[0]
+            families[re.sub(r"_(bucket|sum|count)$", "", name) if name.startswith("artgrid_request_duration") else name].append(key)
+        lines = []
+        for family, keys in sorted(families.items()):
+            kind = "histogram" if family == "artgrid_request_duration_seconds" else "counter"
+            lines += [f"# HELP {family} {self.HELP.get(family, family)}", f"# TYPE {family} {kind}"]
+            lines += [f"{key} {values[key]:g}" for key in keys]
+        return "\n".join(lines) + "\n"
+
+metrics = Metrics(app.config["METRICS_PATH"])
+metrics_flusher = PeriodicTask("metrics-flush", app.config["METRICS_FLUSH_INTERVAL"] if app.config["METRICS_PATH"] else 0,
+                               metrics.flush)
+atexit.register(metrics.flush)
+
+class SamplingProfiler:
+    """
+    Opt-in wall-clock sampler (PROFILE_THRESHOLD_MS > 0). While requests run,
+    one daemon thread per process snapshots their stacks every *interval*
+    seconds via sys._current_frames(); requests slower than *threshold* get
+    their samples written to *out_dir* as collapsed stacks ("a;b;c 42" per
+    line), which flamegraph.pl and speedscope read directly. Faster requests
+    are just discarded.
+    """
+
+    def __init__(self, interval, threshold, out_dir):
+        self.interval = interval
+        self.threshold = threshold
+        self.out_dir = Path(out_dir)
+        self._active = {}  # thread ident -> Counter of folded stacks
+        self._pid = None
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self):
+        return self.threshold > 0
+
+    def _ensure_started(self):
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid != os.getpid():
+                self._pid = os.getpid()
+                self._active.clear()
+                threading.Thread(target=self._run, name="profiler", daemon=True).start()
+
+    @staticmethod
+    def fold(frame):
+        stack = []
+        while frame is not None:
+            code = frame.f_code
+            stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+            frame = frame.f_back
+        return ";".join(reversed(stack))
+
+    def _run(self):
+        while True:
+            time.sleep(self.interval)
+            frames = sys._current_frames()
+            for ident, samples in list(self._active.items()):
+                if (frame := frames.get(ident)) is not None:
+                    samples[self.fold(frame)] += 1
+
+    def begin(self):
+        self._ensure_started()
+        self._active[threading.get_ident()] = Counter()
+
+    def end(self, seconds, label):
+        """Stop sampling the current request; returns the file written, if it was slow enough."""
+        samples = self._active.pop(threading.get_ident(), None)
+        if not samples or seconds < self.threshold:
+            return None
+        self.out_dir.mkdir(parents=True, exist_ok=True)
+        name = re.sub(r"[^\w.-]+", "_", label).strip("_")
+        path = self.out_dir / f"{datetime.utcnow():%Y%m%dT%H%M%S}-{name}-{seconds * 1000:.0f}ms-{os.getpid()}.folded"
+        path.write_text("".join(f"{stack} {n}\n" for stack, n in samples.most_common()))
+        return path
+
+profiler = SamplingProfiler(app.config["PROFILE_INTERVAL_MS"] / 1000, app.config["PROFILE_THRESHOLD_MS"] / 1000,
+                            app.config["PROFILE_DIR"])
+
+# SQL statements on every engine (writer + readers): counted into the current request, slow ones logged
+@event.listens_for(Engine, "before_cursor_execute")
+def _sql_started(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _sql_finished(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - conn.info["query_started"].pop()
+    in_request = has_request_context() and "sql_count" in g
+    if in_request:
+        g.sql_count += 1
+        g.sql_time += elapsed
+    if elapsed * 1000 >= app.config["SLOW_QUERY_MS"]:
+        where = f"{request.method} {request.path}" if in_request else threading.current_thread().name
+        metrics.inc("artgrid_slow_queries_total")
+        print(f"slow query {elapsed * 1000:.1f} ms [{where}]: {' '.join(statement.split())[:2000]}")
+
+@app.before_request
+def start_request_timer():
+    g.request_started = time.perf_counter()
+    g.sql_count, g.sql_time = 0, 0.0
+    if profiler.enabled:
+        profiler.begin()
+
+@app.after_request
+def record_request_timing(response):
+    if "request_started" not in g:
+        return response
+    elapsed = time.perf_counter() - g.request_started
+    route = request.url_rule.rule if request.url_rule else "unmatched"  # templated, so label cardinality stays bounded
+    metrics.observe_request(route, request.method, response.status_code, elapsed, g.sql_count, g.sql_time)
+    response.headers["Server-Timing"] = (
+        f'db;dur={g.sql_time * 1000:.1f};desc="{g.sql_count} queries", app;dur={elapsed * 1000:.1f}'
+    )
+    if profiler.enabled and (path := profiler.end(elapsed, f"{request.method} {route}")):
+        print(f"profile: {request.method} {request.path} took {elapsed * 1000:.0f} ms, stacks in {path}")
+    return response
+
+# ---------------------------------------------------------------------------
+# 4.13. COMMENT FILTER (word list, spam heuristics, deep scan)
+# ---------------------------------------------------------------------------
+LEET = str.maketrans("013457@$", "oieastas")
+LINK_RE = re.compile(r"https?://|www\.", re.IGNORECASE)
+
+def normalize_text(value):
+    """NFKC + casefold, so full-width letters and case variants match the same terms."""
+    return unicodedata.normalize("NFKC", value).casefold()
+
+def normalize_term(value):
+    return " ".join(normalize_text(value).split())[:100]
+
+def compact_text(value):
+    """Deep-scan form: leetspeak digits mapped to letters, everything else but letters dropped ("S.p-4 m" -> "spam")."""
+    return "".join(ch for ch in normalize_text(value).translate(LEET) if ch.isalpha())
+
+def trie_regex(terms):
+    """
+    Compile literal *terms* into one regex shaped as a prefix trie
+    ("spam|spice|spit" -> "sp(?:am|i[ct])"): at each text position the engine
+    follows one branch per character, so the cost of a search grows with the
+    text and term lengths, not with the number of terms. A term that another
+    term starts with makes the longer one redundant (matches are substrings).
+    Returns None for an empty list.
+    """
+    trie = {}
+    for term in terms:
+        node = trie
+        for ch in term:
+            node = node.setdefault(ch, {})
+        node[""] = {}
+
+    def build(node):
+        if "" in node or not node:
+            return None  # a whole term ends here
+        branches, singles = [], []
+        for ch in sorted(node):
+            tail = build(node[ch])
+            if tail is None:
+                singles.append(re.escape(ch))
+            else:
+                branches.append(re.escape(ch) + tail)
+        if singles:
+            branches.append(singles[0] if len(singles) == 1 else "[" + "".join(singles) + "]")
+        return branches[0] if len(branches) == 1 else "(?:" + "|".join(branches) + ")"
+
+    pattern = build(trie) if trie else None
+    return re.compile(pattern) if pattern else None
+
+class CommentFilter:
+    """
+    BlockedTerm compiled into trie regexes (plain + compacted for the deep
+    scan). Each worker checks the list's version (a JobState row bumped on
+    every change) at most every *refresh* seconds and recompiles only when it
+    moved, so edits go live everywhere without a restart.
+    """
+    VERSION_KEY = "blocked_terms"
+
+    def __init__(self, refresh):
+        self.refresh = refresh
+        self._version = None
+        self._checked_at = None
+        self._patterns = (None, None)
+        self._lock = threading.Lock()
+
+    def _reload(self):
+        if self._checked_at is not None and time.monotonic() - self._checked_at < self.refresh:
+            return
+        version = db.session.query(JobState.value).filter_by(name=self.VERSION_KEY).scalar() or 0
+        if version != self._version:
+            terms = [t for (t,) in db.session.query(BlockedTerm.term)]
+            patterns = (trie_regex(terms), trie_regex({compact_text(t) for t in terms} - {""}))
+            with self._lock:
+                self._patterns, self._version = patterns, version
+        self._checked_at = time.monotonic()
+
+    def invalidate(self):
+        """Recheck the version on the next match."""
+        self._checked_at = None
+
+    def match(self, content):
+        """The first blocked term found in *content*, or None."""
+        self._reload()
+        found = self._patterns[0] and self._patterns[0].search(normalize_text(content))
+        return found.group(0) if found else None
+
+    def match_obfuscated(self, content):
+        """Like match(), but ignoring spacing, punctuation and leetspeak digits."""
+        self._reload()
+        found = self._patterns[1] and self._patterns[1].search(compact_text(content))
+        return found.group(0) if found else None
+
+    def bump_version(self):
+        """Call in the transaction that changes BlockedTerm: all workers recompile after it commits."""
+        db.session.execute(insert_ignore(JobState.__table__).values(name=self.VERSION_KEY, value=0))
+        db.session.execute(update(JobState).where(JobState.name == self.VERSION_KEY).values(value=JobState.value + 1))
+        db.session.info["blocked_terms_changed"] = True
+
+comment_filter = CommentFilter(app.config["COMMENT_FILTER_REFRESH"])
+
+@event.listens_for(Session, "after_commit")
+def _reload_comment_filter(session):
+    if session.info.pop("blocked_terms_changed", False):
+        comment_filter.invalidate()
+
+def spam_reason(user_id, content):
+    """Cheap checks for every new comment; returns why it should be hidden, or None."""
+    term = comment_filter.match(content)
+    if term:
+        return f"blocked term: {term}"
+    if len(LINK_RE.findall(content)) > app.config["COMMENT_MAX_LINKS"]:
+        return "too many links"
+    window = app.config["COMMENT_DUPLICATE_WINDOW"]
+    if window > 0:
+        # idx_comment_user_recent: this user's comments of the last *window* seconds only
+        since = datetime.utcnow() - timedelta(seconds=window)
+        repeated = Comment.query.filter(Comment.user_id == user_id, Comment.timestamp >= since, Comment.content == content)
+        if db.session.query(repeated.exists()).scalar():
+            return "duplicate of a recent comment"
+    return None
+
+class ObfuscationScan:
+    """Deep scan for blocked terms hidden by spacing, punctuation or digits ("s p 4 m")."""
+    def scan(self, content):
+        term = comment_filter.match_obfuscated(content)
+        return f"obfuscated term: {term}" if term else None
+
+COMMENT_SCANS = {"obfuscation": ObfuscationScan}
+
+class CommentScanner:
+    """
+    Runs a slower check (COMMENT_DEEP_SCAN: scan(content) -> reason | None) on
+    visible comments after they were posted, from CommentScanJob rows; a hit
+    flags the comment, which hides it and moves the artwork's comments_count.
+    """
+    MAX_ATTEMPTS = 5
+
+    def __init__(self, scan):
+        self.scan = scan
+        self.worker = PeriodicTask("comment-scan", app.config["COMMENT_SCAN_POLL_INTERVAL"] if scan else 0, self.drain)
+
+    @property
+    def enabled(self):
+        return self.scan is not None
+
+    def enqueue(self, comment_id):
+        db.session.add(CommentScanJob(comment_id=comment_id))
+        db.session.info["wake_comment_scan"] = True
+
+    def drain(self, batch_size=50):
+        while True:
+            jobs = claim_jobs(CommentScanJob, batch_size, lease_seconds=300)
+            if not jobs:
+                return
+            contents = dict(db.session.query(Comment.id, Comment.content).filter(Comment.id.in_([j.comment_id for j in jobs])))
+            for job in jobs:
+                try:
+                    reason = self.scan.scan(contents[job.comment_id]) if job.comment_id in contents else None
+                    if reason and set_comment_flag(job.comment_id, True):
+                        print(f"Comment {job.comment_id} hidden by deep scan: {reason}")
+                    job.status, job.last_error = "done", None
+                except Exception as e:
+                    print("Comment scan error:", e)
+                    job.status = "failed" if job.attempts >= self.MAX_ATTEMPTS else "queued"
+                    job.last_error = str(e)
+                    job.next_attempt_at = datetime.utcnow() + retry_delay(job.attempts, 30)
+            db.session.commit()
+            if len(jobs) < batch_size:
+                return
+
+def load_comment_scan(name):
+    if not name:
+        return None
+    cls = COMMENT_SCANS.get(name) or import_string(name.replace(":", "."))
+    return cls()
+
+comment_scanner = CommentScanner(load_comment_scan(app.config["COMMENT_DEEP_SCAN"]))
+
+@event.listens_for(Session, "after_commit")
+def _wake_comment_scanner(session):
+    if session.info.pop("wake_comment_scan", False):
+        comment_scanner.worker.wake()
+
+@event.listens_for(Session, "after_rollback")
+def _discard_comment_filter_flags(session):
+    session.info.pop("blocked_terms_changed", None)
+    session.info.pop("wake_comment_scan", None)
+
 # ---------------------------------------------------------------------------
 # 5. SERVE FRONT-END (SPA catch-all)
 # ---------------------------------------------------------------------------
@@ -278,6 +2404,13 @@ def spa(path):
         return response
     return send_from_directory(app.static_folder, "index.html")
 
+@app.route("/media/assets/<path:path>")
+def media(path):
+    """LocalStorage assets (keys are unique, so cache forever); staged uploads are never served."""
+    response = send_from_directory(ASSETS_DIR.resolve(), path)
+    response.headers["Cache-Control"] = "public, max-age=31536000, immutable"
+    return response
+
 # ---------------------------------------------------------------------------
 # 6. HEALTH CHECK
 # ---------------------------------------------------------------------------
@@ -289,25 +2422,32 @@ def health():
 # 6.1 DATASET SUMMARY (Admin Health)
 # ---------------------------------------------------------------------------
 @app.get("/api/admin/dataset/summary")
+@read_only
 def dataset_summary():
-    total = db.session.query(db.func.count(Artwork.id)).scalar()
-
-    approved = db.session.query(db.func.count(Artwork.id))\
-        .filter(Artwork.status == "approved").scalar()
-
-    pending = db.session.query(db.func.count(Artwork.id))\
-        .filter(Artwork.status == "pending").scalar()
-
-    rejected = db.session.query(db.func.count(Artwork.id))\
-        .filter(Artwork.status == "rejected").scalar()
+    keys = ["artworks", "status:approved", "status:pending", "status:rejected"]
+    stats = dict(db.session.query(StatCounter.key, StatCounter.value).filter(StatCounter.key.in_(keys)))
 
     return jsonify({
-        "total": total,
-        "approved": approved,
-        "pending": pending,
-        "rejected": rejected
+        "total": stats.get("artworks", 0),
+        "approved": stats.get("status:approved", 0),
+        "pending": stats.get("status:pending", 0),
+        "rejected": stats.get("status:rejected", 0)
     })
 
+# ---------------------------------------------------------------------------
+# 6.2 METRICS (Prometheus)
+# ---------------------------------------------------------------------------
+@app.get("/api/admin/metrics")
+def admin_metrics():
+    """Prometheus scrape target: METRICS_TOKEN as a bearer token, or a moderator's JWT."""
+    def render():
+        return app.response_class(metrics.render(), mimetype="text/plain; version=0.0.4")
+
+    token = app.config["METRICS_TOKEN"]
+    if token and hmac.compare_digest(request.headers.get("Authorization", ""), f"Bearer {token}"):
+        return render()
+    return moderator_required(render)()
+
 # ---------------------------------------------------------------------------
 # 7. AUTH ROUTES
 # ---------------------------------------------------------------------------
@@ -320,6 +2460,10 @@ def register():
         return jsonify({"error": f"{', '.join(missing)} required"}), 400
     if not validate_uopeople_email(data["email"]):
         return jsonify({"error": "Must use UoPeople email"}), 400
+    limited = rate_limited((f"ip:{request.remote_addr}", parse_rate(app.config["LOGIN_RATE_PER_IP"])))
+    if limited:
+        return limited
+    password_hash = password_hasher.hash(data["password"])  # before the first query: it holds the writer
     if User.query.filter_by(email=data["email"]).first():
         return jsonify({"error": "Email already registered"}), 400
     if User.query.filter_by(student_id=data["student_id"]).first():
@@ -328,29 +2472,40 @@ def register():
     user = User(
         full_name=data["full_name"],
         email=data["email"],
-        password_hash=generate_password_hash(data["password"]),
+        password_hash=password_hash,
         dob_hash=hash_dob(data["dob"]),
         student_id=data["student_id"],
         year_of_study=data["year_of_study"],
         verification_status="verified" if validate_uopeople_email(data["email"]) else "pending",
     )
     db.session.add(user)
-    db.session.commit()
-    send_email(
+    bump_stats({"users": 1})
+    queue_email(
         user.email,
         "Welcome to ARTGRID",
         f"Hello {user.full_name},\n\nYour account is ready – start showcasing your art!\n\n– ARTGRID Team",
     )
+    db.session.commit()
     return jsonify({"message": "Registration successful", "user_id": user.id}), 201
 
 @app.route("/api/auth/login", methods=["POST"])
+@read_only
 def login():
     data = request.get_json()
     if not data.get("email") or not data.get("password"):
         return jsonify({"error": "Email and password required"}), 400
+    limited = rate_limited(
+        (f"email:{data['email'].strip().lower()}", parse_rate(app.config["LOGIN_RATE_PER_EMAIL"])),
+        (f"ip:{request.remote_addr}", parse_rate(app.config["LOGIN_RATE_PER_IP"])),
+    )
+    if limited:
+        return limited
     user = User.query.filter_by(email=data["email"]).first()
-    if user and check_password_hash(user.password_hash, data["password"]):
-        token = create_access_token(identity=user.id)
+    if password_hasher.verify(user.password_hash if user else None, data["password"]):
+        if password_hasher.needs_rehash(user.password_hash):
+            user.password_hash = password_hasher.hash(data["password"])
+            db.session.commit()
+        token = create_access_token(identity=str(user.id), additional_claims=token_claims(user))
         return jsonify(
             access_token=token,
             user={
@@ -364,59 +2519,45 @@ def login():
     return jsonify({"error": "Invalid credentials"}), 401
 
 @app.route("/api/auth/profile", methods=["GET"])
+@read_only
 @jwt_required()
 def get_profile():
-    user = User.query.get_or_404(get_jwt_identity())
-    return jsonify(
-        id=user.id,
-        full_name=user.full_name,
-        email=user.email,
-        student_id=user.student_id,
-        year_of_study=user.year_of_study,
-        profile_image_url=user.profile_image_url,
-        verification_status=user.verification_status,
-        role=user.role,
-        created_at=user.created_at.isoformat(),
-    )
+    user = load_user(current_user_id())
+    if user is None:
+        return jsonify({"error": "Resource not found"}), 404
+    return jsonify(user)
 
 @app.route("/api/auth/profile", methods=["PUT"])
 @jwt_required()
 def update_profile():
-    user = User.query.get_or_404(get_jwt_identity())
+    user = User.query.get_or_404(current_user_id())
     data = request.get_json()
+    old_year = user.year_of_study
     if "full_name" in data:
         user.full_name = data["full_name"]
     if "year_of_study" in data:
         user.year_of_study = data["year_of_study"]
+    if user.year_of_study != old_year:
+        moved = Artwork.query.filter_by(user_id=user.id, status="approved").count()
+        bump_stats({f"year:{old_year}": -moved, f"year:{user.year_of_study}": moved})
+    invalidate_on_commit(f"user:{user.id}")
     db.session.commit()
     return jsonify({"message": "Profile updated"}), 200
 
+@app.route("/api/auth/logout", methods=["POST"])
+@jwt_required()
+def logout():
+    claims = get_jwt()
+    denylist.revoke(f"jti:{claims['jti']}", datetime.utcfromtimestamp(claims["exp"]))
+    db.session.commit()
+    return jsonify({"message": "Logged out"})
+
 # ---------------------------------------------------------------------------
 # 8. ARTWORK ROUTES
 # ---------------------------------------------------------------------------
-@app.route("/api/artworks", methods=["GET"])
-def list_artworks():
-    try:
-        page     = int(request.args.get("page", 1))
-        per_page = min(int(request.args.get("per_page", 24)), 100)  # límite máximo
-    except ValueError:
-        page, per_page = 1, 24
-
-    q = Artwork.query.order_by(Artwork.submission_date.desc())
-    items = q.limit(per_page).offset((page-1) * per_page).all()
-    total = db.session.query(db.func.count(Artwork.id)).scalar()
-
-    return jsonify({
-        "page": page,
-        "per_page": per_page,
-        "total": total,
-        "items": [a.to_dict() for a in items]  # necesitas método to_dict en Artwork
-    })
-
 @app.route("/api/artworks/upload", methods=["POST"])
 @jwt_required()
 def upload_artwork():
-    user = User.query.get_or_404(get_jwt_identity())
     if "file" not in request.files:
         return jsonify({"error": "No file uploaded"}), 400
     file = request.files["file"]
@@ -435,9 +2576,18 @@ def upload_artwork():
     if not all([title, medium, category]):
         return jsonify({"error": "Title, medium, category required"}), 400
 
-    file_url = upload_to_cloudinary(file)
-    if not file_url:
-        return jsonify({"error": "Upload failed"}), 500
+    # Only the disk write (hashed on the way) happens here; storage + derivatives run
+    # in the upload pipeline, or are skipped when identical content is already stored
+    # (before the first query, which starts the write transaction)
+    staged, digest = stage_upload(file)
+    user = load_user(current_user_id())
+    if user is None:
+        staged.unlink()
+        return jsonify({"error": "Resource not found"}), 404
+    asset = Asset.query.filter_by(sha256=digest).first()
+    if asset:
+        staged.unlink()
+    file_url = PENDING_MEDIA_URL
 
     creation_date_obj = None
     if creation_date:
@@ -447,7 +2597,7 @@ def upload_artwork():
             pass
 
     artwork = Artwork(
-        user_id=user.id,
+        user_id=user["id"],
         title=title,
         description=description,
         medium=medium,
@@ -456,76 +2606,184 @@ def upload_artwork():
         thumbnail_url=file_url,
         tags=tags,
         creation_date=creation_date_obj,
-        status="approved" if user.verification_status == "verified" else "pending",
+        status="approved" if user["verification_status"] == "verified" else "pending",
     )
     db.session.add(artwork)
-    db.session.commit()
-
-    send_email(
-        user.email,
+    db.session.flush()
+    set_artwork_tags(artwork.id, tags)
+    if asset:
+        reuse_asset(artwork, asset)
+    else:
+        db.session.add(UploadJob(artwork_id=artwork.id, staging_path=str(staged), content_hash=digest))
+        db.session.info["wake_uploads"] = True
+    stats = {"artworks": 1, f"status:{artwork.status}": 1}
+    if artwork.status == "approved":
+        stats.update(approval_stats(artwork))
+        adjust_tag_counts([artwork.id])
+        bump_artist_summaries({artwork.user_id: {"artworks": 1, "latest": artwork.submission_date}})
+    bump_stats(stats)
+    invalidate_on_commit("artworks", f"gallery:{user['id']}")
+    queue_email(
+        user["email"],
         "Artwork submitted – ARTGRID",
-        f'Hello {user.full_name},\n\nYour artwork "{title}" has been submitted and is under review.\n\n– ARTGRID Team',
+        f'Hello {user["full_name"]},\n\nYour artwork "{title}" has been submitted and is under review.\n\n– ARTGRID Team',
     )
-    return jsonify({"message": "Artwork uploaded", "artwork_id": artwork.id, "status": artwork.status}), 201
+    db.session.commit()
+    return jsonify({"message": "Artwork uploaded", "artwork_id": artwork.id, "status": artwork.status,
+                    "deduplicated": asset is not None}), 201
 
 @app.route("/api/artworks", methods=["GET"])
+@read_only
+@cached_response("artworks")
 def get_artworks():
+    """
+    Public feed of approved artworks, newest first, filtered by ?category=,
+    ?medium=, ?featured=1 and ?tags=a,b&tag_mode=all|any. Paginated by page
+    number, or by cursor with ?cursor= (empty on the first page): a seek on
+    (submission_date, id) where the COUNT(*) only runs with ?include_total=1.
+    """
+    if request.args.get("status", "approved") != "approved":
+        return jsonify({"error": "Only approved artworks are listed here; see /api/admin/queue"}), 400
     page = request.args.get("page", 1, type=int)
-    per_page = request.args.get("per_page", 12, type=int)
+    per_page = per_page_arg(12)
     category = request.args.get("category")
     medium = request.args.get("medium")
-    featured = request.args.get("featured", type=bool)
+    featured = parse_bool(request.args.get("featured"))
 
-    query = Artwork.query.filter_by(status="approved")
+    query = with_artist(Artwork.query, User.full_name, User.year_of_study).filter_by(status="approved")
     if category:
         query = query.filter_by(category=category)
     if medium:
         query = query.filter_by(medium=medium)
     if featured:
         query = query.filter_by(is_featured=True)
+    tags = parse_tags(request.args.get("tags"))  # ?tags=a,b&tag_mode=all|any
+    if tags:
+        query = filter_by_tags(query, tags, request.args.get("tag_mode", "all"))
 
-    arts = query.order_by(Artwork.submission_date.desc()).paginate(page=page, per_page=per_page, error_out=False)
-    return jsonify(
-        artworks=[
-            {
-                "id": art.id,
-                "title": art.title,
-                "description": art.description,
-                "medium": art.medium,
-                "category": art.category,
-                "file_url": art.file_url,
-                "thumbnail_url": art.thumbnail_url,
-                "tags": art.tags,
-                "creation_date": art.creation_date.isoformat() if art.creation_date else None,
-                "submission_date": art.submission_date.isoformat(),
-                "likes_count": art.likes_count,
-                "views_count": art.views_count,
-                "is_featured": art.is_featured,
-                "artist": {
-                    "id": art.artist.id,
-                    "full_name": art.artist.full_name,
-                    "year_of_study": art.artist.year_of_study,
-                },
-            }
-            for art in arts.items
-        ],
-        pagination={
+    if "cursor" in request.args:
+        try:
+            items, next_cursor = keyset_page(query, [Artwork.submission_date, Artwork.id], per_page, request.args["cursor"])
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+        pagination = {"per_page": per_page, "next_cursor": next_cursor, "has_next": next_cursor is not None}
+        if parse_bool(request.args.get("include_total")):
+            pagination["total"] = query.count()
+    else:
+        arts = query.order_by(Artwork.submission_date.desc()).paginate(page=page, per_page=per_page, error_out=False)
+        items = arts.items
+        pagination = {
             "page": arts.page,
             "pages": arts.pages,
             "per_page": arts.per_page,
             "total": arts.total,
             "has_next": arts.has_next,
             "has_prev": arts.has_prev,
-        },
+        }
+    cache_tags(*(f"artwork:{a.id}" for a in items), *(f"user:{a.user_id}" for a in items))
+    return jsonify(
+        artworks=with_pending_views([feed_item(art) for art in items]),
+        pagination=pagination,
     )
 
+@app.route("/api/artworks/trending", methods=["GET"])
+@read_only
+@cached_response("trending", "artworks")
+def trending_artworks():
+    """Approved artworks by time-decayed likes/comments/views (see update_trending), cursor-paginated."""
+    per_page = per_page_arg(12)
+    query = (
+        ArtworkTrend.query.join(ArtworkTrend.artwork)  # only approved artworks are scored
+        .options(contains_eager(ArtworkTrend.artwork).joinedload(Artwork.artist)
+                 .load_only(User.id, User.full_name, User.year_of_study))
+    )
+    try:
+        # idx_artwork_trend_score: a backwards range read over the score index
+        trends, next_cursor = keyset_page(query, [ArtworkTrend.score, ArtworkTrend.artwork_id], per_page,
+                                          request.args.get("cursor"))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    cache_tags(*(f"artwork:{t.artwork_id}" for t in trends), *(f"user:{t.artwork.user_id}" for t in trends))
+    return jsonify(
+        artworks=with_pending_views([dict(feed_item(t.artwork), trend_score=round(current_trend(t.score), 4))
+                                     for t in trends]),
+        pagination={"per_page": per_page, "next_cursor": next_cursor, "has_next": next_cursor is not None},
+    )
+
+@app.route("/api/artworks/search", methods=["GET"])
+@read_only
+@cached_response("artworks")
+def search_artworks():
+    """
+    Full-text search over title, description, tags and (on SQLite) artist name,
+    ranked by BM25 / ts_rank and paginated by (score, id) cursor. ?prefix=0 disables prefix matching
+    of the last word; facets (category / medium counts) come with the first page.
+    """
+    if not search_available():
+        return jsonify({"error": "Search is not available on this database"}), 501
+    match = fts_query(request.args.get("q", ""), prefix=request.args.get("prefix", "1") != "0")
+    if not match:
+        return jsonify({"error": "q required"}), 400
+    per_page = per_page_arg(12)
+    cursor = request.args.get("cursor")
+
+    sql = search_sql()
+    where = [sql["match"], "a.status = 'approved'"]
+    params = {"match": match, "limit": per_page + 1}
+    for field in ("category", "medium"):
+        if request.args.get(field):
+            where.append(f"a.{field} = :{field}")
+            params[field] = request.args[field]
+    base_where = list(where)
+    score = sql["score"]
+    if cursor:
+        try:
+            params["after_score"], params["after_id"] = decode_cursor(cursor, [db.column("score", db.Float), Artwork.id])
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+        where.append(f"({score}, a.id) > (:after_score, :after_id)")
+
+    rows = db.session.execute(text(
+        f"SELECT a.id, {score} AS score FROM {sql['source']} "
+        f"WHERE {' AND '.join(where)} ORDER BY score, a.id LIMIT :limit"
+    ), params).all()
+    next_cursor = encode_cursor([rows[per_page - 1].score, rows[per_page - 1].id]) if len(rows) > per_page else None
+    rows = rows[:per_page]
+
+    by_id = {a.id: a for a in with_artist(Artwork.query, User.full_name, User.year_of_study)
+             .filter(Artwork.id.in_([r.id for r in rows]))}
+    items = [dict(feed_item(by_id[r.id]), score=-r.score) for r in rows if r.id in by_id]
+    cache_tags(*(f"artwork:{i['id']}" for i in items))
+    resp = {
+        "artworks": with_pending_views(items),
+        "pagination": {"per_page": per_page, "next_cursor": next_cursor, "has_next": next_cursor is not None},
+    }
+    if not cursor:
+        base_params = {k: v for k, v in params.items() if k not in ("after_score", "after_id", "limit")}
+        resp["facets"] = {
+            field: [{"value": v, "count": c} for v, c in db.session.execute(text(
+                f"SELECT a.{field}, count(*) FROM {sql['source']} "
+                f"WHERE {' AND '.join(base_where)} GROUP BY a.{field} ORDER BY count(*) DESC"
+            ), base_params)]
+            for field in ("category", "medium")
+        }
+    return jsonify(resp)
+
+def count_view(artwork_id):
+    view_counter.incr(artwork_id)
+
+def add_pending_views(payload, artwork_id):
+    """Per-request part of get_artwork: views recorded but not flushed yet."""
+    payload["views_count"] += view_counter.pending([artwork_id]).get(artwork_id, 0)
+
 @app.route("/api/artworks/<int:artwork_id>", methods=["GET"])
+@read_only
+@cached_response("artwork:{artwork_id}", "views:{artwork_id}", finalize=add_pending_views, on_serve=count_view)
 def get_artwork(artwork_id):
-    artwork = Artwork.query.get_or_404(artwork_id)
+    artwork = with_artist(Artwork.query, User.full_name, User.year_of_study, User.profile_image_url).get_or_404(artwork_id)
     if artwork.status != "approved":
         return jsonify({"error": "Artwork not found"}), 404
-    artwork.views_count += 1
-    db.session.commit()
+    cache_tags(f"user:{artwork.user_id}")
     return jsonify(
         id=artwork.id,
         title=artwork.title,
@@ -538,8 +2796,10 @@ def get_artwork(artwork_id):
         creation_date=artwork.creation_date.isoformat() if artwork.creation_date else None,
         submission_date=artwork.submission_date.isoformat(),
         likes_count=artwork.likes_count,
-        views_count=artwork.views_count,
+        views_count=artwork.views_count or 0,
+        comments_count=artwork.comments_count,
         is_featured=artwork.is_featured,
+        images=[d.to_dict() for d in ArtworkDerivative.query.filter_by(artwork_id=artwork.id)],
         artist={
             "id": artwork.artist.id,
             "full_name": artwork.artist.full_name,
@@ -551,24 +2811,40 @@ def get_artwork(artwork_id):
 @app.route("/api/artworks/<int:artwork_id>/like", methods=["POST"])
 @jwt_required()
 def toggle_like(artwork_id):
-    user_id = get_jwt_identity()
-    artwork = Artwork.query.get_or_404(artwork_id)
-    if artwork.status != "approved":
+    user_id = current_user_id()
+    artwork = db.session.query(Artwork.status, Artwork.user_id).filter_by(id=artwork_id).first()
+    if not artwork or artwork.status != "approved":
         return jsonify({"error": "Artwork not found"}), 404
 
-    like = Like.query.filter_by(user_id=user_id, artwork_id=artwork_id).first()
-    if like:
-        db.session.delete(like)
-        artwork.likes_count = max(0, artwork.likes_count - 1)
-        liked = False
+    # Delete-or-insert in SQL: the (user_id, artwork_id) unique constraint turns a
+    # concurrent double like into a no-op, and the counter moves with rowcount.
+    likes, a = Like.__table__, Artwork.__table__
+    removed = db.session.execute(
+        delete(likes).where(likes.c.user_id == user_id, likes.c.artwork_id == artwork_id)
+    ).rowcount
+    if removed:
+        liked, delta = False, -1
     else:
-        db.session.add(Like(user_id=user_id, artwork_id=artwork_id))
-        artwork.likes_count += 1
-        liked = True
+        inserted = db.session.execute(
+            insert_ignore(likes).values(user_id=user_id, artwork_id=artwork_id, timestamp=datetime.utcnow())
+        ).rowcount
+        liked, delta = True, (1 if inserted else 0)
+    bump_stats({"likes": delta})
+    if delta:
+        bump_artist_summaries({artwork.user_id: {"likes": delta}})
+    new_count = db.func.coalesce(a.c.likes_count, 0) + delta
+    likes_count = db.session.execute(
+        update(a).where(a.c.id == artwork_id)
+        .values(likes_count=case((new_count < 0, 0), else_=new_count))
+        .returning(a.c.likes_count)
+    ).scalar()
+    invalidate_on_commit(f"artwork:{artwork_id}")
     db.session.commit()
-    return jsonify({"liked": liked, "likes_count": artwork.likes_count})
+    return jsonify({"liked": liked, "likes_count": likes_count})
 
 @app.route("/api/artworks/categories", methods=["GET"])
+@read_only
+@cached_response("categories")
 def categories():
     return jsonify(
         categories=[
@@ -595,30 +2871,75 @@ def categories():
         ],
     )
 
+@app.route("/api/tags/top", methods=["GET"])
+@read_only
+@cached_response("tags")
+def top_tags():
+    """Tag cloud: the most used tags across approved artworks (?limit=, max 100)."""
+    limit = limit_arg("limit", 20)
+    top = Tag.query.filter(Tag.artwork_count > 0).order_by(Tag.artwork_count.desc(), Tag.name).limit(limit)
+    return jsonify(tags=[{"name": t.name, "count": t.artwork_count} for t in top])
 
 
 
 # ---------------------------------------------------------------------------
 # 9. COMMENTS
 # ---------------------------------------------------------------------------
+def comment_item(c):
+    """Comment payload for a comment loaded with_author(full_name)."""
+    return {
+        "id": c.id,
+        "content": c.content,
+        "timestamp": c.timestamp.isoformat(),
+        "user": {"id": c.user.id, "full_name": c.user.full_name},
+    }
+
 @app.route("/api/comments/<int:artwork_id>", methods=["GET"])
+@read_only
+@cached_response("comments:{artwork_id}", "artwork:{artwork_id}")
 def get_comments(artwork_id):
-    artwork = Artwork.query.get_or_404(artwork_id)
-    if artwork.status != "approved":
+    """Newest first, per_page at a time (max 100); follow next_cursor for older comments."""
+    artwork = db.session.query(Artwork.status, Artwork.comments_count).filter_by(id=artwork_id).first()
+    if not artwork or artwork.status != "approved":
         return jsonify({"error": "Artwork not found"}), 404
-    comments = Comment.query.filter_by(artwork_id=artwork_id, is_flagged=False).order_by(Comment.timestamp.desc()).all()
+    per_page = per_page_arg(20)
+    # idx_comment_artwork_visible: equality on (artwork_id, is_flagged), then a range seek on (timestamp, id)
+    query = with_author(Comment.query, User.full_name).filter(Comment.artwork_id == artwork_id, Comment.is_flagged == db.false())
+    try:
+        comments, next_cursor = keyset_page(query, [Comment.timestamp, Comment.id], per_page, request.args.get("cursor"))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    cache_tags(*(f"user:{c.user_id}" for c in comments))
     return jsonify(
-        comments=[
-            {
-                "id": c.id,
-                "content": c.content,
-                "timestamp": c.timestamp.isoformat(),
-                "user": {"id": c.user.id, "full_name": c.user.full_name},
-            }
-            for c in comments
-        ]
+        comments=[comment_item(c) for c in comments],
+        comments_count=artwork.comments_count,
+        next_cursor=next_cursor,
+        has_next=next_cursor is not None,
+        per_page=per_page,
     )
 
+def adjust_comment_count(artwork_id, delta):
+    """Move Artwork.comments_count with a visible comment appearing (+1) or disappearing (-1)."""
+    a = Artwork.__table__
+    new_count = a.c.comments_count + delta
+    db.session.execute(update(a).where(a.c.id == artwork_id).values(comments_count=case((new_count < 0, 0), else_=new_count)))
+    invalidate_on_commit(f"comments:{artwork_id}", f"artwork:{artwork_id}")
+
+def set_comment_flag(comment_id, flagged):
+    """
+    Hide (flagged=True) or restore a comment in the caller's transaction.
+    Guarded UPDATE: only a real state change moves comments_count, even under
+    concurrent moderators / scans. Returns the artwork id if it changed, else None.
+    """
+    c = Comment.__table__
+    artwork_id = db.session.execute(
+        update(c).where(c.c.id == comment_id, db.func.coalesce(c.c.is_flagged, db.false()) != flagged)
+        .values(is_flagged=flagged).returning(c.c.artwork_id)
+    ).scalar()
+    if artwork_id is not None:
+        adjust_comment_count(artwork_id, -1 if flagged else +1)
+    return artwork_id
+
 @app.route("/api/comments", methods=["POST"])
 @jwt_required()
 def add_comment():
@@ -627,29 +2948,50 @@ def add_comment():
     content = data.get("content")
     if not artwork_id or not content:
         return jsonify({"error": "Artwork ID and content required"}), 400
+    user_id = current_user_id()
+    limited = rate_limited((f"comment:{user_id}", parse_rate(app.config["COMMENT_RATE_PER_USER"])))
+    if limited:
+        return limited
 
     artwork = Artwork.query.get_or_404(artwork_id)
     if artwork.status != "approved":
         return jsonify({"error": "Artwork not found"}), 404
 
-    is_flagged = any(w in content.lower() for w in ["spam", "inappropriate"])
-    comment = Comment(user_id=get_jwt_identity(), artwork_id=artwork_id, content=content, is_flagged=is_flagged)
+    is_flagged = spam_reason(user_id, content) is not None
+    comment = Comment(user_id=user_id, artwork_id=artwork_id, content=content, is_flagged=is_flagged)
     db.session.add(comment)
+    if is_flagged:
+        invalidate_on_commit(f"comments:{artwork_id}")
+    else:
+        adjust_comment_count(artwork_id, +1)
+        if comment_scanner.enabled:
+            db.session.flush()  # the scan job needs the comment id
+            comment_scanner.enqueue(comment.id)
     db.session.commit()
-    return jsonify(
-        id=comment.id,
-        content=comment.content,
-        timestamp=comment.timestamp.isoformat(),
-        user={"id": comment.user.id, "full_name": comment.user.full_name},
-    ), 201
+    return jsonify(comment_item(comment)), 201
 
 # ---------------------------------------------------------------------------
 # 10. USER GALLERY
 # ---------------------------------------------------------------------------
 @app.route("/api/users/<int:user_id>/gallery", methods=["GET"])
+@read_only
+@cached_response("gallery:{user_id}", "user:{user_id}", "artist:{user_id}")
 def user_gallery(user_id):
+    """
+    Newest first, per_page at a time (max 100); follow next_cursor for older
+    artworks. The artist block comes from ArtistSummary, so neither part of
+    the response grows with the size of the gallery.
+    """
     user = User.query.get_or_404(user_id)
-    arts = Artwork.query.filter_by(user_id=user_id, status="approved").order_by(Artwork.submission_date.desc()).all()
+    per_page = per_page_arg(12)
+    # idx_artwork_user_gallery: equality on (user_id, status), then a range seek on (submission_date, id)
+    query = Artwork.query.filter(Artwork.user_id == user_id, Artwork.status == "approved")
+    try:
+        arts, next_cursor = keyset_page(query, [Artwork.submission_date, Artwork.id], per_page, request.args.get("cursor"))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    summary = db.session.get(ArtistSummary, user_id)
+    cache_tags(*(f"artwork:{a.id}" for a in arts))
     return jsonify(
         user={
             "id": user.id,
@@ -657,7 +2999,16 @@ def user_gallery(user_id):
             "year_of_study": user.year_of_study,
             "profile_image_url": user.profile_image_url,
         },
-        artworks=[
+        summary={
+            "artworks_count": summary.artworks_count if summary else 0,
+            "likes_total": summary.likes_total if summary else 0,
+            "views_total": summary.views_total if summary else 0,
+            "latest_upload": summary.latest_upload.isoformat() if summary and summary.latest_upload else None,
+        },
+        next_cursor=next_cursor,
+        has_next=next_cursor is not None,
+        per_page=per_page,
+        artworks=with_pending_views([
             {
                 "id": art.id,
                 "title": art.title,
@@ -672,18 +3023,20 @@ def user_gallery(user_id):
                 "is_featured": art.is_featured,
             }
             for art in arts
-        ],
+        ]),
     )
 
 # ---------------------------------------------------------------------------
 # 11. MODERATION
 # ---------------------------------------------------------------------------
 @app.route("/api/admin/queue", methods=["GET"])
+@read_only
 @moderator_required
 def mod_queue():
     page = request.args.get("page", 1, type=int)
-    per_page = request.args.get("per_page", 10, type=int)
-    pending = Artwork.query.filter_by(status="pending").order_by(Artwork.submission_date.asc()).paginate(page=page, per_page=per_page, error_out=False)
+    per_page = per_page_arg(10)
+    query = with_artist(Artwork.query, User.full_name, User.email, User.year_of_study, User.verification_status)
+    pending = query.filter_by(status="pending").order_by(Artwork.submission_date.asc()).paginate(page=page, per_page=per_page, error_out=False)
     return jsonify(
         artworks=[
             {
@@ -714,42 +3067,157 @@ def mod_queue():
         },
     )
 
+MODERATION_ACTIONS = {"approve": "approved", "approved": "approved", "reject": "rejected", "rejected": "rejected"}
+MODERATION_BATCH_LIMIT = 1000
+
+def apply_moderation(mod_id, decisions):
+    """
+    Move pending artworks to their decided status inside the caller's transaction:
+    one UPDATE per status (guarded by status = 'pending'), one bulk Moderation
+    insert, and the stats / tag counters / cache tags that follow.
+    *decisions* maps artwork_id -> (status, feedback). Returns (found, applied):
+    the artworks that exist and the ones actually moved, both {id: Artwork}.
+    """
+    found = {a.id: a for a in with_artist(Artwork.query, User.full_name, User.email, User.year_of_study)
+             .filter(Artwork.id.in_(list(decisions)))}
+    applied = {}
+    for status in ("approved", "rejected"):
+        ids = [i for i, (s, _) in decisions.items() if s == status and i in found]
+        if not ids:
+            continue
+        values = {"status": status}
+        if status == "approved":
+            values["approval_date"] = datetime.utcnow()
+        moved = db.session.execute(
+            update(Artwork).where(Artwork.id.in_(ids), Artwork.status == "pending").values(**values)
+            .returning(Artwork.id).execution_options(synchronize_session=False)
+        ).scalars().all()
+        applied.update((i, found[i]) for i in moved)
+    if not applied:
+        return found, applied
+
+    now = datetime.utcnow()
+    db.session.execute(db.insert(Moderation), [
+        {"artwork_id": i, "moderator_id": mod_id, "action": decisions[i][0],
+         "feedback": decisions[i][1] or None, "timestamp": now}
+        for i in applied
+    ])
+    stats = Counter()
+    approved = [i for i in applied if decisions[i][0] == "approved"]
+    for i in applied:
+        stats.update({"status:pending": -1, f"status:{decisions[i][0]}": 1})
+        if decisions[i][0] == "approved":
+            stats.update(approval_stats(applied[i]))
+    bump_stats(stats)
+    if approved:
+        adjust_tag_counts(approved)
+        artists = defaultdict(lambda: {"artworks": 0, "likes": 0, "views": 0, "latest": None})
+        for i in approved:
+            art, d = applied[i], artists[applied[i].user_id]
+            d["artworks"] += 1
+            d["likes"] += art.likes_count or 0
+            d["views"] += art.views_count or 0
+            d["latest"] = max(filter(None, (d["latest"], art.submission_date)), default=None)
+        bump_artist_summaries(artists)
+    invalidate_on_commit("artworks", *(f"artwork:{i}" for i in applied),
+                         *{f"gallery:{a.user_id}" for a in applied.values()})
+    for art in applied.values():
+        db.session.expire(art, ["status", "approval_date"])
+    return found, applied
+
 @app.route("/api/admin/approve/<int:artwork_id>", methods=["PUT"])
 @moderator_required
 def approve(artwork_id):
-    mod_id = get_jwt_identity()
-    art = Artwork.query.get_or_404(artwork_id)
-    if art.status != "pending":
+    found, applied = apply_moderation(current_user_id(), {artwork_id: ("approved", None)})
+    if not found:
+        return jsonify({"error": "Resource not found"}), 404
+    if not applied:
         return jsonify({"error": "Not pending"}), 400
-    art.status = "approved"
-    art.approval_date = datetime.utcnow()
-    db.session.add(Moderation(artwork_id=artwork_id, moderator_id=mod_id, action="approved"))
-    db.session.commit()
-    send_email(
+    art = applied[artwork_id]
+    queue_email(
         art.artist.email,
         "Artwork approved – ARTGRID",
         f'Hello {art.artist.full_name},\n\nYour artwork "{art.title}" is now live!\n\n– ARTGRID Team',
     )
+    db.session.commit()
     return jsonify({"message": "Approved"})
 
 @app.route("/api/admin/reject/<int:artwork_id>", methods=["PUT"])
 @moderator_required
 def reject(artwork_id):
-    mod_id = get_jwt_identity()
-    art = Artwork.query.get_or_404(artwork_id)
-    if art.status != "pending":
+    feedback = (request.get_json(silent=True) or {}).get("feedback", "")
+    found, applied = apply_moderation(current_user_id(), {artwork_id: ("rejected", feedback)})
+    if not found:
+        return jsonify({"error": "Resource not found"}), 404
+    if not applied:
         return jsonify({"error": "Not pending"}), 400
-    feedback = request.get_json().get("feedback", "")
-    art.status = "rejected"
-    db.session.add(Moderation(artwork_id=artwork_id, moderator_id=mod_id, action="rejected", feedback=feedback))
-    db.session.commit()
-    send_email(
+    art = applied[artwork_id]
+    queue_email(
         art.artist.email,
         "Artwork update – ARTGRID",
         f'Hello {art.artist.full_name},\n\nYour artwork "{art.title}" needs changes:\n{feedback}\n\n– ARTGRID Team',
     )
+    db.session.commit()
     return jsonify({"message": "Rejected"})
 
+@app.route("/api/admin/moderate/batch", methods=["POST"])
+@moderator_required
+def moderate_batch():
+    """
+    Approve / reject many artworks in one transaction. Body: a list (or {"items": [...]})
+    of {artwork_id, action: approve|reject, feedback}. Each artist gets one digest
+    email. Returns a result per item; invalid items don't block the valid ones.
+    """
+    body = request.get_json(silent=True)
+    items = body.get("items") if isinstance(body, dict) else body
+    if not isinstance(items, list) or not items:
+        return jsonify({"error": "A list of {artwork_id, action, feedback} is required"}), 400
+    if len(items) > MODERATION_BATCH_LIMIT:
+        return jsonify({"error": f"At most {MODERATION_BATCH_LIMIT} items per batch"}), 400
+
+    results, decisions = [], {}
+    for item in items:
+        item = item if isinstance(item, dict) else {}
+        artwork_id, action = item.get("artwork_id"), MODERATION_ACTIONS.get(item.get("action"))
+        result = {"artwork_id": artwork_id}
+        if not isinstance(artwork_id, int) or isinstance(artwork_id, bool):  # JSON true/false are ints to Python
+            result["error"] = "artwork_id required"
+        elif not action:
+            result["error"] = "action must be approve or reject"
+        elif artwork_id in decisions:
+            result["error"] = "Duplicate artwork_id"
+        else:
+            decisions[artwork_id] = (action, item.get("feedback") or "")
+        results.append(result)
+
+    found, applied = apply_moderation(current_user_id(), decisions) if decisions else ({}, {})
+    digests = defaultdict(list)
+    for result in results:
+        artwork_id = result["artwork_id"]
+        if "error" in result:
+            continue
+        if artwork_id not in found:
+            result["error"] = "Resource not found"
+        elif artwork_id not in applied:
+            result["error"] = "Not pending"
+        else:
+            result["status"] = decisions[artwork_id][0]
+            digests[applied[artwork_id].user_id].append(applied[artwork_id])
+    for arts in digests.values():
+        artist, lines = arts[0].artist, []
+        for art in arts:
+            status, feedback = decisions[art.id]
+            lines.append(f'- "{art.title}": ' + ("approved, now live" if status == "approved" else f"needs changes: {feedback}"))
+        queue_email(
+            artist.email,
+            "Moderation update – ARTGRID",
+            f"Hello {artist.full_name},\n\nYour artworks have been reviewed:\n" + "\n".join(lines) + "\n\n– ARTGRID Team",
+        )
+    db.session.commit()
+    for result in results:
+        result["ok"] = "error" not in result
+    return jsonify(results=results, applied=len(applied), failed=len(results) - len(applied))
+
 @app.route("/api/admin/feature/<int:artwork_id>", methods=["POST"])
 @moderator_required
 def feature_toggle(artwork_id):
@@ -757,36 +3225,98 @@ def feature_toggle(artwork_id):
     if art.status != "approved":
         return jsonify({"error": "Only approved artworks can be featured"}), 400
     art.is_featured = not art.is_featured
+    bump_stats({"featured": 1 if art.is_featured else -1})
+    invalidate_on_commit("artworks", f"artwork:{artwork_id}")
     db.session.commit()
     action = "featured" if art.is_featured else "unfeatured"
     return jsonify({"message": f"Artwork {action}", "is_featured": art.is_featured})
 
+@app.route("/api/admin/comments/<int:comment_id>/flag", methods=["PUT"])
+@moderator_required
+def flag_comment(comment_id):
+    """Hide ({"flagged": true}, the default) or restore a comment; the artwork's comments_count follows."""
+    flagged = bool((request.get_json(silent=True) or {}).get("flagged", True))
+    if set_comment_flag(comment_id, flagged) is None:
+        if not db.session.query(Comment.query.filter_by(id=comment_id).exists()).scalar():
+            return jsonify({"error": "Comment not found"}), 404
+        return jsonify({"message": "Comment unchanged", "is_flagged": flagged})
+    db.session.commit()
+    return jsonify({"message": "Comment flagged" if flagged else "Comment restored", "is_flagged": flagged})
+
+@app.route("/api/admin/blocked-terms", methods=["GET"])
+@read_only
+@moderator_required
+def list_blocked_terms():
+    terms = BlockedTerm.query.order_by(BlockedTerm.term).all()
+    return jsonify([{"id": t.id, "term": t.term, "created_at": t.created_at.isoformat() if t.created_at else None} for t in terms])
+
+@app.route("/api/admin/blocked-terms", methods=["POST"])
+@moderator_required
+def add_blocked_terms():
+    """Add {"term": "..."} or {"terms": [...]}; new comments are checked against them within COMMENT_FILTER_REFRESH."""
+    data = request.get_json(silent=True) or {}
+    raw = data.get("terms") or ([data["term"]] if data.get("term") else [])
+    if not isinstance(raw, list) or not all(isinstance(t, str) for t in raw):
+        return jsonify({"error": "terms must be a list of strings"}), 400
+    terms = sorted({normalize_term(t) for t in raw} - {""})
+    if not terms:
+        return jsonify({"error": "Term required"}), 400
+    now = datetime.utcnow()
+    added = len(db.session.execute(
+        insert_ignore(BlockedTerm.__table__).returning(BlockedTerm.id), [{"term": t, "created_at": now} for t in terms]
+    ).all())
+    if added:
+        comment_filter.bump_version()
+    db.session.commit()
+    return jsonify({"message": "Terms added", "added": added}), 201
+
+@app.route("/api/admin/blocked-terms/<int:term_id>", methods=["DELETE"])
+@moderator_required
+def delete_blocked_term(term_id):
+    if not db.session.execute(delete(BlockedTerm).where(BlockedTerm.id == term_id)).rowcount:
+        return jsonify({"error": "Term not found"}), 404
+    comment_filter.bump_version()
+    db.session.commit()
+    return jsonify({"message": "Term deleted"})
+
+@app.route("/api/admin/users/<int:user_id>/role", methods=["PUT"])
+@moderator_required
+def set_user_role(user_id):
+    """Admin only: change a user's role. Their existing tokens are revoked, as they carry the old role."""
+    if current_role() != "admin":
+        return jsonify({"error": "Admin access required"}), 403
+    role = (request.get_json(silent=True) or {}).get("role")
+    if role not in {"student", "moderator", "admin"}:
+        return jsonify({"error": "role must be student, moderator or admin"}), 400
+    user = User.query.get_or_404(user_id)
+    if user.role != role:
+        user.role = role
+        denylist.revoke_user(user.id)
+        invalidate_on_commit(f"user:{user.id}")
+        db.session.commit()
+    return jsonify({"message": "Role updated", "role": role})
+
 @app.route("/api/admin/stats", methods=["GET"])
+@read_only
 @moderator_required
 def admin_stats():
-    total_users = User.query.count()
-    artworks = Artwork.query
-    approved = artworks.filter_by(status="approved").count()
-    pending = artworks.filter_by(status="pending").count()
-    rejected = artworks.filter_by(status="rejected").count()
-    featured = artworks.filter_by(is_featured=True).count()
-
-    year_stats = db.session.query(User.year_of_study, db.func.count(Artwork.id).label("count")).join(Artwork).filter(Artwork.status == "approved").group_by(User.year_of_study).all()
-    cat_stats = db.session.query(Artwork.category, db.func.count(Artwork.id).label("count")).filter(Artwork.status == "approved").group_by(Artwork.category).all()
-    top = artworks.filter_by(status="approved").order_by(Artwork.likes_count.desc()).limit(10).all()
+    stats = dict(db.session.query(StatCounter.key, StatCounter.value))
+    # idx_artwork_status_likes turns the top-10 into an index range read
+    top = with_artist(Artwork.query, User.full_name).filter_by(status="approved").order_by(Artwork.likes_count.desc()).limit(10).all()
 
     return jsonify(
         overview={
-            "total_users": total_users,
-            "total_artworks": artworks.count(),
-            "pending_artworks": pending,
-            "approved_artworks": approved,
-            "rejected_artworks": rejected,
-            "featured_artworks": featured,
+            "total_users": stats.get("users", 0),
+            "total_artworks": stats.get("artworks", 0),
+            "pending_artworks": stats.get("status:pending", 0),
+            "approved_artworks": stats.get("status:approved", 0),
+            "rejected_artworks": stats.get("status:rejected", 0),
+            "featured_artworks": stats.get("featured", 0),
+            "total_likes": stats.get("likes", 0),
         },
-        year_stats=[{"year": y, "count": c} for y, c in year_stats],
-        category_stats=[{"category": cat, "count": c} for cat, c in cat_stats],
-        top_artworks=[
+        year_stats=[{"year": k[5:], "count": c} for k, c in sorted(stats.items()) if k.startswith("year:") and c],
+        category_stats=[{"category": k[9:], "count": c} for k, c in sorted(stats.items()) if k.startswith("category:") and c],
+        top_artworks=with_pending_views([
             {
                 "id": art.id,
                 "title": art.title,
@@ -795,20 +3325,159 @@ def admin_stats():
                 "artist_name": art.artist.full_name,
             }
             for art in top
-        ],
+        ]),
+    )
+
+@app.route("/api/admin/stats/check", methods=["GET"])
+@moderator_required
+def admin_stats_check():
+    """Consistency check: materialized counters vs. live aggregates. ?repair=1 rebuilds them."""
+    mismatches = check_stats()
+    if mismatches and parse_bool(request.args.get("repair")):
+        rebuild_stats()
+    return jsonify(consistent=not mismatches, mismatches=mismatches)
+
+# ---------------------------------------------------------------------------
+# 11.1. DATA EXPORT (streamed NDJSON / CSV)
+# ---------------------------------------------------------------------------
+# table name -> (model, timestamp columns matched by ?since=)
+EXPORTS = {
+    "artworks": (Artwork, ("submission_date", "approval_date")),
+    "likes": (Like, ("timestamp",)),
+    "comments": (Comment, ("timestamp",)),
+    "moderation": (Moderation, ("timestamp",)),
+}
+
+def export_value(value):
+    return value.isoformat() if isinstance(value, (date, datetime)) else value
+
+def export_batches(model, time_columns, since, until):
+    """
+    Yield the rows of *model*'s table in id order, EXPORT_BATCH_SIZE at a time,
+    from a streaming cursor (a server-side cursor on PostgreSQL), so memory
+    doesn't grow with the table. With *since*, only rows whose timestamps fall
+    in [since, until) are exported.
+    """
+    table = model.__table__
+    query = select(*table.c).order_by(table.c.id)
+    if since:
+        query = query.where(or_(*(and_(table.c[c] >= since, table.c[c] < until) for c in time_columns)))
+    result = db.session.execute(query.execution_options(yield_per=app.config["EXPORT_BATCH_SIZE"]))
+    yield from result.partitions()
+
+def ndjson_chunks(columns, batches):
+    for rows in batches:
+        yield "".join(
+            json.dumps(dict(zip(columns, map(export_value, row))), separators=(",", ":")) + "\n" for row in rows
+        ).encode()
+
+def csv_chunks(columns, batches):
+    buf = io.StringIO()
+    writer = csv.writer(buf)
+    writer.writerow(columns)
+    for rows in batches:
+        writer.writerows([export_value(v) for v in row] for row in rows)
+        yield buf.getvalue().encode()
+        buf.seek(0)
+        buf.truncate()
+    if buf.tell():
+        yield buf.getvalue().encode()  # header of an empty export
+
+def gzip_chunks(chunks):
+    z = zlib.compressobj(6, zlib.DEFLATED, 31)  # wbits=31: gzip container
+    for chunk in chunks:
+        if data := z.compress(chunk):
+            yield data
+    yield z.flush()
+
+@app.route("/api/admin/export/<name>", methods=["GET"])
+@read_only
+@moderator_required
+def export_table(name):
+    """
+    Stream a table as NDJSON (default) or CSV: ?format=csv, ?gzip=1,
+    ?since=<ISO timestamp> for an incremental export of the rows with a
+    timestamp in [since, until). until (the X-Export-Until header) trails the
+    clock by EXPORT_SAFETY_MARGIN seconds, because a timestamp is taken before
+    its row commits; pass it as the next run's since=. Consecutive windows
+    don't overlap, and a row is only missed if it commits more than the
+    margin after its timestamp. A row whose other timestamp moves later
+    (artworks: approval_date) is exported again in that window, and a full
+    export (no since) repeats its rows newer than until in the next delta.
+    """
+    if name not in EXPORTS:
+        return jsonify({"error": f"Unknown export; choose one of {', '.join(EXPORTS)}"}), 404
+    fmt = request.args.get("format", "ndjson")
+    if fmt not in {"ndjson", "csv"}:
+        return jsonify({"error": "format must be ndjson or csv"}), 400
+    try:
+        since = datetime.fromisoformat(request.args["since"]) if request.args.get("since") else None
+    except ValueError:
+        return jsonify({"error": "since must be an ISO 8601 timestamp"}), 400
+    if since and since.tzinfo:
+        since = since.astimezone(timezone.utc).replace(tzinfo=None)  # stored timestamps are naive UTC
+    until = datetime.utcnow() - timedelta(seconds=app.config["EXPORT_SAFETY_MARGIN"])
+
+    model, time_columns = EXPORTS[name]
+    columns = [c.name for c in model.__table__.c]
+    chunks = (ndjson_chunks if fmt == "ndjson" else csv_chunks)(columns, export_batches(model, time_columns, since, until))
+    filename = f"{name}-{until:%Y%m%dT%H%M%S}.{fmt}"
+    mimetype = "application/x-ndjson" if fmt == "ndjson" else "text/csv"
+    if parse_bool(request.args.get("gzip")):
+        chunks, filename, mimetype = gzip_chunks(chunks), filename + ".gz", "application/gzip"
+    return app.response_class(
+        stream_with_context(chunks),
+        mimetype=mimetype,
+        headers={
+            "Content-Disposition": f"attachment; filename={filename}",
+            "X-Export-Until": until.isoformat(),
+            "Cache-Control": "no-store",
+        },
     )
 
 # ---------------------------------------------------------------------------
 # 12. DB BOOTSTRAP
 # ---------------------------------------------------------------------------
+# Runs once per deployment, not per worker: from wsgi.py (loaded once in the gunicorn
+# master with preload_app), `flask --app server init-db`, or `python server.py`.
+def migration_include_name(name, type_, parent_names):
+    """Alembic filter: schema objects that are raw DDL in the migrations, not models, are left out of autogenerate."""
+    if type_ == "table":
+        return not name.startswith("artwork_fts")  # the FTS5 table and its shadow tables (SQLite)
+    if type_ == "index":
+        return name != "idx_artwork_search"  # expression GIN index over PG_SEARCH_VECTOR (PostgreSQL)
+    return True
+
+def run_migrations():
+    """
+    Bring the schema to the latest Alembic revision (migrations/). A database
+    created by create_all() before migrations existed (tables but no
+    alembic_version) is stamped as the 0001 baseline, upgraded, and then topped
+    up with any tables / indexes an older server.py never created.
+    """
+    cfg = AlembicConfig(str(BASE_DIR / "alembic.ini"))
+    cfg.set_main_option("script_location", str(BASE_DIR / "migrations"))
+    with db.engine.begin() as conn:
+        tables = inspect(conn).get_table_names()
+        legacy = "user" in tables and "alembic_version" not in tables
+        cfg.attributes["connection"] = conn
+        if legacy:
+            alembic_command.stamp(cfg, "0001")
+        alembic_command.upgrade(cfg, "head")
+        if legacy:
+            db.metadata.create_all(conn)
+            for table in db.metadata.sorted_tables:
+                for index in table.indexes:
+                    index.create(bind=conn, checkfirst=True)
+
 def seed_db():
-    """Create tables + default admin if missing."""
-    db.create_all()
+    """Create the default admin and derived data (stats, tags, search index) if missing."""
+    stats_missing = StatCounter.query.first() is None
     if not User.query.filter_by(email="admin@my.uopeople.edu").first():
         admin = User(
             full_name="ARTGRID Admin",
             email="admin@my.uopeople.edu",
-            password_hash=generate_password_hash("admin123"),
+            password_hash=generate_password_hash("admin123", app.config["PASSWORD_HASH_METHOD"]),
             dob_hash=hash_dob("1990-01-01"),
             student_id="ADMIN001",
             year_of_study="Graduate",
@@ -816,10 +3485,26 @@ def seed_db():
             verification_status="verified",
         )
         db.session.add(admin)
+        bump_stats({"users": 1})
         db.session.commit()
-
-with app.app_context():
-    seed_db()
+    if stats_missing:
+        rebuild_stats()
+    if ArtworkTag.query.first() is None and Artwork.query.filter(Artwork.tags.isnot(None), Artwork.tags != "").first():
+        sync_tags()
+    ensure_search_index()
+
+def bootstrap():
+    """Create / upgrade the schema and seed data (idempotent)."""
+    with app.app_context():
+        run_migrations()
+        seed_db()
+    dispose_engines()  # don't hand bootstrap connections down to forked workers
+
+@app.cli.command("init-db")
+def init_db_command():
+    """Apply migrations and create the default admin."""
+    bootstrap()
+    print("Database ready")
 
 # ---------------------------------------------------------------------------
 # 13. ERROR HANDLERS
@@ -838,4 +3523,5 @@ def internal(_):
 # 14. LOCAL ENTRY-POINT
 # ---------------------------------------------------------------------------
 if __name__ == "__main__":
+    bootstrap()
     app.run(debug=False, host="0.0.0.0", port=int(os.environ.get("PORT", 5000)))
\ No newline at end of file
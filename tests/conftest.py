@@ -0,0 +1,129 @@
+"""
+Test setup: a scratch database and upload / mail directories, never db/artgrid.db.
+
+server.py reads its configuration at import time, so the environment is set
+here, before the first import. The backend comes from TEST_DATABASE_URL
+(default: a SQLite file in a temporary directory); run the suite once per
+backend:
+
+    python -m pytest tests
+    TEST_DATABASE_URL=postgresql://user@localhost/artgrid_test python -m pytest tests
+
+A PostgreSQL test database is wiped (schema public is dropped) at the start
+of the run, so its name must contain "test".
+"""
+
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+import pytest
+
+BASE_DIR = Path(__file__).resolve().parents[1]
+WORK_DIR = Path(tempfile.mkdtemp(prefix="artgrid-tests-"))
+
+os.environ.update({
+    "DATABASE_URL": os.environ.get("TEST_DATABASE_URL") or f"sqlite:///{(WORK_DIR / 'test.db').as_posix()}",
+    "ARTGRID_RUN_DIR": str(WORK_DIR / "run"),
+    "STORAGE_BACKEND": "local",
+    "MAIL_TRANSPORT": "file",
+    "MAIL_FILE_DIR": str(WORK_DIR / "mail"),
+    "PASSWORD_HASH_METHOD": "pbkdf2:sha256:1000",  # fast; the method itself is not under test
+    "LOGIN_RATE_PER_EMAIL": "",
+    "LOGIN_RATE_PER_IP": "",
+    "COMMENT_RATE_PER_USER": "",
+    "CACHE_TTL": "0",  # tests that exercise the cache turn it on themselves
+    # background threads off: tests drain queues / flush counters explicitly
+    "UPLOAD_POLL_INTERVAL": "0",
+    "MAIL_POLL_INTERVAL": "0",
+    "VIEW_FLUSH_INTERVAL": "0",
+    "VIEW_FLUSH_THRESHOLD": "1000000",
+    "STATS_REBUILD_INTERVAL": "0",
+    "LIKES_RECONCILE_INTERVAL": "0",
+    "TRENDING_INTERVAL": "0",
+    "METRICS_FLUSH_INTERVAL": "0",
+    "PROFILE_THRESHOLD_MS": "0",
+})
+os.chdir(WORK_DIR)  # UPLOAD_FOLDER is relative to the working directory
+sys.path.insert(0, str(BASE_DIR))
+
+import server  # noqa: E402
+from sqlalchemy.engine import make_url  # noqa: E402
+
+ADMIN = {"email": "admin@my.uopeople.edu", "password": "admin123"}
+
+
+def reset_database():
+    url = make_url(server.app.config["SQLALCHEMY_DATABASE_URI"])
+    if url.get_backend_name() == "sqlite":
+        return  # a fresh file in WORK_DIR
+    if "test" not in (url.database or ""):
+        pytest.exit(f"Refusing to wipe {url.database!r}: TEST_DATABASE_URL must name a test database")
+    with server.app.app_context(), server.db.engine.begin() as conn:
+        conn.exec_driver_sql("DROP SCHEMA public CASCADE")
+        conn.exec_driver_sql("CREATE SCHEMA public")
+
+
+@pytest.fixture(scope="session")
+def app():
+    reset_database()
+    server.bootstrap()  # migrations + default admin
+    yield server.app
+    server.dispose_engines()
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+@pytest.fixture
+def admin_headers(client):
+    resp = client.post("/api/auth/login", json=ADMIN)
+    assert resp.status_code == 200, resp.get_json()
+    return {"Authorization": f"Bearer {resp.get_json()['access_token']}"}
+
+
+@pytest.fixture
+def student_headers(app, make_user):
+    """A bearer token for a fresh verified student (no login round trip)."""
+    user_id = make_user()
+    with app.app_context():
+        user = server.db.session.get(server.User, user_id)
+        token = server.create_access_token(identity=str(user_id), additional_claims=server.token_claims(user))
+    return {"Authorization": f"Bearer {token}"}
+
+
+@pytest.fixture(scope="session")
+def make_user(app):
+    """Insert a verified student directly; returns its id."""
+    counter = iter(range(10 ** 6))
+
+    def make(**fields):
+        n = next(counter)
+        with app.app_context():
+            user = server.User(
+                full_name=fields.pop("full_name", f"Student {n}"), email=f"student{n}@my.uopeople.edu",
+                password_hash="x", dob_hash="x", student_id=f"S{n}", year_of_study="1",
+                verification_status="verified", **fields,
+            )
+            server.db.session.add(user)
+            server.db.session.commit()
+            return user.id
+    return make
+
+
+@pytest.fixture(scope="session")
+def make_artworks(app):
+    """Insert *n* artworks of *user_id* directly (status approved by default); returns their ids."""
+    def make(user_id, n, status="approved", **fields):
+        with app.app_context():
+            arts = [server.Artwork(user_id=user_id, title=f"Artwork {i}", description="d", medium="Oil Paint",
+                                   category="Painting", file_url=f"/media/test/{user_id}/{i}.jpg",
+                                   thumbnail_url=f"/media/test/{user_id}/{i}.thumb.jpg", status=status, **fields)
+                    for i in range(n)]
+            server.db.session.add_all(arts)
+            server.db.session.commit()
+            return [a.id for a in arts]
+    return make
@@ -0,0 +1,75 @@
+"""Background work reads on the read pool and only takes the writer to write."""
+
+from contextlib import contextmanager
+
+import pytest
+from sqlalchemy import event
+
+import server
+
+
+@contextmanager
+def writer_statements(app):
+    """Statements sent on the writer engine (SQLite only: PostgreSQL has a single engine)."""
+    with app.app_context():
+        if "read" not in server.db.engines:
+            pytest.skip("no separate read pool on this backend")
+        writer = server.db.engines[None]
+    seen = []
+
+    def before(conn, cursor, statement, parameters, context, executemany):
+        seen.append(statement)
+
+    event.listen(writer, "before_cursor_execute", before)
+    try:
+        yield seen
+    finally:
+        event.remove(writer, "before_cursor_execute", before)
+
+
+def test_idle_job_poll_skips_the_writer(app):
+    with app.app_context():
+        server.email_queue.drain()  # clear anything queued by earlier tests
+        with writer_statements(app) as seen:
+            assert server.claim_jobs(server.EmailJob, 10, lease_seconds=60) == []
+            server.email_queue.drain()
+    assert seen == []
+
+
+def test_reconcile_without_drift_skips_the_writer(app):
+    with app.app_context():
+        server.reconcile_counts()
+        with writer_statements(app) as seen:
+            assert server.reconcile_counts() == 0
+    assert seen == []
+
+
+def test_rebuild_stats_keeps_increments_made_after_its_snapshot(app, make_user, monkeypatch):
+    snapshot = server.stats_snapshot
+
+    def racing_snapshot():
+        result = snapshot()
+        make_user()  # a registration commits between the aggregates and the write
+        server.bump_stats({"users": 1})
+        server.db.session.commit()
+        return result
+
+    with app.app_context():
+        server.db.session.execute(server.update(server.StatCounter.__table__).values(value=-7))
+        server.db.session.commit()
+        monkeypatch.setattr(server, "stats_snapshot", racing_snapshot)
+        server.rebuild_stats()
+        monkeypatch.setattr(server, "stats_snapshot", snapshot)
+        assert server.check_stats() == []
+
+
+def test_idle_trending_update_skips_the_writer(app, make_user, make_artworks):
+    artwork_id = make_artworks(make_user(), 1)[0]
+    with app.app_context():
+        server.db.session.add(server.Like(user_id=make_user(), artwork_id=artwork_id))
+        server.db.session.commit()
+        server.update_trending()
+        assert server.db.session.get(server.ArtworkTrend, artwork_id) is not None  # scored through the writer
+        with writer_statements(app) as seen:
+            server.update_trending()
+    assert seen == []
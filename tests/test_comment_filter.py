@@ -0,0 +1,97 @@
+"""Blocked terms: the trie regex, reloading after edits, and flagging by the filter and the deep scan."""
+
+import pytest
+
+import server
+
+
+def test_trie_regex():
+    pattern = server.trie_regex(["spam", "spic", "spit"])
+    assert pattern.pattern == "sp(?:am|i[ct])"
+    assert [pattern.search(w).group(0) for w in ("xspamx", "spice", "spit!")] == ["spam", "spic", "spit"]
+    assert server.trie_regex(["spam", "spice", "spit"]).pattern == "sp(?:am|i(?:ce|t))"
+    assert pattern.search("spa it") is None
+    assert server.trie_regex(["spa", "spam"]).search("spam").group(0) == "spa"  # the shorter term covers the longer
+    assert server.trie_regex(["a.b"]).search("axb") is None  # literal, not a regex
+    assert server.trie_regex(["a.b"]).search("a.b")
+    assert server.trie_regex([]) is None
+
+
+def test_match_normalizes_case_width_and_obfuscation(app):
+    with app.app_context():
+        server.db.session.add(server.BlockedTerm(term="grubnik"))
+        server.comment_filter.bump_version()
+        server.db.session.commit()
+        assert server.comment_filter.match("What a GRUBNIK move") == "grubnik"
+        assert server.comment_filter.match("ｇｒｕｂｎｉｋ") == "grubnik"  # full-width
+        assert server.comment_filter.match("g r u b n 1 k") is None
+        assert server.comment_filter.match_obfuscated("g.r-u b n 1 k") == "grubnik"
+
+
+def test_term_edits_reach_every_worker(app, client, admin_headers):
+    other_worker = server.CommentFilter(refresh=3600)
+    with app.app_context():
+        assert other_worker.match("a florbix here") is None
+        version = lambda: server.db.session.query(server.JobState.value).filter_by(name="blocked_terms").scalar()
+        before = version()
+
+    resp = client.post("/api/admin/blocked-terms", headers=admin_headers, json={"terms": ["  Florbix ", "florbix"]})
+    assert (resp.status_code, resp.get_json()["added"]) == (201, 1)
+    assert client.post("/api/admin/blocked-terms", headers=admin_headers, json={"term": "florbix"}).get_json()["added"] == 0
+    with app.app_context():
+        assert version() == before + 1
+        assert server.comment_filter.match("a florbix here") == "florbix"  # this worker: at once
+        assert other_worker.match("a florbix here") is None  # others: after COMMENT_FILTER_REFRESH
+        other_worker._checked_at -= 3600
+        assert other_worker.match("a florbix here") == "florbix"
+
+    term_id = next(t["id"] for t in client.get("/api/admin/blocked-terms", headers=admin_headers).get_json()
+                   if t["term"] == "florbix")
+    assert client.delete(f"/api/admin/blocked-terms/{term_id}", headers=admin_headers).status_code == 200
+    assert client.delete(f"/api/admin/blocked-terms/{term_id}", headers=admin_headers).status_code == 404
+    with app.app_context():
+        assert version() == before + 2
+        assert server.comment_filter.match("a florbix here") is None
+
+
+def test_blocked_terms_require_a_moderator(client, student_headers):
+    assert client.post("/api/admin/blocked-terms", headers=student_headers, json={"term": "x"}).status_code == 403
+    assert client.post("/api/admin/blocked-terms", json={"term": "x"}).status_code == 401
+
+
+def post_comment(client, headers, artwork_id, content):
+    resp = client.post("/api/comments", headers=headers, json={"artwork_id": artwork_id, "content": content})
+    assert resp.status_code == 201, resp.get_json()
+    return resp.get_json()["id"]
+
+
+def visible(client, artwork_id):
+    body = client.get(f"/api/comments/{artwork_id}").get_json()
+    return [c["id"] for c in body["comments"]], body["comments_count"]
+
+
+@pytest.fixture
+def artwork_id(make_user, make_artworks):
+    return make_artworks(make_user(), 1)[0]
+
+
+def test_blocked_comment_is_hidden(client, admin_headers, student_headers, artwork_id):
+    client.post("/api/admin/blocked-terms", headers=admin_headers, json={"term": "quexxle"})
+    ok = post_comment(client, student_headers, artwork_id, "Lovely colours")
+    post_comment(client, student_headers, artwork_id, "buy QUEXXLE now")
+    assert visible(client, artwork_id) == ([ok], 1)
+
+
+def test_deep_scan_flags_obfuscated_terms(app, client, admin_headers, student_headers, artwork_id, monkeypatch):
+    monkeypatch.setattr(server.comment_scanner, "scan", server.ObfuscationScan())
+    client.post("/api/admin/blocked-terms", headers=admin_headers, json={"term": "zindrop"})
+    ok = post_comment(client, student_headers, artwork_id, "Nice brushwork")
+    hidden = post_comment(client, student_headers, artwork_id, "visit z.i.n-d r 0 p today")
+    assert visible(client, artwork_id) == ([hidden, ok], 2)  # passes the cheap check
+
+    with app.app_context():
+        server.comment_scanner.drain()
+        jobs = server.CommentScanJob.query.filter(server.CommentScanJob.comment_id.in_([ok, hidden])).all()
+        assert {j.status for j in jobs} == {"done"}
+        assert server.db.session.get(server.Comment, hidden).is_flagged
+    assert visible(client, artwork_id) == ([ok], 1)
@@ -0,0 +1,20 @@
+"""Denylist: user-wide revocations cover tokens issued in the revocation's own second."""
+
+import server
+
+
+def test_revoke_user_covers_tokens_from_the_same_second(app, make_user):
+    user_id = make_user()
+    with app.app_context():
+        server.denylist.revoke_user(user_id)
+        server.db.session.commit()
+        revoked_at = server.denylist._entries[f"user:{user_id}"]
+        token = {"jti": "same-second", "sub": str(user_id)}
+        assert server.denylist.is_revoked(dict(token, iat=int(revoked_at) - 1))
+        assert server.denylist.is_revoked(dict(token, iat=int(revoked_at)))
+        assert not server.denylist.is_revoked(dict(token, iat=int(revoked_at) + 1))
+
+
+def test_revoked_token_is_rejected(client, admin_headers):
+    assert client.post("/api/auth/logout", headers=admin_headers).status_code == 200
+    assert client.get("/api/admin/stats", headers=admin_headers).status_code == 401
@@ -0,0 +1,109 @@
+"""The email job queue: delivery through the file transport, retry with backoff, giving up."""
+
+from datetime import datetime, timedelta
+from email import message_from_string
+from pathlib import Path
+
+import server
+
+
+def queue(app, *recipients):
+    with app.app_context():
+        jobs = [server.EmailJob(recipient=to, subject=f"Hello {to}", body="Welcome to ARTGRID") for to in recipients]
+        server.db.session.add_all(jobs)
+        server.db.session.commit()
+        return [job.id for job in jobs]
+
+
+def jobs(app, ids):
+    with app.app_context():
+        rows = server.EmailJob.query.filter(server.EmailJob.id.in_(ids)).order_by(server.EmailJob.id).all()
+        server.db.session.expunge_all()
+        return rows
+
+
+def make_due(app, ids):
+    with app.app_context():
+        server.EmailJob.query.filter(server.EmailJob.id.in_(ids)).update(
+            {"next_attempt_at": datetime.utcnow() - timedelta(seconds=1)})
+        server.db.session.commit()
+
+
+class FlakyTransport:
+    """Fails for the given recipients; a batch-wide exception when fail_all is set."""
+    def __init__(self, failing=(), fail_all=False):
+        self.failing, self.fail_all, self.sent = set(failing), fail_all, []
+
+    def send_batch(self, batch):
+        if self.fail_all:
+            raise ConnectionError("smtp down")
+        self.sent += [job.recipient for job in batch if job.recipient not in self.failing]
+        return {job.id: "mailbox unavailable" for job in batch if job.recipient in self.failing}
+
+
+def test_drain_delivers_through_the_file_transport(app):
+    ids = queue(app, "a@example.com", "b@example.com")
+    with app.app_context():
+        server.email_queue.drain()
+    for job in jobs(app, ids):
+        assert (job.status, job.attempts, job.last_error) == ("done", 1, None)
+        assert job.sent_at is not None
+        eml = message_from_string((Path(app.config["MAIL_FILE_DIR"]) / f"{job.id:08d}.eml").read_text())
+        assert (eml["To"], eml["Subject"]) == (job.recipient, f"Hello {job.recipient}")
+
+
+def test_queue_email_is_sent_after_commit(app):
+    with app.app_context():
+        server.queue_email("c@example.com", "Queued", "body")
+        server.db.session.commit()
+        job_id = server.EmailJob.query.filter_by(recipient="c@example.com").one().id
+        server.email_queue.drain()
+    assert jobs(app, [job_id])[0].status == "done"
+
+
+def test_failures_retry_with_backoff(app, monkeypatch):
+    transport = FlakyTransport(failing={"bad@example.com"})
+    monkeypatch.setattr(server.email_queue, "transport", transport)
+    monkeypatch.setitem(app.config, "MAIL_RETRY_BACKOFF", 30)
+    good, bad = queue(app, "good@example.com", "bad@example.com")
+
+    for attempt, delay in ((1, 30), (2, 60), (3, 120)):
+        before = datetime.utcnow()
+        with app.app_context():
+            server.email_queue.drain()
+            server.email_queue.drain()  # not due yet: nothing to claim
+        job = jobs(app, [bad])[0]
+        assert (job.status, job.attempts, job.last_error) == ("queued", attempt, "mailbox unavailable")
+        assert before + timedelta(seconds=delay - 1) <= job.next_attempt_at <= datetime.utcnow() + timedelta(seconds=delay)
+        make_due(app, [bad])
+
+    assert jobs(app, [good])[0].status == "done"
+    assert transport.sent.count("good@example.com") == 1
+
+
+def test_gives_up_after_max_attempts(app, monkeypatch):
+    monkeypatch.setattr(server.email_queue, "transport", FlakyTransport(fail_all=True))
+    monkeypatch.setitem(app.config, "MAIL_MAX_ATTEMPTS", 3)
+    ids = queue(app, "d@example.com", "e@example.com")
+    for _ in range(3):
+        with app.app_context():
+            server.email_queue.drain()
+        make_due(app, ids)
+    with app.app_context():
+        server.email_queue.drain()
+    for job in jobs(app, ids):
+        assert (job.status, job.attempts, job.last_error, job.sent_at) == ("failed", 3, "smtp down", None)
+
+
+def test_expired_lease_is_reclaimed(app):
+    """A job left "running" by a dead worker is picked up again once its lease runs out."""
+    [job_id] = queue(app, "f@example.com")
+    with app.app_context():
+        [job] = server.claim_jobs(server.EmailJob, 10, lease_seconds=300)
+        assert (job.id, job.status) == (job_id, "running")
+        assert server.claim_jobs(server.EmailJob, 10, lease_seconds=300) == []
+    make_due(app, [job_id])
+    with app.app_context():
+        server.email_queue.drain()
+    job = jobs(app, [job_id])[0]
+    assert (job.status, job.attempts) == ("done", 2)
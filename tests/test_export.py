@@ -0,0 +1,72 @@
+"""Admin export: NDJSON / CSV / gzip output and the since / X-Export-Until window."""
+
+import csv
+import gzip
+import io
+import json
+from datetime import datetime, timedelta
+
+import pytest
+
+import server
+
+
+@pytest.fixture
+def likes(app, make_user, make_artworks):
+    """Likes timestamped 2 h ago, 30 min ago and now; returns their ids in that order."""
+    artwork_id = make_artworks(make_user(), 1)[0]
+    now = datetime.utcnow()
+    with app.app_context():
+        rows = [server.Like(user_id=make_user(), artwork_id=artwork_id, timestamp=now - age)
+                for age in (timedelta(hours=2), timedelta(minutes=30), timedelta(0))]
+        server.db.session.add_all(rows)
+        server.db.session.commit()
+        return [r.id for r in rows]
+
+
+def export(client, headers, query=""):
+    resp = client.get(f"/api/admin/export/likes{query}", headers=headers)
+    assert resp.status_code == 200, resp.get_data()
+    return resp
+
+
+def ids(resp):
+    return {json.loads(line)["id"] for line in resp.get_data(as_text=True).splitlines()}
+
+
+def test_since_until_window(client, admin_headers, likes, monkeypatch):
+    old, recent, fresh = likes
+    since = (datetime.utcnow() - timedelta(hours=1)).isoformat()
+    first = export(client, admin_headers, f"?since={since}")
+    until = datetime.fromisoformat(first.headers["X-Export-Until"])
+    assert until <= datetime.utcnow() - timedelta(seconds=server.app.config["EXPORT_SAFETY_MARGIN"])
+    assert {old, fresh}.isdisjoint(ids(first)) and recent in ids(first)  # fresh is inside the safety margin
+
+    monkeypatch.setitem(server.app.config, "EXPORT_SAFETY_MARGIN", 0)
+    second = export(client, admin_headers, f"?since={until.isoformat()}")
+    assert fresh in ids(second) and {old, recent}.isdisjoint(ids(second))
+
+
+def test_formats(client, admin_headers, likes):
+    ndjson = export(client, admin_headers)
+    assert ndjson.mimetype == "application/x-ndjson"
+    records = [json.loads(line) for line in ndjson.get_data(as_text=True).splitlines()]
+    assert set(likes) <= {r["id"] for r in records}
+    assert set(records[0]) == {"id", "user_id", "artwork_id", "timestamp"}
+    assert [r["id"] for r in records] == sorted(r["id"] for r in records)
+
+    table = list(csv.reader(io.StringIO(export(client, admin_headers, "?format=csv").get_data(as_text=True))))
+    assert table[0] == ["id", "user_id", "artwork_id", "timestamp"]
+    assert [int(row[0]) for row in table[1:]] == [r["id"] for r in records]
+
+    zipped = export(client, admin_headers, "?gzip=1")
+    assert zipped.mimetype == "application/gzip"
+    assert zipped.headers["Content-Disposition"].endswith(".ndjson.gz")
+    assert gzip.decompress(zipped.get_data()) == ndjson.get_data()
+
+
+def test_bad_requests(client, admin_headers):
+    assert client.get("/api/admin/export/users", headers=admin_headers).status_code == 404
+    assert client.get("/api/admin/export/likes?format=xml", headers=admin_headers).status_code == 400
+    assert client.get("/api/admin/export/likes?since=yesterday", headers=admin_headers).status_code == 400
+    assert client.get("/api/admin/export/likes").status_code == 401
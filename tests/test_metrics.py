@@ -0,0 +1,58 @@
+"""Prometheus metrics, the Server-Timing header and access to /api/admin/metrics."""
+
+import re
+
+import server
+
+ROUTE = 'route="/api/artworks",method="GET"'
+
+
+def scrape(client, headers):
+    resp = client.get("/api/admin/metrics", headers=headers)
+    assert resp.status_code == 200, resp.get_data()
+    assert resp.mimetype == "text/plain"
+    return resp.get_data(as_text=True)
+
+
+def value(text, series):
+    match = re.search(rf"^{re.escape(series)} (\S+)$", text, re.MULTILINE)
+    return float(match.group(1)) if match else 0.0
+
+
+def test_request_is_counted_and_timed(client, admin_headers):
+    before = scrape(client, admin_headers)
+    resp = client.get("/api/artworks?per_page=1")
+    assert resp.status_code == 200
+    assert re.fullmatch(r'db;dur=\d+\.\d;desc="[1-9]\d* queries", app;dur=\d+\.\d', resp.headers["Server-Timing"])
+
+    after = scrape(client, admin_headers)
+    assert "# TYPE artgrid_requests_total counter" in after
+    assert "# TYPE artgrid_request_duration_seconds histogram" in after
+    for series in (f'artgrid_requests_total{{{ROUTE},status="200"}}',
+                   f"artgrid_request_duration_seconds_count{{{ROUTE}}}",
+                   f'artgrid_request_duration_seconds_bucket{{{ROUTE},le="+Inf"}}'):
+        assert value(after, series) == value(before, series) + 1, series
+    assert value(after, f"artgrid_sql_queries_total{{{ROUTE}}}") > value(before, f"artgrid_sql_queries_total{{{ROUTE}}}")
+    buckets = [float(v) for v in re.findall(rf'^artgrid_request_duration_seconds_bucket{{{re.escape(ROUTE)},le="[^"]+"}} (\S+)$',
+                                              after, re.MULTILINE)]
+    assert len(buckets) == len(server.Metrics.BUCKETS) + 1 and buckets == sorted(buckets)  # cumulative, le ascending
+
+
+def test_metrics_require_a_moderator_or_the_token(client, student_headers, monkeypatch):
+    assert client.get("/api/admin/metrics").status_code == 401
+    assert client.get("/api/admin/metrics", headers=student_headers).status_code == 403
+    monkeypatch.setitem(server.app.config, "METRICS_TOKEN", "scrape-secret")
+    assert client.get("/api/admin/metrics", headers={"Authorization": "Bearer wrong"}).status_code in (401, 422)
+    assert scrape(client, {"Authorization": "Bearer scrape-secret"}).startswith("# HELP")
+
+
+def test_shared_store_adds_up_workers(tmp_path):
+    workers = [server.Metrics(str(tmp_path / "metrics.db")) for _ in range(2)]
+    for m in workers:
+        m.observe_request("/x", "GET", 200, 0.02, 3, 0.001)
+        m.flush()
+    text = workers[0].render()
+    assert value(text, 'artgrid_requests_total{route="/x",method="GET",status="200"}') == 2
+    assert 'artgrid_request_duration_seconds_bucket{route="/x",method="GET",le="0.01"} 0' in text
+    assert value(text, 'artgrid_request_duration_seconds_bucket{route="/x",method="GET",le="0.025"}') == 2
+    assert value(text, 'artgrid_sql_queries_total{route="/x",method="GET"}') == 6
@@ -0,0 +1,82 @@
+"""Batch moderation: per-item validation, one transaction, one digest per artist."""
+
+import pytest
+
+import server
+
+
+@pytest.fixture
+def pending(make_user, make_artworks):
+    return make_artworks(make_user(), 3, status="pending")
+
+
+def statuses(app, ids):
+    with app.app_context():
+        return [server.db.session.get(server.Artwork, i).status for i in ids]
+
+
+def moderate(client, headers, items):
+    return client.post("/api/admin/moderate/batch", headers=headers, json=items)
+
+
+def test_mixed_batch(app, client, admin_headers, pending, make_user, make_artworks):
+    approved = make_artworks(make_user(), 1)[0]
+    resp = moderate(client, admin_headers, [
+        {"artwork_id": pending[0], "action": "approve"},
+        {"artwork_id": pending[1], "action": "reject", "feedback": "Blurry"},
+        {"artwork_id": pending[0], "action": "reject"},
+        {"artwork_id": True, "action": "approve"},
+        {"artwork_id": "7", "action": "approve"},
+        {"action": "approve"},
+        {"artwork_id": pending[2], "action": "publish"},
+        {"artwork_id": 10 ** 9, "action": "approve"},
+        {"artwork_id": approved, "action": "reject"},
+        "not an item",
+    ])
+    assert resp.status_code == 200
+    body = resp.get_json()
+    assert (body["applied"], body["failed"]) == (2, 8)
+    assert [r.get("status") or r["error"] for r in body["results"]] == [
+        "approved", "rejected", "Duplicate artwork_id", "artwork_id required", "artwork_id required",
+        "artwork_id required", "action must be approve or reject", "Resource not found", "Not pending",
+        "artwork_id required",
+    ]
+    assert statuses(app, pending + [approved]) == ["approved", "rejected", "pending", "approved"]
+    with app.app_context():
+        digests = server.EmailJob.query.filter_by(subject="Moderation update – ARTGRID").all()
+        assert len([d for d in digests if "Blurry" in d.body]) == 1  # one email for both decisions
+
+
+def test_true_is_not_artwork_one(app, client, admin_headers, make_user, make_artworks):
+    make_artworks(make_user(), 1, status="pending")  # make sure artwork 1 exists
+    with app.app_context():
+        before = (server.db.session.get(server.Artwork, 1).status, server.Moderation.query.count())
+    resp = moderate(client, admin_headers, [{"artwork_id": True, "action": "reject"}])
+    assert resp.get_json()["results"][0]["error"] == "artwork_id required"
+    assert resp.get_json()["applied"] == 0
+    with app.app_context():
+        assert (server.db.session.get(server.Artwork, 1).status, server.Moderation.query.count()) == before
+
+
+def test_batch_is_all_or_nothing(app, client, admin_headers, pending, monkeypatch):
+    def fail(*args):
+        raise RuntimeError("mail queue unavailable")
+
+    monkeypatch.setattr(server, "queue_email", fail)
+    items = [{"artwork_id": i, "action": "approve"} for i in pending]
+    assert moderate(client, admin_headers, items).status_code == 500
+    assert statuses(app, pending) == ["pending"] * 3
+    with app.app_context():
+        assert server.Moderation.query.filter(server.Moderation.artwork_id.in_(pending)).count() == 0
+
+    monkeypatch.undo()
+    assert moderate(client, admin_headers, items).get_json()["applied"] == 3
+    assert statuses(app, pending) == ["approved"] * 3
+    again = moderate(client, admin_headers, items).get_json()
+    assert again["applied"] == 0 and {r["error"] for r in again["results"]} == {"Not pending"}
+
+
+def test_batch_requires_a_list(client, admin_headers):
+    assert moderate(client, admin_headers, {"items": []}).status_code == 400
+    assert moderate(client, admin_headers, {"artwork_id": 1}).status_code == 400
+    assert client.post("/api/admin/moderate/batch", json=[]).status_code == 401
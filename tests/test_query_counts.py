@@ -0,0 +1,118 @@
+"""
+The read endpoints load related rows eagerly (with_artist / with_author / joinedload),
+so the number of SQL statements per request must not grow with the page size.
+"""
+
+import base64
+import threading
+from contextlib import contextmanager
+
+import pytest
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+import server
+
+
+@contextmanager
+def count_queries():
+    """Count statements sent on this thread (background tasks use their own threads)."""
+    me, seen = threading.get_ident(), []
+
+    def before(conn, cursor, statement, parameters, context, executemany):
+        if threading.get_ident() == me:
+            seen.append(statement)
+
+    event.listen(Engine, "before_cursor_execute", before)
+    try:
+        yield seen
+    finally:
+        event.remove(Engine, "before_cursor_execute", before)
+
+
+def queries_for(client, url, headers=None):
+    client.get(url, headers=headers)  # warm-up: per-process lookups (denylist, word list) load on first use
+    with count_queries() as seen:
+        resp = client.get(url, headers=headers)
+    assert resp.status_code == 200, resp.get_json()
+    return len(seen), resp.get_json()
+
+
+@pytest.fixture(scope="module")
+def dataset(app, make_user, make_artworks):
+    """60+ approved artworks by distinct artists, one prolific artist, 60 pending works, 60 commenters."""
+    prolific = make_user()
+    make_artworks(prolific, 60)
+    artists = [make_user() for _ in range(60)]
+    feed = [make_artworks(u, 1)[0] for u in artists]  # newest first: every card has its own artist
+    for u in artists:
+        make_artworks(u, 1, status="pending")
+    discussed = feed[0]
+    with app.app_context():
+        server.db.session.add_all(server.Comment(user_id=u, artwork_id=discussed, content=f"Comment by {u}")
+                                  for u in artists)
+        server.db.session.add_all(server.Like(user_id=u, artwork_id=a) for u in artists[:50] for a in feed[:2])
+        server.db.session.commit()
+        server.update_trending()
+    return {"feed": feed, "prolific": prolific, "discussed": discussed}
+
+
+@pytest.mark.parametrize("url", [
+    "/api/artworks?per_page={n}",
+    "/api/artworks?cursor=&per_page={n}",
+    "/api/artworks/trending?per_page={n}",
+    "/api/users/{prolific}/gallery?per_page={n}",
+    "/api/comments/{discussed}?per_page={n}",
+])
+def test_public_pages_constant_queries(client, dataset, url):
+    small, body_small = queries_for(client, url.format(n=5, **dataset))
+    large, body_large = queries_for(client, url.format(n=50, **dataset))
+    assert len(str(body_large)) > len(str(body_small))  # the larger page really holds more rows
+    assert large == small
+
+
+def test_mod_queue_constant_queries(client, dataset, admin_headers):
+    small, body_small = queries_for(client, "/api/admin/queue?per_page=5", admin_headers)
+    large, body_large = queries_for(client, "/api/admin/queue?per_page=50", admin_headers)
+    assert (len(body_small["artworks"]), len(body_large["artworks"])) == (5, 50)
+    assert large == small
+
+
+def test_get_artwork_constant_queries(client, dataset):
+    quiet, _ = queries_for(client, f"/api/artworks/{dataset['feed'][-1]}")
+    busy, _ = queries_for(client, f"/api/artworks/{dataset['discussed']}")  # 50 likes, 60 comments
+    assert busy == quiet
+
+
+def test_admin_stats_constant_queries(client, dataset, admin_headers, make_user, make_artworks):
+    before, _ = queries_for(client, "/api/admin/stats", admin_headers)
+    make_artworks(make_user(), 50, status="rejected")
+    after, _ = queries_for(client, "/api/admin/stats", admin_headers)
+    assert after == before
+
+
+def cursor(raw):
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+@pytest.mark.parametrize("raw", ['[{"a":1},1]', '["x","y"]', '[true,1]', '[1,"2"]', '[1e400,1]', '[NaN,1]',
+                                 '["2024-01-01T00:00:00",99999999999999999999]', '[1]', '{}', 'not json'])
+@pytest.mark.parametrize("url", [
+    "/api/artworks?cursor={c}",
+    "/api/artworks/trending?cursor={c}",
+    "/api/artworks/search?q=artwork&cursor={c}",
+    "/api/users/{prolific}/gallery?cursor={c}",
+    "/api/comments/{discussed}?cursor={c}",
+])
+def test_malformed_cursor_is_a_400(client, dataset, url, raw):
+    resp = client.get(url.format(c=cursor(raw), **dataset))
+    assert resp.status_code == 400, resp.get_json()
+
+
+def test_next_cursor_round_trips(client, dataset):
+    for url in ("/api/artworks?cursor=&per_page=1", "/api/artworks/trending?per_page=1",
+                "/api/artworks/search?q=artwork&per_page=1", f"/api/users/{dataset['prolific']}/gallery?per_page=1",
+                f"/api/comments/{dataset['discussed']}?per_page=1"):
+        body = client.get(url).get_json()
+        next_cursor = body.get("pagination", body)["next_cursor"]  # comments / gallery: top level
+        assert next_cursor and client.get(f"{url}&cursor={next_cursor}").status_code == 200, url
@@ -0,0 +1,71 @@
+"""cached_response: ETag revalidation, view counting, invalidation on view flush."""
+
+import pytest
+
+import server
+
+
+@pytest.fixture
+def caching(monkeypatch):
+    monkeypatch.setattr(server.response_cache, "ttl", 60)
+
+
+@pytest.fixture
+def artwork_id(make_user, make_artworks):
+    return make_artworks(make_user(), 1)[0]
+
+
+def pending_views(artwork_id):
+    return server.view_counter.pending([artwork_id]).get(artwork_id, 0)
+
+
+@pytest.mark.parametrize("cache_on", [True, False])
+def test_artwork_revalidation_is_a_304_and_still_a_view(client, artwork_id, monkeypatch, cache_on):
+    monkeypatch.setattr(server.response_cache, "ttl", 60 if cache_on else 0)
+    first = client.get(f"/api/artworks/{artwork_id}")
+    etag = first.headers["ETag"]
+    assert first.status_code == 200
+    for n in range(3):
+        again = client.get(f"/api/artworks/{artwork_id}", headers={"If-None-Match": etag})
+        assert again.status_code == 304
+        assert again.get_data() == b""
+        assert again.headers["ETag"] == etag
+    assert pending_views(artwork_id) == 4  # the first view + three revalidations
+
+    full = client.get(f"/api/artworks/{artwork_id}")
+    assert full.status_code == 200 and full.headers["ETag"] == etag
+    assert full.get_json()["views_count"] == 5  # pending views are overlaid on full responses
+
+
+def test_view_flush_refreshes_cached_lists(client, caching, make_user, make_artworks):
+    artwork_id = make_artworks(make_user(), 1)[0]
+    newest = "/api/artworks?per_page=1"
+    card = client.get(newest).get_json()["artworks"][0]
+    assert (card["id"], card["views_count"]) == (artwork_id, 0)
+    client.get(f"/api/artworks/{artwork_id}")
+    server.view_counter.flush()
+    assert client.get(newest).get_json()["artworks"][0]["views_count"] == 1
+
+
+def test_etag_changes_with_the_payload(client, caching, artwork_id, admin_headers):
+    etag = client.get(f"/api/artworks/{artwork_id}").headers["ETag"]
+    assert client.post(f"/api/admin/feature/{artwork_id}", headers=admin_headers).status_code == 200
+    resp = client.get(f"/api/artworks/{artwork_id}", headers={"If-None-Match": etag})
+    assert resp.status_code == 200 and resp.headers["ETag"] != etag
+
+
+def test_user_cache_is_independent_of_the_response_cache(app, make_user, monkeypatch):
+    monkeypatch.setattr(server.response_cache, "ttl", 0)  # response caching off
+    user_id = make_user(full_name="Cached Student")
+    with app.app_context():
+        assert server.load_user(user_id)["full_name"] == "Cached Student"
+        server.db.session.get(server.User, user_id).full_name = "Renamed Student"
+        server.db.session.commit()
+        assert server.load_user(user_id)["full_name"] == "Cached Student"  # still served from user_cache
+        server.response_cache.invalidate(f"user:{user_id}")  # what invalidate_on_commit does after a profile edit
+        assert server.load_user(user_id)["full_name"] == "Renamed Student"
+
+        monkeypatch.setattr(server.user_cache, "ttl", 0)
+        server.db.session.get(server.User, user_id).full_name = "Uncached Student"
+        server.db.session.commit()
+        assert server.load_user(user_id)["full_name"] == "Uncached Student"
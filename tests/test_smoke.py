@@ -0,0 +1,111 @@
+"""
+End-to-end smoke test of the main flows on the configured backend (see
+conftest.py: run once with the default SQLite file and once with
+TEST_DATABASE_URL pointing at PostgreSQL).
+"""
+
+import io
+
+from alembic.autogenerate import compare_metadata
+from alembic.migration import MigrationContext
+from alembic.script import ScriptDirectory
+from PIL import Image
+
+import server
+from conftest import BASE_DIR
+
+
+def alembic_script():
+    cfg = server.AlembicConfig(str(BASE_DIR / "alembic.ini"))
+    cfg.set_main_option("script_location", str(BASE_DIR / "migrations"))
+    return ScriptDirectory.from_config(cfg)
+
+
+def test_migrations_match_models(app):
+    with app.app_context(), server.db.engine.connect() as conn:
+        ctx = MigrationContext.configure(conn, opts={"include_name": server.migration_include_name})
+        assert ctx.get_current_revision() == alembic_script().get_current_head()
+        assert compare_metadata(ctx, server.db.metadata) == []
+
+
+def register_and_login(client, n):
+    user = {"full_name": f"Smoke Tester {n}", "email": f"smoke{n}@my.uopeople.edu", "password": "s3cret-pass",
+            "dob": "2000-01-01", "student_id": f"SMOKE{n}", "year_of_study": "2"}
+    resp = client.post("/api/auth/register", json=user)
+    assert resp.status_code == 201, resp.get_json()
+    resp = client.post("/api/auth/login", json={"email": user["email"], "password": user["password"]})
+    assert resp.status_code == 200, resp.get_json()
+    return {"Authorization": f"Bearer {resp.get_json()['access_token']}"}
+
+
+def png(color):
+    buf = io.BytesIO()
+    Image.new("RGB", (640, 480), color).save(buf, "PNG")
+    buf.seek(0)
+    return buf
+
+
+def test_register_upload_search_like(app, client):
+    headers = register_and_login(client, 1)
+    resp = client.post("/api/artworks/upload", headers=headers, content_type="multipart/form-data", data={
+        "title": "Cerulean harbour at dawn", "medium": "Oil Paint", "category": "Painting",
+        "tags": "harbour, blue", "file": (png((20, 60, 200)), "harbour.png"),
+    })
+    assert resp.status_code == 201, resp.get_json()
+    artwork_id = resp.get_json()["artwork_id"]
+    assert resp.get_json()["status"] == "approved"  # verified student: no moderation step
+    assert client.get(f"/api/artworks/{artwork_id}").get_json()["thumbnail_url"] == server.PENDING_MEDIA_URL
+
+    with app.app_context():
+        server.upload_pipeline.drain()  # claim_jobs + derivatives + storage
+        job = server.UploadJob.query.filter_by(artwork_id=artwork_id).one()
+        assert job.status == "done"
+    artwork = client.get(f"/api/artworks/{artwork_id}").get_json()
+    assert artwork["thumbnail_url"].startswith("/media/assets/")
+    assert client.get(artwork["thumbnail_url"]).status_code == 200
+
+    found = client.get("/api/artworks/search?q=cerulean harb").get_json()
+    assert [a["id"] for a in found["artworks"]] == [artwork_id]
+    assert client.get("/api/artworks?tags=harbour").get_json()["artworks"][0]["id"] == artwork_id
+
+    liker = register_and_login(client, 2)
+    assert client.post(f"/api/artworks/{artwork_id}/like", headers=liker).get_json() == {"liked": True, "likes_count": 1}
+    assert client.post(f"/api/artworks/{artwork_id}/like", headers=liker).get_json() == {"liked": False, "likes_count": 0}
+    assert client.post(f"/api/artworks/{artwork_id}/like", headers=liker).get_json() == {"liked": True, "likes_count": 1}
+    with app.app_context():
+        assert server.Like.query.filter_by(artwork_id=artwork_id).count() == 1
+        artist_id = server.db.session.get(server.Artwork, artwork_id).user_id
+    summary = client.get(f"/api/users/{artist_id}/gallery").get_json()["summary"]
+    assert (summary["artworks_count"], summary["likes_total"]) == (1, 1)
+
+
+def test_insert_ignore_skips_duplicates(app):
+    with app.app_context():
+        tags = server.Tag.__table__
+        first = server.db.session.execute(server.insert_ignore(tags).values(name="smoke-dup", artwork_count=0))
+        again = server.db.session.execute(server.insert_ignore(tags).values(name="smoke-dup", artwork_count=0))
+        assert (first.rowcount, again.rowcount) == (1, 0)
+        server.db.session.rollback()
+
+
+def test_claim_jobs_never_hands_out_a_job_twice(app):
+    with app.app_context():
+        server.db.session.add_all(server.EmailJob(recipient=f"claim{i}@example.com", subject="s", body="b")
+                                  for i in range(3))
+        server.db.session.commit()
+        first = server.claim_jobs(server.EmailJob, 2, lease_seconds=60)
+        second = server.claim_jobs(server.EmailJob, 10, lease_seconds=60)
+        assert len(first) == 2
+        assert {j.id for j in first}.isdisjoint(j.id for j in second)
+        assert all(j.status == "running" and j.attempts == 1 for j in first + second)
+
+
+def test_top_tags_limit_is_clamped(app, client):
+    with app.app_context():
+        server.db.session.add_all(server.Tag(name=f"clamp-{i}", artwork_count=i + 1) for i in range(3))
+        server.db.session.commit()
+    for limit, expected in (("-5", 1), ("0", 1), ("2", 2), ("1000", None)):
+        resp = client.get(f"/api/tags/top?limit={limit}")
+        assert resp.status_code == 200
+        tags = resp.get_json()["tags"]
+        assert len(tags) == expected if expected else 3 <= len(tags) <= 100
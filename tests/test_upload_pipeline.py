@@ -0,0 +1,40 @@
+"""UploadPipeline.drain: failed jobs roll back their partial changes and are retried."""
+
+from datetime import datetime
+
+import server
+
+
+def test_failed_finish_is_rolled_back_and_requeued(app, make_user, make_artworks, monkeypatch):
+    artwork_id = make_artworks(make_user(), 1)[0]
+    staged = server.STAGING_DIR / "pipeline-failure.png"
+    staged.write_bytes(b"not an image")
+    monkeypatch.setitem(app.config, "UPLOAD_MAX_ATTEMPTS", 2)
+    monkeypatch.setitem(app.config, "UPLOAD_RETRY_BACKOFF", 600)
+
+    def finish(job, derivatives, phash):
+        server.db.session.get(server.Artwork, job.artwork_id).title = "half-finished"
+        raise RuntimeError("storage unavailable")
+
+    monkeypatch.setattr(server.upload_pipeline, "finish", finish)
+    with app.app_context():
+        server.db.session.add(server.UploadJob(artwork_id=artwork_id, staging_path=str(staged)))
+        server.db.session.commit()
+
+        server.upload_pipeline.drain()
+        job = server.UploadJob.query.filter_by(artwork_id=artwork_id).one()
+        assert (job.status, job.attempts, job.last_error) == ("queued", 1, "storage unavailable")
+        assert job.next_attempt_at > datetime.utcnow()  # backoff from UPLOAD_RETRY_BACKOFF
+        assert server.db.session.get(server.Artwork, artwork_id).title == "Artwork 0"
+
+        job.next_attempt_at = datetime.utcnow()
+        server.db.session.commit()
+        server.upload_pipeline.drain()
+        assert server.UploadJob.query.filter_by(artwork_id=artwork_id).one().status == "failed"
+    assert staged.exists()  # kept for a manual retry
+
+
+def test_staged_uploads_are_not_served(client):
+    (server.STAGING_DIR / "private.png").write_bytes(b"staged")
+    for path in ("/media/staging/private.png", "/media/assets/../staging/private.png"):
+        assert client.get(path).get_data() != b"staged"
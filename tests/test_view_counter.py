@@ -0,0 +1,65 @@
+"""ViewCounter: threshold flushes without a flush thread, and the shared spool."""
+
+import pytest
+
+import server
+
+
+def test_threshold_flushes_inline_without_a_thread(app, client, make_user, make_artworks, monkeypatch):
+    artwork_id = make_artworks(make_user(), 1)[0]
+    server.view_counter.flush()
+    monkeypatch.setattr(server.view_counter, "threshold", 3)
+    assert not server.view_counter.task.running()
+
+    for _ in range(2):
+        client.get(f"/api/artworks/{artwork_id}")
+    assert server.view_counter.pending([artwork_id]) == {artwork_id: 2}
+
+    client.get(f"/api/artworks/{artwork_id}")
+    assert server.view_counter.pending([artwork_id]) == {}
+    with app.app_context():
+        assert server.db.session.get(server.Artwork, artwork_id).views_count == 3
+
+
+def spooled_counter(path, interval):
+    counter = server.ViewCounter(threshold=1000, spool_path=str(path))
+    counter.task.interval = interval  # no thread is started: interval 0 in the test config
+    return counter
+
+
+def test_spool_is_shared_until_one_worker_applies_it(app, make_user, make_artworks, tmp_path):
+    artwork_id = make_artworks(make_user(), 1)[0]
+    a, b = spooled_counter(tmp_path / "spool.db", 60), spooled_counter(tmp_path / "spool.db", 60)
+
+    a.incr(artwork_id, 2)
+    a.flush()  # moved into the spool, not applied: the interval hasn't passed
+    assert b.pending([artwork_id]) == {artwork_id: 2}
+    b.incr(artwork_id)
+    b.flush()
+    assert a.pending([artwork_id]) == {artwork_id: 3}
+    with app.app_context():
+        assert server.db.session.get(server.Artwork, artwork_id).views_count == 0
+
+    b.flush(force=True)
+    assert a.pending([artwork_id]) == {}
+    with app.app_context():
+        assert server.db.session.get(server.Artwork, artwork_id).views_count == 3
+
+
+def test_spool_keeps_views_when_the_database_write_fails(app, make_user, make_artworks, tmp_path, monkeypatch):
+    artwork_id = make_artworks(make_user(), 1)[0]
+    worker = spooled_counter(tmp_path / "spool.db", 0)
+    worker.incr(artwork_id, 4)
+
+    def fail(batch):
+        raise RuntimeError("database is locked")
+
+    monkeypatch.setattr(worker, "_apply", fail)
+    with pytest.raises(RuntimeError):
+        worker.flush()
+    assert worker._pending == {}  # in the spool, not back in this worker's memory
+    survivor = spooled_counter(tmp_path / "spool.db", 0)
+    assert survivor.pending([artwork_id]) == {artwork_id: 4}
+    survivor.flush()
+    with app.app_context():
+        assert server.db.session.get(server.Artwork, artwork_id).views_count == 4
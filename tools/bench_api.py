@@ -0,0 +1,514 @@
+"""
+Load test / benchmark for the API hot paths.
+- Seeds a synthetic dataset (users, artworks, tags, likes, comments) into a
+  scratch database, never db/artgrid.db. The seed is reused while the scale is unchanged.
+- Drives the hot endpoints through the Flask test client (in-process) and/or a
+  real gunicorn server (gunicorn.conf.py), with N concurrent clients.
+- Reports p50/p95/p99 latency and requests/s per endpoint. Read responses are
+  checked (non-empty, filters applied); error statuses and failed checks count
+  as errors, and a run with errors exits 1 without writing results.
+- Writes the results as JSON; with --baseline, compares against an earlier run
+  and exits with status 1 when an endpoint regressed beyond --tolerance.
+
+Usage:
+    python tools/bench_api.py [--users N] [--artworks N] [--likes N] [--comments N]
+                              [--mode client|gunicorn|both] [--requests N] [--concurrency N]
+                              [--output bench.json] [--baseline old.json]
+
+    # full scale: expect the seed to take a while (it is kept for the next runs)
+    python tools/bench_api.py --users 10000 --artworks 1000000 --likes 10000000
+"""
+
+import argparse
+import http.client
+import importlib
+import json
+import os
+import platform
+import random
+import signal
+import subprocess
+import sys
+import threading
+import time
+from array import array
+from datetime import datetime, timedelta
+from itertools import islice
+from pathlib import Path
+from urllib.parse import urlencode
+from sqlalchemy.engine import make_url
+
+BASE_DIR = Path(__file__).resolve().parents[1]
+sys.path.append(str(BASE_DIR))
+
+CATEGORIES = ["Painting", "Drawing", "Photography", "Digital Art", "Sculpture", "Illustration"]
+MEDIUMS = ["Oil Paint", "Acrylic", "Watercolor", "Pencil", "Ink", "Digital", "Mixed Media"]
+TAGS = [f"tag{i}" for i in range(50)]
+SEED_PASSWORD = "bench-password"
+
+
+# ---------------------------------------------------------
+# 1. Scratch environment
+# ---------------------------------------------------------
+
+def bench_env(args):
+    """Environment for the server under test (this process and the gunicorn child)."""
+    run_dir = args.workdir / "run"
+    run_dir.mkdir(parents=True, exist_ok=True)
+    return {
+        "DATABASE_URL": args.database_url or f"sqlite:///{(args.workdir / 'bench.db').as_posix()}",
+        "ARTGRID_RUN_DIR": str(run_dir),
+        "STORAGE_BACKEND": "local",
+        "MAIL_TRANSPORT": "file",
+        "MAIL_FILE_DIR": str(args.workdir / "mail"),
+        "LOGIN_RATE_PER_EMAIL": "",
+        "LOGIN_RATE_PER_IP": "",
+        "COMMENT_RATE_PER_USER": "",
+        "COMMENT_DUPLICATE_WINDOW": "0",
+        "PROFILE_THRESHOLD_MS": "0",
+    }
+
+
+def load_server(env):
+    # server.py reads its configuration at import time, so the scratch settings go first
+    os.environ.update(env)
+    return importlib.import_module("server")
+
+
+def batched(iterable, size):
+    it = iter(iterable)
+    while batch := list(islice(it, size)):
+        yield batch
+
+
+# ---------------------------------------------------------
+# 2. Synthetic dataset
+# ---------------------------------------------------------
+
+def seed(server, args):
+    """Insert users, artworks (+ tags), likes and comments with executemany batches."""
+    from werkzeug.security import generate_password_hash
+
+    scale = {"users": args.users, "artworks": args.artworks, "likes": args.likes, "comments": args.comments}
+    marker = args.workdir / "seed.json"
+    if not args.reseed and marker.exists() and json.loads(marker.read_text()) == scale:
+        print(f"↪️  Reusing seeded dataset {scale}")
+        return
+    rng = random.Random(42)
+    statuses = rng.choices(["approved", "pending", "rejected"], weights=[80, 15, 5], k=args.artworks)
+    approved = [i for i, s in enumerate(statuses) if s == "approved"]
+    if not approved or args.likes > args.users * len(approved):
+        sys.exit("--likes can't exceed users x approved artworks (each user likes an artwork at most once)")
+
+    app, db = server.app, server.db
+    url = make_url(app.config["SQLALCHEMY_DATABASE_URI"])
+    if url.get_backend_name() == "sqlite" and url.database:
+        for suffix in ("", "-wal", "-shm"):
+            Path(url.database + suffix).unlink(missing_ok=True)
+    else:
+        with app.app_context():
+            db.drop_all()
+            db.session.execute(db.text("DROP TABLE IF EXISTS alembic_version"))
+            db.session.commit()
+    server.bootstrap()  # migrations + default admin (user 1)
+    started = time.perf_counter()
+    t0 = datetime(2024, 1, 1)
+    password_hash = generate_password_hash(SEED_PASSWORD, app.config["PASSWORD_HASH_METHOD"])
+    artwork_tags = [rng.sample(TAGS, 2) for _ in range(args.artworks)]
+
+    with app.app_context(), db.engine.begin() as conn:
+        def execute(stmt, rows):
+            for batch in batched(rows, args.batch_size):
+                conn.execute(stmt, batch)
+
+        execute(server.User.__table__.insert(), (
+            dict(full_name=f"Bench User {i}", email=f"bench{i}@my.uopeople.edu", password_hash=password_hash,
+                 dob_hash="x", student_id=f"BENCH{i}", year_of_study=str(i % 4 + 1), role="student",
+                 verification_status="verified", created_at=t0)
+            for i in range(args.users)
+        ))
+        user_ids = [uid for (uid,) in conn.execute(db.select(server.User.id).where(server.User.role == "student"))]
+        print(f"   users      {len(user_ids):>10,}  ({time.perf_counter() - started:.0f}s)")
+
+        execute(server.Artwork.__table__.insert(), (
+            dict(user_id=user_ids[i % len(user_ids)], status=statuses[i], title=f"Artwork {i}",
+                 description=f"Synthetic artwork number {i}", medium=MEDIUMS[i % len(MEDIUMS)],
+                 category=CATEGORIES[i % len(CATEGORIES)], file_url=f"bench/{i}.jpg", thumbnail_url=f"bench/{i}.thumb.jpg",
+                 tags=", ".join(artwork_tags[i]), submission_date=t0 + timedelta(minutes=i),
+                 approval_date=t0 + timedelta(minutes=i + 30) if statuses[i] == "approved" else None,
+                 likes_count=0, views_count=0, is_featured=i % 100 == 0 and statuses[i] == "approved")
+            for i in range(args.artworks)
+        ))
+        first_artwork = conn.execute(db.select(db.func.min(server.Artwork.id))).scalar()
+        print(f"   artworks   {args.artworks:>10,}  ({time.perf_counter() - started:.0f}s)")
+
+        tag_ids = {name: i + 1 for i, name in enumerate(TAGS)}
+        tag_counts = dict.fromkeys(TAGS, 0)
+        for i in approved:
+            for name in artwork_tags[i]:
+                tag_counts[name] += 1
+        execute(server.Tag.__table__.insert(), ({"id": tag_ids[n], "name": n, "artwork_count": tag_counts[n]} for n in TAGS))
+        execute(server.ArtworkTag.__table__.insert(), (
+            {"artwork_id": first_artwork + i, "tag_id": tag_ids[name]}
+            for i, names in enumerate(artwork_tags) for name in names
+        ))
+
+        # Like i goes to user i % U and approved artwork (i // U + 31 * user) % A: unique pairs, spread evenly
+        likes_count = array("l", [0]) * args.artworks
+
+        def likes():
+            for i in range(args.likes):
+                u = i % len(user_ids)
+                a = approved[(i // len(user_ids) + 31 * u) % len(approved)]
+                likes_count[a] += 1
+                yield {"user_id": user_ids[u], "artwork_id": first_artwork + a, "timestamp": t0 + timedelta(seconds=i)}
+        execute(server.Like.__table__.insert(), likes())
+        execute(server.Artwork.__table__.update().where(server.Artwork.id == db.bindparam("aid")).values(
+            likes_count=db.bindparam("n")), (
+            {"aid": first_artwork + a, "n": n} for a, n in enumerate(likes_count) if n
+        ))
+        print(f"   likes      {args.likes:>10,}  ({time.perf_counter() - started:.0f}s)")
+
+        comments_count = array("l", [0]) * args.artworks
+
+        def comments():
+            for i in range(args.comments):
+                a = approved[i * 7 % len(approved)]
+                comments_count[a] += 1
+                yield {"user_id": user_ids[i % len(user_ids)], "artwork_id": first_artwork + a,
+                       "content": f"Synthetic comment {i}", "timestamp": t0 + timedelta(seconds=i), "is_flagged": False}
+        execute(server.Comment.__table__.insert(), comments())
+        execute(server.Artwork.__table__.update().where(server.Artwork.id == db.bindparam("aid")).values(
+            comments_count=db.bindparam("n")), (
+            {"aid": first_artwork + a, "n": n} for a, n in enumerate(comments_count) if n
+        ))
+        print(f"   comments   {args.comments:>10,}  ({time.perf_counter() - started:.0f}s)")
+
+    with app.app_context():
+        server.rebuild_stats()
+        server.reconcile_artist_summaries()
+        server.ensure_search_index()
+    server.dispose_engines()
+    marker.write_text(json.dumps(scale))
+    print(f"✅ Seeded in {time.perf_counter() - started:.0f}s")
+
+
+def fixture(server, args):
+    """Tokens and ids the scenarios pick from (ids are read back, so they match any seed)."""
+    app, db = server.app, server.db
+    with app.app_context():
+        admin = server.User.query.filter_by(role="admin").first()
+        users = server.User.query.filter(server.User.role == "student").limit(200).all()
+        approved = [i for (i,) in db.session.query(server.Artwork.id).filter_by(status="approved")
+                    .order_by(db.func.random()).limit(5000)]
+        tokens = [server.create_access_token(identity=str(u.id), additional_claims=server.token_claims(u)) for u in users]
+        admin_token = server.create_access_token(identity=str(admin.id), additional_claims=server.token_claims(admin))
+    server.dispose_engines()
+    if not approved or not tokens:
+        sys.exit("The scratch database has no approved artworks / users; run with --reseed")
+    return {"tokens": tokens, "admin": admin_token, "artworks": approved, "users": [u.id for u in users]}
+
+
+# ---------------------------------------------------------
+# 3. Scenarios: name -> (method, path, body, token, check) per request
+#    check(payload) -> bool validates the JSON body, so an endpoint that
+#    answers fast with the wrong (or no) rows counts as an error
+# ---------------------------------------------------------
+
+def listed(key, pred=lambda item: True):
+    """Check: payload[key] is a non-empty list whose items all satisfy *pred*."""
+    return lambda payload: bool(payload.get(key)) and all(pred(item) for item in payload[key])
+
+
+def has_tag(item, tag):
+    return tag in [t.strip().lower() for t in (item.get("tags") or "").split(",")]
+
+
+def feed_request(rng):
+    """GET /api/artworks: page mode, cursor mode, or filtered by category / tag (filters are verified)."""
+    kind = rng.choice(["page", "cursor", "category", "tags"])
+    if kind == "page":
+        return "GET", f"/api/artworks?page={rng.randint(1, 5)}", None, None, listed("artworks")
+    if kind == "cursor":
+        return "GET", "/api/artworks?cursor=", None, None, listed("artworks")
+    if kind == "category":
+        category = rng.choice(CATEGORIES)
+        return ("GET", "/api/artworks?" + urlencode({"category": category}), None, None,
+                listed("artworks", lambda a: a["category"] == category))
+    tag = rng.choice(TAGS)
+    return ("GET", "/api/artworks?" + urlencode({"tags": tag}), None, None,
+            listed("artworks", lambda a: has_tag(a, tag)))
+
+
+def scenarios(fx):
+    art = lambda rng: rng.choice(fx["artworks"])
+    user = lambda rng: rng.choice(fx["tokens"])
+
+    def artwork_request(rng):
+        artwork_id = art(rng)
+        return "GET", f"/api/artworks/{artwork_id}", None, None, lambda payload: payload.get("id") == artwork_id
+
+    return {
+        "get_artworks": feed_request,
+        "get_artwork": artwork_request,
+        "user_gallery": lambda rng: ("GET", f"/api/users/{rng.choice(fx['users'])}/gallery", None, None, listed("artworks")),
+        "toggle_like": lambda rng: ("POST", f"/api/artworks/{art(rng)}/like", None, user(rng), None),
+        "add_comment": lambda rng: ("POST", "/api/comments", {"artwork_id": art(rng), "content": "Benchmark comment"},
+                                    user(rng), None),
+        "mod_queue": lambda rng: ("GET", f"/api/admin/queue?page={rng.randint(1, 3)}", None, fx["admin"], listed("artworks")),
+        "admin_stats": lambda rng: ("GET", "/api/admin/stats", None, fx["admin"], None),
+    }
+
+
+# ---------------------------------------------------------
+# 4. Drivers
+# ---------------------------------------------------------
+
+class ClientDriver:
+    """In-process: one Flask test client per thread."""
+
+    def __init__(self, app):
+        self.app = app
+        self._local = threading.local()
+
+    def __call__(self, method, path, body, token):
+        """Returns (status, response body)."""
+        client = getattr(self._local, "client", None) or self.app.test_client()
+        self._local.client = client
+        headers = {"Authorization": f"Bearer {token}"} if token else {}
+        resp = client.open(path, method=method, json=body, headers=headers)
+        return resp.status_code, resp.get_data()
+
+
+class HttpDriver:
+    """Against a running server: one keep-alive HTTP connection per thread."""
+
+    def __init__(self, host, port):
+        self.host, self.port = host, port
+        self._local = threading.local()
+
+    def __call__(self, method, path, body, token):
+        conn = getattr(self._local, "conn", None) or http.client.HTTPConnection(self.host, self.port, timeout=60)
+        self._local.conn = conn
+        headers = {"Content-Type": "application/json"} if body is not None else {}
+        if token:
+            headers["Authorization"] = f"Bearer {token}"
+        try:
+            conn.request(method, path, body=json.dumps(body) if body is not None else None, headers=headers)
+            resp = conn.getresponse()
+            return resp.status, resp.read()
+        except (http.client.HTTPException, OSError):
+            self._local.conn = None  # reconnect on the next request
+            return 599, b""
+
+
+def start_gunicorn(env, args):
+    port = args.port
+    log = open(args.workdir / "gunicorn.log", "w")
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "gunicorn", "-c", "gunicorn.conf.py", "--bind", f"127.0.0.1:{port}",
+         "--workers", str(args.gunicorn_workers), "--access-logfile", "/dev/null"],
+        cwd=BASE_DIR, env={**os.environ, **env}, stdout=log, stderr=subprocess.STDOUT,
+    )
+    deadline = time.time() + 60
+    while time.time() < deadline:
+        if proc.poll() is not None:
+            sys.exit(f"gunicorn exited with status {proc.returncode}, see {log.name}")
+        try:
+            conn = http.client.HTTPConnection("127.0.0.1", port, timeout=2)
+            conn.request("GET", "/api/health")
+            if conn.getresponse().status == 200:
+                return proc
+        except OSError:
+            time.sleep(0.5)
+    proc.send_signal(signal.SIGTERM)
+    sys.exit("gunicorn did not become ready within 60s")
+
+
+def percentile(sorted_values, p):
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return None
+    return sorted_values[min(len(sorted_values) - 1, max(0, round(p / 100 * len(sorted_values)) - 1))]
+
+
+def failed(status, body, check):
+    """A request fails on an error status, or when its check rejects the JSON body."""
+    if status >= 400:
+        return True
+    if check is None:
+        return False
+    try:
+        return not check(json.loads(body))
+    except (ValueError, AttributeError, KeyError, TypeError):
+        return True
+
+
+def run_scenario(driver, make_request, requests, concurrency, warmup, seed_value):
+    """Fire *requests* requests from *concurrency* threads; returns the latency summary."""
+    rng = random.Random(seed_value)
+    plan = [make_request(rng) for _ in range(warmup + requests)]
+    for *req, _ in plan[:warmup]:
+        driver(*req)
+    latencies, errors, lock = [], 0, threading.Lock()
+    queue = iter(plan[warmup:])
+
+    def worker():
+        nonlocal errors
+        mine, bad = [], 0
+        while True:
+            with lock:
+                req = next(queue, None)
+            if req is None:
+                break
+            *req, check = req
+            started = time.perf_counter()
+            status, body = driver(*req)
+            mine.append(time.perf_counter() - started)
+            bad += failed(status, body, check)
+        with lock:
+            latencies.extend(mine)
+            errors += bad
+
+    started = time.perf_counter()
+    threads = [threading.Thread(target=worker) for _ in range(concurrency)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - started
+    latencies.sort()
+    ms = lambda v: round(v * 1000, 2)
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "rps": round(len(latencies) / elapsed, 1),
+        "p50_ms": ms(percentile(latencies, 50)),
+        "p95_ms": ms(percentile(latencies, 95)),
+        "p99_ms": ms(percentile(latencies, 99)),
+    }
+
+
+# ---------------------------------------------------------
+# 5. Reporting
+# ---------------------------------------------------------
+
+def print_results(mode, results):
+    print(f"\n[{mode}]")
+    print(f"{'endpoint':<14} {'req/s':>9} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'errors':>7}")
+    for name, r in results.items():
+        print(f"{name:<14} {r['rps']:>9.1f} {r['p50_ms']:>9.2f} {r['p95_ms']:>9.2f} {r['p99_ms']:>9.2f} {r['errors']:>7}")
+
+
+def compare(current, baseline, tolerance):
+    """Print per-endpoint deltas vs. *baseline*; returns the regressions (p95 up or req/s down by > tolerance)."""
+    regressions = []
+    print(f"\nCompared with baseline from {baseline['meta'].get('timestamp', '?')} (tolerance {tolerance:.0%}):")
+    for mode, results in current["results"].items():
+        for name, r in results.items():
+            old = baseline.get("results", {}).get(mode, {}).get(name)
+            if not old:
+                continue
+            p95 = r["p95_ms"] / old["p95_ms"] - 1 if old["p95_ms"] else 0
+            rps = r["rps"] / old["rps"] - 1 if old["rps"] else 0
+            bad = p95 > tolerance or rps < -tolerance
+            print(f"  {'❌' if bad else '✅'} {mode:<8} {name:<14} p95 {p95:+7.1%}   req/s {rps:+7.1%}")
+            if bad:
+                regressions.append(f"{mode}/{name}")
+    return regressions
+
+
+def git_revision():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=BASE_DIR,
+                              capture_output=True, text=True).stdout.strip() or None
+    except OSError:
+        return None
+
+
+# ---------------------------------------------------------
+# 6. Main
+# ---------------------------------------------------------
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the ARTGRID API hot paths")
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--artworks", type=int, default=20000)
+    parser.add_argument("--likes", type=int, default=200000)
+    parser.add_argument("--comments", type=int, default=50000)
+    parser.add_argument("--reseed", action="store_true", help="rebuild the scratch dataset even if the scale matches")
+    parser.add_argument("--batch-size", type=int, default=10000, help="rows per executemany while seeding")
+    parser.add_argument("--workdir", type=Path, default=Path(os.environ.get("TMPDIR", "/tmp")) / "artgrid-bench",
+                        help="scratch DB, run files and mail outbox")
+    parser.add_argument("--database-url", help="scratch database to use instead of <workdir>/bench.db")
+    parser.add_argument("--mode", choices=["client", "gunicorn", "both"], default="both")
+    parser.add_argument("--scenarios", nargs="+", help="subset of endpoints to run (default: all)")
+    parser.add_argument("--requests", type=int, default=500, help="measured requests per endpoint")
+    parser.add_argument("--warmup", type=int, default=20, help="unmeasured requests per endpoint")
+    parser.add_argument("--concurrency", type=int, default=8, help="client threads")
+    parser.add_argument("--port", type=int, default=5099)
+    parser.add_argument("--gunicorn-workers", type=int, default=2)
+    parser.add_argument("--output", type=Path, default=Path("bench_api.json"), help="where to write the results")
+    parser.add_argument("--baseline", type=Path, help="earlier results to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.15, help="allowed p95 / req/s change vs. the baseline")
+    args = parser.parse_args()
+    args.workdir.mkdir(parents=True, exist_ok=True)
+
+    env = bench_env(args)
+    server = load_server(env)
+    print(f"📦 Scratch database: {server.app.config['SQLALCHEMY_DATABASE_URI']}")
+    seed(server, args)
+    fx = fixture(server, args)
+    plans = scenarios(fx)
+    names = args.scenarios or list(plans)
+    unknown = set(names) - plans.keys()
+    if unknown:
+        sys.exit(f"Unknown scenarios: {', '.join(sorted(unknown))}")
+
+    report = {
+        "meta": {
+            "timestamp": datetime.utcnow().isoformat(timespec="seconds"),
+            "git": git_revision(),
+            "python": platform.python_version(),
+            "scale": {"users": args.users, "artworks": args.artworks, "likes": args.likes, "comments": args.comments},
+            "requests": args.requests,
+            "concurrency": args.concurrency,
+            "gunicorn_workers": args.gunicorn_workers,
+        },
+        "results": {},
+    }
+    drivers = []
+    if args.mode in ("client", "both"):
+        drivers.append(("client", lambda: (ClientDriver(server.app), None)))
+    if args.mode in ("gunicorn", "both"):
+        drivers.append(("gunicorn", lambda: (HttpDriver("127.0.0.1", args.port), start_gunicorn(env, args))))
+
+    for mode, make in drivers:
+        driver, proc = make()
+        try:
+            results = {}
+            for i, name in enumerate(names):
+                results[name] = run_scenario(driver, plans[name], args.requests, args.concurrency, args.warmup, i)
+            report["results"][mode] = results
+            print_results(mode, results)
+        finally:
+            if proc:
+                proc.send_signal(signal.SIGTERM)
+                proc.wait(timeout=30)
+
+    broken = [f"{mode}/{name}" for mode, results in report["results"].items()
+              for name, r in results.items() if r["errors"]]
+    if broken:
+        # Timings of failing or wrong responses mean nothing; don't let them become a baseline
+        sys.exit(f"❌ Errors or failed response checks in: {', '.join(broken)} (results not written)")
+    args.output.write_text(json.dumps(report, indent=2))
+    print(f"\n📝 Results written to {args.output}")
+    if args.baseline:
+        regressions = compare(report, json.loads(args.baseline.read_text()), args.tolerance)
+        if regressions:
+            print(f"❌ Regressed: {', '.join(regressions)}")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+"""
+Micro-benchmark for PASSWORD_HASH_METHOD settings.
+- Measures check_password_hash (the work behind one login) per method.
+- Reports logins/s on one core and with N threads, to show how far the
+  hashing pool in server.py scales (scrypt and pbkdf2 release the GIL).
+- Pick the slowest method that still leaves enough logins/s for peak traffic.
+
+Usage:
+    python tools/bench_password_hash.py [--methods M [M ...]] [--threads N] [--seconds S]
+"""
+
+import argparse
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from werkzeug.security import generate_password_hash, check_password_hash
+
+DEFAULT_METHODS = [
+    "scrypt:16384:8:1",
+    "scrypt:32768:8:1",   # werkzeug default, server.py default
+    "scrypt:65536:8:1",
+    "pbkdf2:sha256:260000",
+    "pbkdf2:sha256:600000",
+]
+
+
+def logins_per_second(stored, threads, seconds):
+    """Run check_password_hash on *threads* threads for ~*seconds*; return verifications/s."""
+    deadline = time.perf_counter() + seconds
+
+    def worker():
+        n = 0
+        while time.perf_counter() < deadline:
+            check_password_hash(stored, "correct horse battery staple")
+            n += 1
+        return n
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        total = sum(pool.map(lambda _: worker(), range(threads)))
+    return total / (time.perf_counter() - started)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark password hash settings")
+    parser.add_argument("--methods", nargs="+", default=DEFAULT_METHODS)
+    parser.add_argument("--threads", type=int, default=os.cpu_count() or 2, help="pool size to compare against")
+    parser.add_argument("--seconds", type=float, default=2.0, help="time per measurement")
+    args = parser.parse_args()
+
+    print(f"{'method':<24} {'ms/login':>9} {'logins/s/core':>14} {f'logins/s x{args.threads}':>16}")
+    for method in args.methods:
+        stored = generate_password_hash("correct horse battery staple", method)
+        single = logins_per_second(stored, 1, args.seconds)
+        pooled = logins_per_second(stored, args.threads, args.seconds)
+        print(f"{method:<24} {1000 / single:>9.1f} {single:>14.1f} {pooled:>16.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,11 @@
+"""
+Production entry point: `gunicorn -c gunicorn.conf.py` (see that file).
+
+Importing this module bootstraps the database once. With preload_app the
+gunicorn master imports it before forking, so workers start with the app
+already loaded and skip the schema checks.
+"""
+
+from server import app, bootstrap
+
+bootstrap()